@@ -0,0 +1,102 @@
+"""
+Compact rendering of tool results for the response model.
+
+Phone data reaches the intent handlers as a pipe-separated table: one
+header row, then one row per phone. Empty columns are dropped, empty cells
+are left blank, lists are joined with "; ", and units are written
+into the values ("8GB", "5000mAh"). This replaces repeating every JSON key
+once per phone. The tools render their result with `encode_tool_result` as
+the ToolMessage content; the structured data stays in the artifact and
+reaches the frontend as `context_data` unchanged.
+"""
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from core.config import settings
+
+# How the response prompts describe phone data; JSON when CONTEXT_ENCODING_ENABLED is off
+PHONE_DATA_FORMAT = (
+    "Phone data comes as a table: a header row, then one row per phone. Cells are separated by `|`, "
+    "list items by `;`, and a blank cell means the value is unknown."
+    if settings.CONTEXT_ENCODING_ENABLED else
+    "Phone data comes as JSON, one object per phone keyed by field name. "
+    "A null or missing field means the value is unknown."
+)
+
+# Field -> (column label, value formatter), in display order.
+# Fields not listed here (id, popularity_score, ...) are never rendered.
+COLUMNS: Dict[str, tuple] = {
+    "name": ("name", str),
+    "brand": ("brand", str),
+    "price": ("price", "₹{}".format),
+    "rating": ("rating", str),
+    "released_year": ("year", str),
+    "os": ("os", str),
+    "processor": ("chip", str),
+    "network": ("network", str),
+    "display_size_inch": ("screen", "{}in".format),
+    "display_type": ("panel", str),
+    "refresh_rate": ("refresh", "{}Hz".format),
+    "ram_gb": ("ram", "{}GB".format),
+    "storage_gb": ("storage", "{}GB".format),
+    "battery_mah": ("battery", "{}mAh".format),
+    "charging_speed_w": ("charging", "{}W".format),
+    "rear_camera_mp": ("rear cam", "{}MP".format),
+    "front_camera_mp": ("front cam", "{}MP".format),
+    "camera_features": ("camera features", str),
+    "weight_g": ("weight", "{}g".format),
+    "features": ("features", "; ".join),
+    "use_cases": ("use cases", "; ".join),
+    "pros": ("pros", "; ".join),
+    "cons": ("cons", "; ".join),
+}
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == []
+
+
+def _cell(formatter: Callable[[Any], str], value: Any) -> str:
+    if _is_empty(value):
+        return ""
+    return formatter(value).replace("|", "/").replace("\n", " ")
+
+
+def encode_phone_table(phones: List[Dict[str, Any]]) -> str:
+    """Header row plus one row per phone, skipping columns that are empty for every phone"""
+    columns = [
+        (label, field, formatter)
+        for field, (label, formatter) in COLUMNS.items()
+        if any(not _is_empty(phone.get(field)) for phone in phones)
+    ]
+    lines = ["|".join(label for label, _, _ in columns)]
+    for phone in phones:
+        lines.append("|".join(_cell(formatter, phone.get(field)) for _, field, formatter in columns))
+    return "\n".join(lines)
+
+
+def encode_tool_result(data: Union[Dict, List[Dict]]) -> Optional[str]:
+    """
+    Render a tool artifact for the model
+
+    Returns:
+        The compact text, or None for results that are not phone data
+    """
+    if isinstance(data, list):
+        return f"phones ({len(data)}, most popular first):\n{encode_phone_table(data)}"
+
+    if isinstance(data, dict) and "phones" in data:
+        lines = [
+            "phones (in the order the user gave them):",
+            encode_phone_table(data["phones"]),
+        ]
+        if data.get("winners"):
+            lines.append("best per spec (price: lowest, others: highest):")
+            lines.extend(
+                f"{COLUMNS[spec][0] if spec in COLUMNS else spec}: {', '.join(names)}"
+                for spec, names in data["winners"].items()
+            )
+        return "\n".join(lines)
+
+    if isinstance(data, dict) and "name" in data:
+        return f"phone:\n{encode_phone_table([data])}"
+    return None
@@ -0,0 +1,222 @@
+"""
+Bounded, compact conversation memory.
+
+Stored history is kept small and each turn sends the model only what fits
+in a token budget:
+    - tool results from earlier turns are replaced by a short reference
+      (tool name and phone names); the full data already reached the client
+    - a session keeps at most `max_messages` messages, cut at a user turn
+    - each turn sends the most recent messages that fit in `token_budget`
+    - optionally, messages dropped from the session are rolled into a running
+      summary by a background task, and that summary is sent ahead of the window
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Sequence, Set, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately, get_buffer_string
+
+from agent.model_client import model_client
+from agent.prompt_registry import prompt_registry
+from core.config import settings
+from core.session_manager import session_manager
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_MESSAGE_ID = "conversation-summary"
+
+# Runs in the background, so a hedged request would only add cost
+summary_model = model_client.for_node("history_summary", hedge=False)
+
+
+def _phone_names(data: Any) -> List[str]:
+    if isinstance(data, list):
+        return [item["name"] for item in data if isinstance(item, dict) and "name" in item]
+    if isinstance(data, dict):
+        if "phones" in data:
+            return _phone_names(data["phones"])
+        if "name" in data:
+            return [data["name"]]
+    return []
+
+
+def compact_tool_message(message: ToolMessage) -> ToolMessage:
+    """Replace a tool payload with a short reference to what it contained"""
+    data = message.artifact
+    if data is None:
+        try:
+            data = json.loads(message.content)
+        except (TypeError, ValueError):
+            return message
+
+    if isinstance(data, dict) and "error" in data:
+        reference = f"[{message.name} result] error: {data['error']}"
+    else:
+        names = _phone_names(data)
+        reference = f"[{message.name} result, full data omitted] phones: {', '.join(names) or 'none'}"
+
+    # The artifact only feeds the current response, never the stored history
+    if len(reference) >= len(message.content):
+        return message.model_copy(update={"artifact": None})
+    return message.model_copy(update={"content": reference, "artifact": None})
+
+
+def _start_of_turn(messages: Sequence[BaseMessage], index: int) -> int:
+    """First user message at or after `index`, so a window never splits a turn"""
+    while index < len(messages) and not isinstance(messages[index], HumanMessage):
+        index += 1
+    return index
+
+
+class ConversationMemory:
+    """Windowing, tool-payload compaction and optional summarization of session history"""
+
+    def __init__(self, max_messages: int = 50, token_budget: int = 4000, summary_enabled: bool = False):
+        self.max_messages = max_messages
+        self.token_budget = token_budget
+        self.summary_enabled = summary_enabled
+        self._summarizing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._counters = {
+            "compacted_tool_messages": 0,
+            "compacted_tokens_saved": 0,
+            "dropped_messages": 0,
+            "summaries": 0,
+            "summary_failures": 0,
+        }
+
+    def _window(self, messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+        """Most recent whole turns that fit in the token budget"""
+        tokens = 0
+        start = len(messages)
+        while start > 0:
+            tokens += count_tokens_approximately([messages[start - 1]])
+            if tokens > self.token_budget:
+                break
+            start -= 1
+        return list(messages[_start_of_turn(messages, start):])
+
+    def build_history(self, session: Dict) -> List[BaseMessage]:
+        """Messages to send ahead of the new user message for this turn"""
+        history = self._window(session["messages"])
+        summary = session.get("summary")
+        if summary:
+            history.insert(0, HumanMessage(
+                content=f"Summary of the earlier conversation:\n{summary}",
+                id=SUMMARY_MESSAGE_ID,
+            ))
+        return history
+
+    async def store(self, session_id: str, history: Sequence[BaseMessage], messages: Sequence[BaseMessage]):
+        """
+        Append this turn to the session, compacting tool payloads and
+        enforcing the message limit
+
+        Args:
+            history: what `build_history` returned for this turn
+            messages: the graph's final message list (history plus this turn)
+        """
+        new_messages = []
+        for message in messages[len(history):]:
+            if isinstance(message, ToolMessage):
+                compacted = compact_tool_message(message)
+                if compacted is not message:
+                    self._counters["compacted_tool_messages"] += 1
+                    self._counters["compacted_tokens_saved"] += (
+                        count_tokens_approximately([message]) - count_tokens_approximately([compacted])
+                    )
+                message = compacted
+            new_messages.append(message)
+
+        dropped: List[BaseMessage] = []
+
+        def append(current: Dict) -> Tuple[List[BaseMessage], Dict[str, Any]]:
+            # Applied to the session as stored now, since the summarizer may
+            # have written to it since this turn read it
+            stored = list(current["messages"]) + new_messages
+            dropped[:] = []
+            if len(stored) > self.max_messages:
+                cut = _start_of_turn(stored, len(stored) - self.max_messages)
+                dropped[:], stored = stored[:cut], stored[cut:]
+
+            metrics = dict(current.get("memory") or {})
+            metrics.update({
+                "stored_messages": len(stored),
+                "stored_tokens": count_tokens_approximately(stored),
+                "stored_chars": sum(len(str(m.content)) for m in stored),
+                "prompt_history_messages": len(history),
+                "prompt_history_tokens": count_tokens_approximately(history),
+                "dropped_messages": metrics.get("dropped_messages", 0) + len(dropped),
+            })
+
+            fields: Dict[str, Any] = {"memory": metrics}
+            if dropped and self.summary_enabled:
+                fields["unsummarized"] = list(current.get("unsummarized") or []) + dropped
+            return stored, fields
+
+        if not await session_manager.modify_session(session_id, append):
+            return
+        self._counters["dropped_messages"] += len(dropped)
+
+        if dropped and self.summary_enabled and session_id not in self._summarizing:
+            self._summarizing.add(session_id)
+            task = asyncio.create_task(self._summarize(session_id), name=f"summarize-{session_id}")
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _summarize(self, session_id: str):
+        """Fold dropped messages into the session summary until none are left"""
+        try:
+            while True:
+                session = await session_manager.get_session(session_id)
+                if not session or not session.get("unsummarized"):
+                    return
+                pending = session["unsummarized"]
+                summary = session.get("summary") or ""
+                response = await prompt_registry.ainvoke("history_summary", summary_model, [
+                    HumanMessage(content=(
+                        f"Current summary:\n{summary or '(none)'}\n\n"
+                        f"Conversation:\n{get_buffer_string(pending)}"
+                    )),
+                ])
+
+                def fold(current: Dict) -> Tuple[List[BaseMessage], Dict[str, Any]]:
+                    # Turns stored meanwhile only append to `unsummarized`
+                    metrics = dict(current.get("memory") or {})
+                    metrics["summarized_messages"] = metrics.get("summarized_messages", 0) + len(pending)
+                    metrics["summary_tokens"] = count_tokens_approximately([response])
+                    return current["messages"], {
+                        "summary": response.text,
+                        "unsummarized": list(current.get("unsummarized") or [])[len(pending):],
+                        "memory": metrics,
+                    }
+
+                if not await session_manager.modify_session(session_id, fold):
+                    return
+                self._counters["summaries"] += 1
+        except Exception as e:
+            self._counters["summary_failures"] += 1
+            logger.error(f"Failed to summarize history for session {session_id}: {e}", exc_info=True)
+        finally:
+            self._summarizing.discard(session_id)
+
+    def session_stats(self, session: Dict) -> Dict[str, Any]:
+        """Memory and token metrics for one session"""
+        return {
+            **(session.get("memory") or {}),
+            "has_summary": bool(session.get("summary")),
+            "pending_summary_messages": len(session.get("unsummarized") or []),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._counters, "summaries_in_flight": len(self._summarizing)}
+
+
+# Global conversation memory instance
+conversation_memory = ConversationMemory(
+    max_messages=settings.MAX_CONVERSATION_HISTORY,
+    token_budget=settings.HISTORY_TOKEN_BUDGET,
+    summary_enabled=settings.HISTORY_SUMMARY_ENABLED,
+)
@@ -0,0 +1,319 @@
+"""
+Deterministic fast-path intent classifier.
+
+Resolves high-confidence messages locally so they skip the Gemini intent
+classification call:
+    - keyword/regex rules for greetings, thanks and acknowledgements -> chitchat
+    - "X vs Y" where both sides match catalog phone names -> compare
+    - a small naive Bayes lexical model, trained on the examples in
+      INTENT_CLASSIFICATION_PROMPT and on logged traffic, gated by a
+      confidence threshold
+
+By default the lexical model is trained in memory from the prompt examples
+on first use. To also train on logged traffic, build it on disk (from the
+backend directory) and point FAST_PATH_MODEL_PATH at the file:
+    python -m agent.fast_path_classifier [--from-logs] [--output PATH]
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from agent.prompts.intent_classification import INTENT_CLASSIFICATION_PROMPT
+from agent.tools.phone_catalog import phone_catalog
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Where `main` writes the model unless FAST_PATH_MODEL_PATH or --output says otherwise
+DEFAULT_MODEL_PATH = "agent/data/fast_path_model.json"
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+TRAILER = r"[\s!.,?:;)(\-]*(?:\s*(?:so much|a lot|again|buddy|bro|man|there|team))?[\s!.,?:;)(\-]*$"
+
+RULES: List[Tuple[str, str, re.Pattern]] = [
+    (
+        "greeting",
+        "chitchat",
+        re.compile(
+            r"^(?:hi+|hello+|hey+|hiya|yo|hola|namaste|greetings|good (?:morning|afternoon|evening))"
+            + TRAILER,
+            re.IGNORECASE,
+        ),
+    ),
+    (
+        "thanks",
+        "chitchat",
+        re.compile(
+            r"^(?:thanks?|thank you|thankyou|thx|ty|tysm|much appreciated|appreciate it)" + TRAILER,
+            re.IGNORECASE,
+        ),
+    ),
+    (
+        "farewell",
+        "chitchat",
+        re.compile(r"^(?:bye+|goodbye|see you|see ya|cya|take care)" + TRAILER, re.IGNORECASE),
+    ),
+]
+
+# Acknowledgements are only chitchat when they are not answering a question
+ACKNOWLEDGEMENT_RULE = (
+    "acknowledgement",
+    "chitchat",
+    re.compile(
+        r"^(?:ok(?:ay)?|cool|nice|great|awesome|perfect|got it|alright|sounds good|"
+        r"nice,? this one is good|yeah,? i like it|i like it|love it)" + TRAILER,
+        re.IGNORECASE,
+    ),
+)
+
+COMPARE_PATTERN = re.compile(
+    r"^(?:compare\s+)?(?P<left>[\w .+\-]{2,40}?)\s+(?:vs\.?|versus|v/s)\s+(?P<right>[\w .+\-]{2,40}?)[\s?!.]*$",
+    re.IGNORECASE,
+)
+
+INTENT_ALIASES = {"greeting": "chitchat"}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase unigrams plus bigrams"""
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def extract_prompt_examples(prompt: str = INTENT_CLASSIFICATION_PROMPT) -> List[Tuple[str, str]]:
+    """Pull (text, intent) pairs out of the intent classification prompt"""
+    examples: List[Tuple[str, str]] = []
+
+    intents_section = prompt.split("---")[0]
+    current_intent = None
+    for line in intents_section.splitlines():
+        header = re.match(r"^\s*\d+\.\s+\*\*(\w+)\*\*", line)
+        if header:
+            current_intent = header.group(1)
+            continue
+        if current_intent and line.strip().startswith("- \""):
+            for text in re.findall(r'"([^"]+)"', line):
+                examples.append((text, current_intent))
+
+    for text, intent in re.findall(
+        r'Query:\s*"([^"]+)"\s*\nResponse:\s*\{"intent":\s*"(\w+)"\}', prompt
+    ):
+        examples.append((text, INTENT_ALIASES.get(intent, intent)))
+
+    return examples
+
+
+def fetch_logged_examples(page_size: int = 1000) -> List[Tuple[str, str]]:
+    """Pull (user_message, intent) pairs from logged responses in Supabase"""
+    from core.supabase_client import get_supabase_client
+
+    supabase = get_supabase_client()
+    examples: List[Tuple[str, str]] = []
+    start = 0
+    while True:
+        response = (
+            supabase.table("logs")
+            .select("user_message,intent")
+            .eq("event_type", "response")
+            .range(start, start + page_size - 1)
+            .execute()
+        )
+        page = response.data or []
+        examples.extend(
+            (row["user_message"], row["intent"])
+            for row in page
+            if row.get("user_message") and row.get("intent")
+        )
+        if len(page) < page_size:
+            return examples
+        start += page_size
+
+
+def build_lexical_model(examples: Sequence[Tuple[str, str]]) -> Dict[str, Any]:
+    """Train a multinomial naive Bayes model over (text, intent) pairs"""
+    token_counts: Dict[str, Counter] = {}
+    doc_counts: Counter = Counter()
+    for text, intent in examples:
+        doc_counts[intent] += 1
+        token_counts.setdefault(intent, Counter()).update(tokenize(text))
+
+    vocabulary = set()
+    for counts in token_counts.values():
+        vocabulary.update(counts)
+
+    total_docs = sum(doc_counts.values())
+    return {
+        "vocab_size": len(vocabulary),
+        "intents": {
+            intent: {
+                "log_prior": math.log(doc_counts[intent] / total_docs),
+                "total": sum(token_counts[intent].values()),
+                "counts": dict(token_counts[intent]),
+            }
+            for intent in doc_counts
+        },
+    }
+
+
+class LexicalModel:
+    """Naive Bayes intent scorer loaded from the JSON built by `build_lexical_model`"""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.vocab_size = data["vocab_size"]
+        self.intents = data["intents"]
+
+    def posteriors(self, text: str) -> Dict[str, float]:
+        """Probability per intent, or {} when no token of `text` is in the vocabulary"""
+        tokens = [t for t in tokenize(text) if any(t in m["counts"] for m in self.intents.values())]
+        if not tokens:
+            return {}
+
+        scores = {}
+        for intent, model in self.intents.items():
+            denominator = math.log(model["total"] + self.vocab_size)
+            scores[intent] = model["log_prior"] + sum(
+                math.log(model["counts"].get(t, 0) + 1) - denominator for t in tokens
+            )
+
+        best = max(scores.values())
+        weights = {intent: math.exp(score - best) for intent, score in scores.items()}
+        normalizer = sum(weights.values())
+        return {intent: weight / normalizer for intent, weight in weights.items()}
+
+    def predict(self, text: str) -> Tuple[Optional[str], float]:
+        posteriors = self.posteriors(text)
+        if not posteriors:
+            return None, 0.0
+        best = max(posteriors, key=posteriors.get)
+        return best, posteriors[best]
+
+
+class FastPathClassifier:
+    """Rule and lexical-model pre-classifier with per-rule hit counters"""
+
+    def __init__(
+        self,
+        model_path: Optional[str],
+        threshold: float = 0.95,
+        lexical_intents: Sequence[str] = ("chitchat", "query", "irrelevant", "search_recommendation"),
+    ):
+        self.model_path = model_path
+        self.threshold = threshold
+        self.lexical_intents = set(lexical_intents)
+        self._model: Optional[LexicalModel] = None
+        self._lock = threading.Lock()
+        self._counters: Counter = Counter()
+
+    @property
+    def model(self) -> LexicalModel:
+        if self._model is None:
+            if self.model_path is not None and os.path.exists(self.model_path):
+                with open(self.model_path, encoding="utf-8") as f:
+                    self._model = LexicalModel(json.load(f))
+                logger.info(f"Loaded fast-path lexical model from {self.model_path}")
+            else:
+                if self.model_path is not None:
+                    logger.error(f"Fast-path lexical model {self.model_path} not found, training on the prompt examples")
+                self._model = LexicalModel(build_lexical_model(extract_prompt_examples()))
+        return self._model
+
+    def _record(self, outcome: str):
+        with self._lock:
+            self._counters["total"] += 1
+            self._counters[outcome] += 1
+
+    def _match_compare(self, text: str) -> bool:
+        if not phone_catalog.is_ready:
+            return False
+        match = COMPARE_PATTERN.match(text)
+        if not match:
+            return False
+        return all(
+            phone_catalog.find_by_name(match.group(side).strip()) is not None
+            for side in ("left", "right")
+        )
+
+    def classify(self, messages: Sequence[BaseMessage]) -> Optional[Tuple[str, str, float]]:
+        """
+        Classify the last user message without calling the model
+
+        Returns:
+            (intent, rule name, confidence), or None when the message should go
+            to the Gemini classifier
+        """
+        if not messages or not isinstance(messages[-1], HumanMessage):
+            return None
+        text = str(messages[-1].content).strip()
+
+        for name, intent, pattern in RULES:
+            if pattern.match(text):
+                self._record(name)
+                return intent, name, 1.0
+
+        name, intent, pattern = ACKNOWLEDGEMENT_RULE
+        previous = messages[-2] if len(messages) > 1 else None
+        asked_question = isinstance(previous, AIMessage) and str(previous.content).rstrip().endswith("?")
+        if not asked_question and pattern.match(text):
+            self._record(name)
+            return intent, name, 1.0
+
+        if self._match_compare(text):
+            self._record("catalog_compare")
+            return "compare", "catalog_compare", 1.0
+
+        intent, confidence = self.model.predict(text)
+        if intent in self.lexical_intents and confidence >= self.threshold:
+            self._record("lexical_model")
+            return intent, "lexical_model", confidence
+
+        self._record("passthrough")
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-rule hit counts and hit rates"""
+        with self._lock:
+            counters = dict(self._counters)
+        total = counters.pop("total", 0)
+        return {
+            "total": total,
+            "rules": {
+                name: {"hits": hits, "hit_rate": hits / total if total else 0.0}
+                for name, hits in counters.items()
+            },
+        }
+
+
+# Global fast-path classifier instance
+fast_path_classifier = FastPathClassifier(
+    model_path=settings.FAST_PATH_MODEL_PATH,
+    threshold=settings.FAST_PATH_CONFIDENCE_THRESHOLD,
+    lexical_intents=settings.FAST_PATH_LEXICAL_INTENTS,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the fast-path lexical intent model")
+    parser.add_argument("--output", default=settings.FAST_PATH_MODEL_PATH or DEFAULT_MODEL_PATH)
+    parser.add_argument("--from-logs", action="store_true", help="Also train on logged traffic in Supabase")
+    args = parser.parse_args()
+
+    examples = extract_prompt_examples()
+    if args.from_logs:
+        examples += fetch_logged_examples()
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(build_lexical_model(examples), f, ensure_ascii=False)
+    print(f"Wrote lexical model trained on {len(examples)} examples to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
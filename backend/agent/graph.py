@@ -1,23 +1,15 @@
-import json
+import asyncio
+import functools
 import logging
-from typing import Dict, Any
+import uuid
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, Optional
 
 from langgraph.graph import StateGraph, START, END
-from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage, get_buffer_string
 from langgraph.prebuilt import ToolNode
-from langchain_google_genai import ChatGoogleGenerativeAI
-
-from agent.prompts.intent_classification import INTENT_CLASSIFICATION_PROMPT
-from agent.prompts.tool_selection import TOOL_SELECTION_PROMPT
-from agent.prompts.chitchat_intent import CHITCHAT_INTENT_PROMPT
-from agent.prompts.query_intent import QUERY_INTENT_PROMPT
-from agent.prompts.irrelevant_intent import IRRELEVANT_INTENT_PROMPT
-from agent.prompts.adversarial_intent import ADVERSARIAL_INTENT_PROMPT
-from agent.prompts.details_intent import DETAILS_INTENT_PROMPT
-from agent.prompts.compare_intent import COMPARE_INTENT_PROMPT
-from agent.prompts.search_recommendation_intent import (
-    SEARCH_RECOMMENDATION_INTENT_PROMPT,
-)
+
+from agent.model_client import ModelUnavailable, model_client
+from agent.prompt_registry import prompt_registry
 
 from agent.tools.supabase_tools import (
     fetch_phone_details,
@@ -26,112 +18,172 @@ from agent.tools.supabase_tools import (
 )
 
 from agent.models.intent_classification_response import IntentClassificationResponse
+from agent.models.fused_router_response import FusedRouterResponse
+from agent.models.tool_artifacts import ToolArtifact
 
+from agent.fast_path_classifier import fast_path_classifier
+from agent.speculation import should_speculate, speculation_tracker
 from agent.state import AgentState
+from agent.tracing import record_cache_lookup, request_trace
+from core.blocking import run_blocking
+from core.config import settings
+from core.deadline import request_deadline, within_deadline
+from core.response_cache import response_cache
 
 logger = logging.getLogger(__name__)
 
 # CHAT MODELS
-intent_classification_model = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash"
-).with_structured_output(schema=IntentClassificationResponse, method="json_mode")
-
-string_response_model = ChatGoogleGenerativeAI(model="gemini-2.5-flash")
-
-tool_selection_model = ChatGoogleGenerativeAI(model="gemini-2.5-flash").bind_tools(
+# One per node, from its profile in `settings.MODEL_PROFILES`; `model_client` adds timeouts,
+# retries, hedging, fallback and the breakers.
+# Structured output keeps the raw message so `prompt_registry` can record token usage
+intent_classification_model = model_client.for_node("intent_classification", lambda model: model.with_structured_output(
+    schema=IntentClassificationResponse, method="json_mode", include_raw=True
+))
+
+tool_selection_model = model_client.for_node("tool_selection", lambda model: model.bind_tools(
     [fetch_phone_details, fetch_recommendations, compare_phones]
-)
+))
+
+fused_router_model = model_client.for_node("fused_router", lambda model: model.with_structured_output(
+    schema=FusedRouterResponse, method="json_mode", include_raw=True
+))
+
+# Streamed to the user, so never hedged
+response_models = {
+    intent: model_client.for_node(intent, hedge=False)
+    for intent in ["chitchat", "query", "irrelevant", "adversarial", "details", "search_recommendation", "compare"]
+}
+
+TOOLS_BY_NAME = {
+    tool.name: tool
+    for tool in [fetch_phone_details, fetch_recommendations, compare_phones]
+}
+
+SIMPLE_INTENTS = ["chitchat", "query", "irrelevant", "adversarial"]
+
+# Nodes that set the classified intent
+ROUTER_NODES = {"Fast Path Classifier", "Intent Classifier", "Fused Router", "Speculative Router"}
+
+
+# Nodes whose model output is the final answer shown to the user
+RESPONSE_NODES = {
+    "Handle ChitChat Intent",
+    "Handle Query Intent",
+    "Handle Irrelevant Intent",
+    "Handle Adversarial Intent",
+    "Handle Details Intent",
+    "Handle Search/Recommendation Intent",
+    "Handle Compare Intent",
+}
+
+
+def tool_artifact(tool_message: ToolMessage) -> Optional[ToolArtifact]:
+    """Structured tool output for the frontend, by reference; None when the tool failed"""
+    return tool_message.artifact
+
+
+async def call_response_cache(method: Callable[..., Any], *args: Any) -> Any:
+    """Call a response cache method, on the blocking pool when it may block"""
+    if response_cache.blocking:
+        return await run_blocking(method, *args)
+    return method(*args)
+
+
+async def cached_simple_response(intent: str, state: AgentState) -> AgentState:
+    """Answer a stateless intent from the response cache, or generate and cache it"""
+    query = str(state["messages"][-1].content)
+    # The answer may depend on the earlier turns the model sees, so they are part of the key
+    context = get_buffer_string(state["messages"][:-1])
+    if settings.RESPONSE_CACHE_ENABLED:
+        cached = await call_response_cache(response_cache.get, intent, query, context)
+        record_cache_lookup("response", cached is not None)
+        if cached is not None:
+            return {
+                "messages": [AIMessage(content=cached)],
+                "response": cached,
+                "context_data": None,
+            }
+
+    response = await prompt_registry.ainvoke(intent, response_models[intent], state["messages"])
+    if settings.RESPONSE_CACHE_ENABLED:
+        await call_response_cache(response_cache.put, intent, query, response.text, context)
+    return {"messages": [response], "response": response.content, "context_data": None}
 
 
 # NODES
-def intent_classification(state: AgentState) -> AgentState:
+async def fast_path_classification(state: AgentState) -> AgentState:
+    """Resolve high-confidence intents locally, without a model call"""
+    result = fast_path_classifier.classify(state["messages"])
+    if result is None:
+        return {"intent": None}
+    intent, rule, confidence = result
+    logger.info(f"Classified intent (fast path, {rule}, {confidence:.2f}): {intent}")
+    return {"intent": intent}
+
+
+async def intent_classification(state: AgentState) -> AgentState:
     """Classify the intent of the user's message"""
-    system_prompt = SystemMessage(content=INTENT_CLASSIFICATION_PROMPT)
-    response: IntentClassificationResponse = intent_classification_model.invoke(
-        [system_prompt] + state["messages"]
+    response: IntentClassificationResponse = await prompt_registry.ainvoke(
+        "intent_classification", intent_classification_model, state["messages"]
     )
     classified_intent = response.intent
     logger.info(f"Classified intent: {classified_intent}")
     return {"intent": classified_intent}
 
 
-def handle_chitchat_intent(state: AgentState) -> AgentState:
+async def handle_chitchat_intent(state: AgentState) -> AgentState:
     """Handle chitchat intent"""
-    system_prompt = SystemMessage(content=CHITCHAT_INTENT_PROMPT)
-    response = string_response_model.invoke([system_prompt] + state["messages"])
+    response = await prompt_registry.ainvoke("chitchat", response_models["chitchat"], state["messages"])
     return {"messages": [response], "response": response.content, "context_data": None}
 
 
-def handle_query_intent(state: AgentState) -> AgentState:
+async def handle_query_intent(state: AgentState) -> AgentState:
     """Handle query intent"""
-    system_prompt = SystemMessage(content=QUERY_INTENT_PROMPT)
-    response = string_response_model.invoke([system_prompt] + state["messages"])
-    return {"messages": [response], "response": response.content, "context_data": None}
+    return await cached_simple_response("query", state)
 
 
-def handle_irrelevant_intent(state: AgentState) -> AgentState:
+async def handle_irrelevant_intent(state: AgentState) -> AgentState:
     """Handle irrelevant intent"""
-    system_prompt = SystemMessage(content=IRRELEVANT_INTENT_PROMPT)
-    response = string_response_model.invoke([system_prompt] + state["messages"])
-    return {"messages": [response], "response": response.content, "context_data": None}
+    return await cached_simple_response("irrelevant", state)
 
 
-def handle_adversarial_intent(state: AgentState) -> AgentState:
+async def handle_adversarial_intent(state: AgentState) -> AgentState:
     """Handle adversarial intent"""
-    system_prompt = SystemMessage(content=ADVERSARIAL_INTENT_PROMPT)
-    response = string_response_model.invoke([system_prompt] + state["messages"])
-    return {"messages": [response], "response": response.content, "context_data": None}
+    return await cached_simple_response("adversarial", state)
 
 
-def handle_details_intent(state: AgentState) -> AgentState:
+async def handle_details_intent(state: AgentState) -> AgentState:
     """Handle details intent with tool data"""
-    system_prompt = SystemMessage(content=DETAILS_INTENT_PROMPT)
-    response = string_response_model.invoke([system_prompt] + state["messages"])
-    last_message: ToolMessage = state["messages"][-1]
-    output_data = json.loads(last_message.content)
-    if isinstance(output_data, dict) and "error" in output_data:
-        output_data = None
+    response = await prompt_registry.ainvoke("details", response_models["details"], state["messages"])
     return {
         "messages": [response],
         "response": response.content,
-        "context_data": output_data,
+        "context_data": tool_artifact(state["messages"][-1]),
     }
 
 
-def handle_search_recommendation_intent(state: AgentState) -> AgentState:
+async def handle_search_recommendation_intent(state: AgentState) -> AgentState:
     """Handle search/recommendation intent with tool data"""
-    system_prompt = SystemMessage(content=SEARCH_RECOMMENDATION_INTENT_PROMPT)
-    response = string_response_model.invoke([system_prompt] + state["messages"])
-    last_message: ToolMessage = state["messages"][-1]
-    output_data = json.loads(last_message.content)
-    if isinstance(output_data, dict) and "error" in output_data:
-        output_data = None
+    response = await prompt_registry.ainvoke("search_recommendation", response_models["search_recommendation"], state["messages"])
     return {
         "messages": [response],
         "response": response.content,
-        "context_data": output_data,
+        "context_data": tool_artifact(state["messages"][-1]),
     }
 
 
-def handle_compare_intent(state: AgentState) -> AgentState:
+async def handle_compare_intent(state: AgentState) -> AgentState:
     """Handle compare intent with tool data"""
-    system_prompt = SystemMessage(content=COMPARE_INTENT_PROMPT)
-    response = string_response_model.invoke([system_prompt] + state["messages"])
-    last_message: ToolMessage = state["messages"][-1]
-    output_data = json.loads(last_message.content)
-    if isinstance(output_data, dict) and "error" in output_data:
-        output_data = None
+    response = await prompt_registry.ainvoke("compare", response_models["compare"], state["messages"])
     return {
         "messages": [response],
         "response": response.content,
-        "context_data": output_data,
+        "context_data": tool_artifact(state["messages"][-1]),
     }
 
 
-def prepare_tool_call(state: AgentState) -> AgentState:
-    """Prepare tool call based on user intent"""
-    system_prompt = SystemMessage(content=TOOL_SELECTION_PROMPT)
-    response = tool_selection_model.invoke([system_prompt] + state["messages"])
+def tool_selection_update(response: AIMessage) -> AgentState:
+    """State update for a tool-selection answer: a tool call or a clarifying question"""
     response_message = None
     if not response.tool_calls:
         response_message = response.content[0]['text']
@@ -140,7 +192,101 @@ def prepare_tool_call(state: AgentState) -> AgentState:
     return {"messages": [response], "response": response_message, "context_data": None}
 
 
-def handle_simple_intent(state: AgentState) -> AgentState:
+async def prepare_tool_call(state: AgentState) -> AgentState:
+    """Prepare tool call based on user intent"""
+    response = await prompt_registry.ainvoke("tool_selection", tool_selection_model, state["messages"])
+    return tool_selection_update(response)
+
+
+async def speculative_router(state: AgentState) -> AgentState:
+    """Classify intent, selecting the tool at the same time when the turn looks data-based.
+
+    The tool selection is kept for data intents and cancelled or discarded
+    for simple ones. Without speculation only the intent is set and the
+    graph continues to Database API Call Preparation as in two-stage routing.
+    """
+    messages = state["messages"]
+    selection = None
+    if should_speculate(messages):
+        selection = asyncio.create_task(
+            prompt_registry.ainvoke("tool_selection", tool_selection_model, messages)
+        )
+    try:
+        response: IntentClassificationResponse = await prompt_registry.ainvoke(
+            "intent_classification", intent_classification_model, messages
+        )
+    except BaseException:
+        if selection is not None:
+            selection.cancel()
+        raise
+    intent = response.intent
+    logger.info(f"Classified intent (speculative): {intent}")
+
+    if selection is None:
+        speculation_tracker.record("skipped" if intent in SIMPLE_INTENTS else "skipped_data")
+        return {"intent": intent}
+
+    if intent in SIMPLE_INTENTS:
+        discarded = None
+        if selection.done() and not selection.cancelled() and selection.exception() is None:
+            discarded = selection.result()
+        cancelled = selection.cancel()
+        speculation_tracker.record("miss", discarded=discarded, cancelled=cancelled)
+        return {"intent": intent}
+
+    speculation_tracker.record("hit")
+    return {"intent": intent, **tool_selection_update(await selection)}
+
+
+async def fused_router(state: AgentState) -> AgentState:
+    """Classify intent and prepare the tool call in a single model call.
+
+    Leaves `intent` unset when the model output fails validation, so the graph
+    falls back to the two-stage Intent Classifier / Database API Call
+    Preparation path.
+    """
+    try:
+        response: FusedRouterResponse = await prompt_registry.ainvoke(
+            "fused_router", fused_router_model, state["messages"]
+        )
+        if response.intent in SIMPLE_INTENTS:
+            logger.info(f"Classified intent (fused): {response.intent}")
+            return {"intent": response.intent}
+
+        if response.tool_name:
+            tool_args = TOOLS_BY_NAME[response.tool_name].args_schema.model_validate(
+                response.tool_args or {}
+            ).model_dump(exclude_none=True)
+            message = AIMessage(
+                content="",
+                tool_calls=[{
+                    "name": response.tool_name,
+                    "args": tool_args,
+                    "id": f"call_{uuid.uuid4().hex}",
+                }],
+            )
+            response_message = ""
+        elif response.clarification:
+            message = AIMessage(content=response.clarification)
+            response_message = response.clarification
+        else:
+            raise ValueError("Data intent without a tool call or clarification")
+    except ModelUnavailable:
+        raise
+    except Exception as e:
+        logger.warning(f"Fused router failed, falling back to two-stage routing: {e}")
+        return {"intent": None}
+
+    logger.info(f"Classified intent (fused): {response.intent}")
+    return {
+        "intent": response.intent,
+        "messages": [message],
+        "response": response_message,
+        "context_data": None,
+    }
+
+
+async def handle_simple_intent(state: AgentState) -> AgentState:
     """Pass through for simple intents"""
     return state
 
@@ -156,46 +302,131 @@ def should_proceed_with_tool_call(state: AgentState) -> str:
 
 def redirect_to_intent_type_handler(state: AgentState) -> str:
     """Route to simple or data-based intent handlers"""
-    if state.get("intent") in ["chitchat", "query", "irrelevant", "adversarial"]:
+    if state.get("intent") in SIMPLE_INTENTS:
         return "Simple Intents"
     else:
         return "Data Based Intents"
 
 
+def redirect_after_fast_path(state: AgentState) -> str:
+    """Route fast-path output, or hand over to the model-based router"""
+    if state.get("intent") is None:
+        return "Unresolved"
+    return redirect_to_intent_type_handler(state)
+
+
+def redirect_after_fused_router(state: AgentState) -> str:
+    """Route fused router output, or fall back to the two-stage router"""
+    if state.get("intent") is None:
+        return "Fallback"
+    if state.get("intent") in SIMPLE_INTENTS:
+        return "Simple Intents"
+    return should_proceed_with_tool_call(state)
+
+
+def redirect_after_speculative_router(state: AgentState) -> str:
+    """Route speculative router output; data intents without a selected tool still need one"""
+    if state.get("intent") in SIMPLE_INTENTS:
+        return "Simple Intents"
+    if isinstance(state["messages"][-1], HumanMessage):
+        return "Data Based Intents"
+    return should_proceed_with_tool_call(state)
+
+
 def redirect_to_specific_intent_handler(state: AgentState) -> str:
     """Route to specific intent handler"""
     return state.get("intent")
 
 
 # BUILD THE GRAPH
-def create_graph():
-    """Create and compile the agent graph"""
+def with_node_deadline(name: str, node: Callable[[AgentState], Awaitable[AgentState]]):
+    """Run `node` within the request deadline, and at most NODE_TIMEOUT seconds"""
+    @functools.wraps(node)
+    async def run(state: AgentState) -> AgentState:
+        return await within_deadline(node(state), name, settings.NODE_TIMEOUT)
+    return run
+
+
+def create_graph(router_mode: Optional[str] = None):
+    """
+    Create and compile the agent graph
+
+    Args:
+        router_mode: "two_stage", "fused" or "speculative"; defaults to settings.ROUTER_MODE
+    """
+    router_mode = router_mode or settings.ROUTER_MODE
     graph = StateGraph(AgentState)
     tool_node = ToolNode(
         tools=[fetch_phone_details, fetch_recommendations, compare_phones]
     )
 
+    def add_node(name: str, node: Callable[[AgentState], Awaitable[AgentState]]):
+        graph.add_node(name, with_node_deadline(name, node))
+
     # ADD NODES
-    graph.add_node("Fetch Data", tool_node)
-    graph.add_node("Database API Call Preparation", prepare_tool_call)
-    graph.add_node("Intent Classifier", intent_classification)
-    graph.add_node("Handle Simple Intent", handle_simple_intent)
+    graph.add_node("Fetch Data", tool_node)  # bounded by the request deadline only
+    add_node("Database API Call Preparation", prepare_tool_call)
+    add_node("Intent Classifier", intent_classification)
+    add_node("Handle Simple Intent", handle_simple_intent)
+    if router_mode == "fused":
+        add_node("Fused Router", fused_router)
+    if router_mode == "speculative":
+        add_node("Speculative Router", speculative_router)
+    if settings.FAST_PATH_ENABLED:
+        add_node("Fast Path Classifier", fast_path_classification)
 
     # SIMPLE RESPONSE INTENT NODES
-    graph.add_node("Handle ChitChat Intent", handle_chitchat_intent)
-    graph.add_node("Handle Query Intent", handle_query_intent)
-    graph.add_node("Handle Irrelevant Intent", handle_irrelevant_intent)
-    graph.add_node("Handle Adversarial Intent", handle_adversarial_intent)
+    add_node("Handle ChitChat Intent", handle_chitchat_intent)
+    add_node("Handle Query Intent", handle_query_intent)
+    add_node("Handle Irrelevant Intent", handle_irrelevant_intent)
+    add_node("Handle Adversarial Intent", handle_adversarial_intent)
 
     # DATA BASED RESPONSE INTENT NODES
-    graph.add_node("Handle Details Intent", handle_details_intent)
-    graph.add_node(
-        "Handle Search/Recommendation Intent", handle_search_recommendation_intent
-    )
-    graph.add_node("Handle Compare Intent", handle_compare_intent)
+    add_node("Handle Details Intent", handle_details_intent)
+    add_node("Handle Search/Recommendation Intent", handle_search_recommendation_intent)
+    add_node("Handle Compare Intent", handle_compare_intent)
 
     # ADD EDGES
-    graph.add_edge(START, "Intent Classifier")
+    model_router = {
+        "fused": "Fused Router",
+        "speculative": "Speculative Router",
+    }.get(router_mode, "Intent Classifier")
+    if settings.FAST_PATH_ENABLED:
+        graph.add_edge(START, "Fast Path Classifier")
+        graph.add_conditional_edges(
+            "Fast Path Classifier",
+            redirect_after_fast_path,
+            {
+                "Unresolved": model_router,
+                "Simple Intents": "Handle Simple Intent",
+                "Data Based Intents": "Database API Call Preparation",
+            },
+        )
+    else:
+        graph.add_edge(START, model_router)
+
+    if router_mode == "fused":
+        graph.add_conditional_edges(
+            "Fused Router",
+            redirect_after_fused_router,
+            {
+                "Fallback": "Intent Classifier",
+                "Simple Intents": "Handle Simple Intent",
+                "Have Clarity": "Fetch Data",
+                "Need Clarity": END,
+            },
+        )
+    if router_mode == "speculative":
+        graph.add_conditional_edges(
+            "Speculative Router",
+            redirect_after_speculative_router,
+            {
+                "Simple Intents": "Handle Simple Intent",
+                "Data Based Intents": "Database API Call Preparation",
+                "Have Clarity": "Fetch Data",
+                "Need Clarity": END,
+            },
+        )
     graph.add_conditional_edges(
         "Intent Classifier",
         redirect_to_intent_type_handler,
@@ -250,6 +481,36 @@ def create_graph():
 app = create_graph()
 
 
+def run_config(trace) -> Dict[str, Any]:
+    """Graph run config that reports node timings to `trace`, if any"""
+    return {"callbacks": [trace.handler]} if trace is not None else {}
+
+
+def build_initial_state(message: str, conversation_history: list) -> AgentState:
+    """Build the graph input from the conversation history and the new message"""
+    # Convert conversation history to proper message format
+    messages = conversation_history.copy()
+    messages.append(HumanMessage(content=message))
+
+    return {
+        "messages": messages,
+        "intent": None,
+        "response": "",
+        "context_data": None,
+    }
+
+
+def unavailable_result(conversation_history: list) -> Dict[str, Any]:
+    """Canned answer while the model circuit breaker is open; the turn is not stored"""
+    return {
+        "intent": None,
+        "response": settings.MODEL_UNAVAILABLE_RESPONSE,
+        "context_data": None,
+        "messages": list(conversation_history),
+        "trace": None,
+    }
+
+
 async def process_message(message: str, conversation_history: list) -> Dict[str, Any]:
     """
     Process a user message through the agent graph
@@ -259,31 +520,95 @@ async def process_message(message: str, conversation_history: list) -> Dict[str,
         conversation_history: List of previous messages in the conversation
 
     Returns:
-        Dictionary containing intent, response, context_data, and updated messages
+        Dictionary containing intent, response, context_data, updated messages,
+        and the per-node trace (None when tracing is disabled)
     """
     try:
-        # Convert conversation history to proper message format
-        messages = conversation_history.copy()
-        messages.append(HumanMessage(content=message))
-
-        # Initial state
-        initial_state = {
-            "messages": messages,
-            "intent": None,
-            "response": "",
-            "context_data": None,
-        }
+        initial_state = build_initial_state(message, conversation_history)
 
-        # Run the graph
-        result = await app.ainvoke(initial_state)
+        # Run the graph; nodes inherit the deadline and are cancelled with this call
+        with request_trace() as trace, request_deadline(settings.REQUEST_TIMEOUT):
+            result = await within_deadline(
+                app.ainvoke(initial_state, config=run_config(trace)), "graph"
+            )
 
         return {
             "intent": result.get("intent"),
             "response": result.get("response", ""),
             "context_data": result.get("context_data"),
             "messages": result.get("messages", []),
+            "trace": trace.finish(result.get("intent")) if trace is not None else None,
         }
 
+    except ModelUnavailable as e:
+        logger.warning(f"Answering with the canned response: {e}")
+        return unavailable_result(conversation_history)
     except Exception as e:
         logger.error(f"Error in process_message: {e}", exc_info=True)
         raise
+
+
+
+async def stream_message(
+    message: str, conversation_history: list
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Process a user message through the agent graph, yielding events as they happen
+
+    Yields dictionaries with an "event" key:
+        - "intent": the classified intent, as soon as the classifier finishes
+        - "context_data": tool output, as soon as Fetch Data returns
+        - "token": a chunk of the final response text
+        - "done": the final intent, response, context_data, updated messages and trace
+    """
+    try:
+        initial_state = build_initial_state(message, conversation_history)
+
+        with request_trace() as trace, request_deadline(settings.REQUEST_TIMEOUT):
+            events = app.astream_events(initial_state, config=run_config(trace), version="v2")
+            try:
+                # Each node enforces the deadline, so it also ends a stream that runs over
+                async for event in events:
+                    kind = event["event"]
+                    name = event.get("name")
+
+                    if kind == "on_chat_model_stream":
+                        if event.get("metadata", {}).get("langgraph_node") in RESPONSE_NODES:
+                            text = event["data"]["chunk"].text
+                            if text:
+                                yield {"event": "token", "text": text}
+
+                    elif kind == "on_chain_end" and name in ROUTER_NODES:
+                        intent = event["data"]["output"].get("intent")
+                        if intent is not None:
+                            yield {"event": "intent", "intent": intent}
+
+                    elif kind == "on_chain_end" and name == "Fetch Data":
+                        tool_messages = event["data"]["output"]["messages"]
+                        yield {
+                            "event": "context_data",
+                            "context_data": tool_artifact(tool_messages[-1]),
+                        }
+
+                    elif kind == "on_chain_end" and not event.get("parent_ids"):
+                        result = event["data"]["output"]
+                        yield {
+                            "event": "done",
+                            "intent": result.get("intent"),
+                            "response": result.get("response", ""),
+                            "context_data": result.get("context_data"),
+                            "messages": result.get("messages", []),
+                            "trace": trace.finish(result.get("intent")) if trace is not None else None,
+                        }
+            finally:
+                # Stops the graph, cancelling in-flight nodes, when the consumer goes away early
+                await events.aclose()
+
+    except ModelUnavailable as e:
+        logger.warning(f"Answering with the canned response: {e}")
+        result = unavailable_result(conversation_history)
+        yield {"event": "token", "text": result["response"]}
+        yield {"event": "done", **result}
+    except Exception as e:
+        logger.error(f"Error in stream_message: {e}", exc_info=True)
+        raise
@@ -0,0 +1,471 @@
+"""
+Resilient access to Gemini, shared by every node.
+
+Each model-calling node gets its client from `model_client.for_node(name)`,
+built from the node's profile in `settings.MODEL_PROFILES` (model, output
+token limit, temperature, thinking budget and fallback model).
+An asynchronous call then gets:
+    - a timeout per attempt (MODEL_CALL_TIMEOUT, shortened to the request's
+      remaining deadline)
+    - up to MODEL_MAX_RETRIES retries on timeouts, 5xx and rate limits, after
+      a full-jitter exponential backoff
+    - optionally a hedged second request, sent when the first has not
+      answered after the model's recent p95 latency; the first answer wins and
+      the other request is cancelled
+    - a circuit breaker per Gemini model, shared by all nodes: after
+      MODEL_BREAKER_FAILURE_THRESHOLD failed attempts in a row every call to
+      that model fails fast for MODEL_BREAKER_RESET_TIMEOUT seconds, then a
+      single trial call decides whether it closes again. An attempt cut
+      short by the request's deadline does not count as a failure
+    - a fallback model: when the profile names one, a failed or
+      short-circuited call moves on to it at once instead of retrying, and
+      the retries are spent there. `ModelUnavailable` is raised only when
+      every model of the node is short-circuited
+
+Hedging is off for models whose output is streamed to the user, since the
+tokens of two racing requests would interleave. For the same reason, a call
+that has already streamed output is neither retried nor sent to the fallback
+when it fails; the error is raised instead. The Gemini clients are created
+with a single attempt of their own, so retries are only done here.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from threading import Lock
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from google.api_core import exceptions as google_exceptions
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables.config import ensure_config
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from agent.tracing import llm_cost
+from core.config import ModelProfile, settings
+from core.deadline import remaining
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CALLS = metrics.counter(
+    "chatbot_model_calls_total",
+    "Model calls by outcome (ok, retried_ok, hedged_ok, fallback_ok, failed, timeout, short_circuited)",
+    ["model", "outcome"],
+)
+ATTEMPTS = metrics.counter(
+    "chatbot_model_attempts_total", "Model requests sent, including retries, hedges and fallbacks",
+    ["model", "kind"],
+)
+BREAKER_STATE = metrics.gauge(
+    "chatbot_model_breaker_open", "1 while a Gemini model's circuit breaker is open or half-open", ["model"]
+)
+
+# Timeouts, 5xx responses and rate limits; anything else is the caller's fault and is not retried
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    ConnectionError,
+    google_exceptions.ServerError,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+)
+NON_RETRYABLE_ERRORS = (google_exceptions.MethodNotImplemented,)
+
+# Latencies kept per model for the hedge delay
+LATENCY_WINDOW = 200
+
+
+def is_retryable(error: BaseException) -> bool:
+    return isinstance(error, RETRYABLE_ERRORS) and not isinstance(error, NON_RETRYABLE_ERRORS)
+
+
+class ModelUnavailable(Exception):
+    """The circuit breaker is open; the model is not called"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Model circuit breaker open, retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, then lets one trial call through after a cool-down"""
+
+    def __init__(self, model: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.model = model
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def before_call(self):
+        """Raise ModelUnavailable unless a call may go ahead"""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            waited = time.monotonic() - self._opened_at
+            if waited < self.reset_timeout or self._trial_running:
+                raise ModelUnavailable(max(1.0, self.reset_timeout - waited))
+            self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self._opened_at is not None:
+                logger.info(f"Circuit breaker for {self.model} closed")
+            self._opened_at = None
+            self._trial_running = False
+        BREAKER_STATE.set(0, model=self.model)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or (self._opened_at is None and self._failures >= self.failure_threshold):
+                if self._opened_at is None:
+                    self.times_opened += 1
+                    logger.warning(f"Circuit breaker for {self.model} opened after {self._failures} failed attempts")
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+        if self._opened_at is not None:
+            BREAKER_STATE.set(1, model=self.model)
+
+    def release_trial(self):
+        """Give up a trial call that ended without a verdict (e.g. cancelled)"""
+        with self._lock:
+            self._trial_running = False
+
+
+def _usage(result: Any) -> Dict[str, Any]:
+    """Token usage of a model result, including `include_raw` structured output"""
+    raw = result.get("raw") if isinstance(result, dict) else result
+    return getattr(raw, "usage_metadata", None) or {}
+
+
+class ModelTarget:
+    """One Gemini model a node can call, with its recent latencies and usage"""
+
+    def __init__(self, model: str, chat_model: Any, prepare: Optional[Callable[[Any], Any]], breaker: CircuitBreaker):
+        self.model = model
+        self.chat_model = chat_model
+        self.prepare = prepare
+        self.runnable = prepare(chat_model) if prepare is not None else chat_model
+        self.breaker = breaker
+        self._cached_runnable: Optional[Tuple[str, Any]] = None
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._usage = {"calls": 0, "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0, "cost_usd": 0.0}
+
+    def runnable_for(self, cached_content: Optional[str]) -> Any:
+        """
+        The runnable to call, with an explicitly cached prompt set on the chat model itself
+
+        Passing `cached_content` as a call kwarg is not enough: structured
+        output with `include_raw` starts with a RunnableParallel that does not
+        forward kwargs to the model, and `.bind()` is lost when the
+        structured-output or tool wrapper is applied on top.
+        """
+        if cached_content is None:
+            return self.runnable
+        if self._cached_runnable is None or self._cached_runnable[0] != cached_content:
+            chat_model = self.chat_model.model_copy(update={"cached_content": cached_content})
+            runnable = self.prepare(chat_model) if self.prepare is not None else chat_model
+            self._cached_runnable = (cached_content, runnable)
+        return self._cached_runnable[1]
+
+    def record(self, result: Any):
+        usage = _usage(result)
+        input_tokens = usage.get("input_tokens", 0)
+        cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+        output_tokens = usage.get("output_tokens", 0)
+        self._usage["calls"] += 1
+        self._usage["input_tokens"] += input_tokens
+        self._usage["cached_tokens"] += cached
+        self._usage["output_tokens"] += output_tokens
+        self._usage["cost_usd"] += llm_cost(self.model, input_tokens, cached, output_tokens)
+
+    def latency_quantile(self, quantile: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(quantile * len(ordered)))]
+
+    def stats(self) -> Dict[str, Any]:
+        p50, p95 = self.latency_quantile(0.5), self.latency_quantile(0.95)
+        return {
+            **self._usage,
+            "cost_usd": round(self._usage["cost_usd"], 6),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+class _StreamWatch(BaseCallbackHandler):
+    """Notes whether a call has streamed output to its callbacks (and so to the user)"""
+
+    run_inline = True
+
+    def __init__(self):
+        self.streamed = False
+
+    def on_llm_new_token(self, token: str, **kwargs: Any):
+        self.streamed = True
+
+    def config(self, config: Any) -> Dict[str, Any]:
+        """`config`, or the inherited one, with this handler added to its callbacks"""
+        config = ensure_config(config)
+        callbacks = config.get("callbacks")
+        if callbacks is None:
+            callbacks = [self]
+        elif isinstance(callbacks, list):
+            callbacks = [*callbacks, self]
+        else:
+            # ensure_config already copied the manager
+            callbacks.add_handler(self, inherit=True)
+        return {**config, "callbacks": callbacks}
+
+
+class ResilientModel:
+    """A node's model (and fallback) called through `ModelClient`"""
+
+    def __init__(self, name: str, profile: str, targets: List[ModelTarget], hedge: bool):
+        self.name = name
+        self.profile = profile
+        self.targets = targets
+        self.hedge = hedge
+        self._counters: Dict[str, int] = {}
+
+    def _count(self, outcome: str):
+        CALLS.inc(model=self.name, outcome=outcome)
+        self._counters[outcome] = self._counters.get(outcome, 0) + 1
+
+    def hedge_delay(self, target: ModelTarget) -> Optional[float]:
+        """Seconds to wait before hedging, or None when hedging is off or latencies are unknown"""
+        if not (self.hedge and settings.MODEL_HEDGE_ENABLED):
+            return None
+        if len(target.latencies) < settings.MODEL_HEDGE_MIN_SAMPLES:
+            return None
+        return max(settings.MODEL_HEDGE_MIN_DELAY, target.latency_quantile(settings.MODEL_HEDGE_QUANTILE))
+
+    async def _attempt(
+        self, target: ModelTarget, runnable: Any, input: Any, config: Any, kwargs: Dict[str, Any], timeout: float
+    ):
+        """One attempt, possibly hedged; returns (result, hedged)"""
+        started = time.monotonic()
+        pending = {asyncio.ensure_future(runnable.ainvoke(input, config, **kwargs))}
+        hedge_delay = self.hedge_delay(target)
+        hedged = False
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                wait = started + timeout - time.monotonic()
+                if hedge_delay is not None and not hedged:
+                    wait = min(wait, started + hedge_delay - time.monotonic())
+                done, pending = await asyncio.wait(pending, timeout=max(0.0, wait), return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    if task.cancelled():
+                        continue
+                    if task.exception() is None:
+                        target.latencies.append(time.monotonic() - started)
+                        return task.result(), hedged
+                    error = error or task.exception()
+
+                if time.monotonic() - started >= timeout:
+                    raise asyncio.TimeoutError(f"{self.name} did not answer within {timeout:.1f}s")
+                if hedge_delay is not None and not hedged and not done:
+                    # Still waiting on the first request: race a second one against it
+                    hedged = True
+                    ATTEMPTS.inc(model=self.name, kind="hedge")
+                    pending.add(asyncio.ensure_future(runnable.ainvoke(input, config, **kwargs)))
+            raise error or asyncio.CancelledError()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _call(
+        self, target: ModelTarget, runnable: Any, input: Any, config: Any, kwargs: Dict[str, Any], max_retries: int,
+        watch: _StreamWatch,
+    ) -> Tuple[Any, str]:
+        """Call one target with retries; returns (result, outcome)"""
+        target.breaker.before_call()
+        retries = 0
+        while True:
+            timeout = settings.MODEL_CALL_TIMEOUT
+            budget = remaining()
+            cut_by_deadline = budget is not None and budget < timeout
+            if cut_by_deadline:
+                timeout = budget
+            try:
+                result, hedged = await self._attempt(target, runnable, input, config, kwargs, timeout)
+            except asyncio.CancelledError:
+                target.breaker.release_trial()
+                raise
+            except Exception as e:
+                if not is_retryable(e) or (cut_by_deadline and isinstance(e, asyncio.TimeoutError)):
+                    # The request itself was bad, or the caller ran out of time before
+                    # the model's own timeout; neither says Gemini is unhealthy
+                    target.breaker.release_trial()
+                    raise
+                target.breaker.record_failure()
+                backoff = random.uniform(0, settings.MODEL_RETRY_BASE_DELAY * 2 ** retries)
+                budget = remaining()
+                if retries >= max_retries or watch.streamed or (budget is not None and budget <= backoff):
+                    raise
+                retries += 1
+                logger.warning(f"Model call {self.name} to {target.model} failed ({e!r}), retry {retries} in {backoff:.2f}s")
+                await asyncio.sleep(backoff)
+                target.breaker.before_call()
+                ATTEMPTS.inc(model=self.name, kind="retry")
+                continue
+
+            target.breaker.record_success()
+            target.record(result)
+            return result, "hedged_ok" if hedged else "retried_ok" if retries else "ok"
+
+    async def ainvoke(self, input: Any, config: Any = None, cached_content: Optional[str] = None, **kwargs: Any) -> Any:
+        """
+        Call the node's model, falling back as configured
+
+        Args:
+            cached_content: handle of an explicitly cached system prompt (see `prompt_registry`).
+                It belongs to the primary model, so the fallback is not tried with it
+        """
+        targets = self.targets[:1] if cached_content is not None else self.targets
+        watch = _StreamWatch()
+        config = watch.config(config)
+        for index, target in enumerate(targets):
+            last = index == len(targets) - 1
+            ATTEMPTS.inc(model=self.name, kind="fallback" if index else "primary")
+            try:
+                result, outcome = await self._call(
+                    target, target.runnable_for(cached_content), input, config, kwargs,
+                    settings.MODEL_MAX_RETRIES if last else 0, watch,
+                )
+            except ModelUnavailable:
+                if last:
+                    self._count("short_circuited")
+                    raise
+                continue
+            except Exception as e:
+                # Output already streamed can't be taken back, so another model must not add to it;
+                # with the request's budget spent, the fallback could not answer either
+                if last or watch.streamed or not is_retryable(e) or remaining() == 0:
+                    self._count("timeout" if isinstance(e, asyncio.TimeoutError) else "failed")
+                    raise
+                logger.warning(f"Model call {self.name} to {target.model} failed ({e!r}), falling back to {targets[index + 1].model}")
+                continue
+            self._count("fallback_ok" if index else outcome)
+            return result
+
+    def invoke(self, input: Any, config: Any = None, cached_content: Optional[str] = None, **kwargs: Any) -> Any:
+        """Synchronous call; only the breakers and fallback apply, as timeouts and hedging need the event loop"""
+        targets = self.targets[:1] if cached_content is not None else self.targets
+        watch = _StreamWatch()
+        config = watch.config(config)
+        for index, target in enumerate(targets):
+            last = index == len(targets) - 1
+            try:
+                target.breaker.before_call()
+            except ModelUnavailable:
+                if last:
+                    self._count("short_circuited")
+                    raise
+                continue
+            try:
+                result = target.runnable_for(cached_content).invoke(input, config, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    target.breaker.release_trial()
+                    self._count("failed")
+                    raise
+                target.breaker.record_failure()
+                if last or watch.streamed:
+                    self._count("failed")
+                    raise
+                continue
+            target.breaker.record_success()
+            target.record(result)
+            self._count("fallback_ok" if index else "ok")
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        delay = self.hedge_delay(self.targets[0])
+        return {
+            **self._counters,
+            "profile": self.profile,
+            "hedge_delay_ms": round(delay * 1000, 1) if delay is not None else None,
+            "targets": {target.model: target.stats() for target in self.targets},
+        }
+
+
+class ModelClient:
+    """Gemini clients per node, with circuit breakers per model shared by all nodes"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._chat_models: Dict[Tuple, Any] = {}
+        self._models: Dict[str, ResilientModel] = {}
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        if model not in self._breakers:
+            self._breakers[model] = CircuitBreaker(model, self.failure_threshold, self.reset_timeout)
+        return self._breakers[model]
+
+    def chat_model(self, model: str, profile: ModelProfile) -> ChatGoogleGenerativeAI:
+        """Gemini client for `model` with the profile's generation settings, shared by nodes that agree"""
+        generation = {
+            key: value
+            for key, value in profile.model_dump(include={"max_output_tokens", "temperature", "thinking_budget"}).items()
+            if value is not None
+        }
+        key = (model, *sorted(generation.items()))
+        if key not in self._chat_models:
+            # A single attempt; retries are done by the client
+            self._chat_models[key] = ChatGoogleGenerativeAI(model=model, max_retries=1, **generation)
+        return self._chat_models[key]
+
+    def for_node(
+        self, name: str, prepare: Optional[Callable[[Any], Any]] = None, hedge: bool = True
+    ) -> ResilientModel:
+        """
+        Build the model for the node whose prompt is `name`, from its profile
+
+        Args:
+            prepare: applied to each Gemini client, e.g. to bind tools or a schema
+            hedge: allow hedged requests; disable for models whose output is streamed
+        """
+        profile_name = settings.NODE_MODEL_PROFILES.get(name, settings.DEFAULT_MODEL_PROFILE)
+        profile = settings.MODEL_PROFILES[profile_name]
+        targets = []
+        for model in filter(None, (profile.model, profile.fallback_model)):
+            targets.append(ModelTarget(model, self.chat_model(model, profile), prepare, self.breaker(model)))
+        wrapped = ResilientModel(name, profile_name, targets, hedge)
+        self._models[name] = wrapped
+        return wrapped
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "breakers": {
+                model: {"state": breaker.state, "opened": breaker.times_opened}
+                for model, breaker in self._breakers.items()
+            },
+            "models": {name: model.stats() for name, model in self._models.items()},
+        }
+
+
+# Global model client instance
+model_client = ModelClient(
+    failure_threshold=settings.MODEL_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=settings.MODEL_BREAKER_RESET_TIMEOUT,
+)
@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import Literal, Optional, Dict, Any
+
+
+class FusedRouterResponse(BaseModel):
+    intent: Literal[
+        "search_recommendation",
+        "compare",
+        "details",
+        "query",
+        "chitchat",
+        "irrelevant",
+        "adversarial"
+    ]
+    tool_name: Optional[
+        Literal["fetch_phone_details", "fetch_recommendations", "compare_phones"]
+    ] = None
+    tool_args: Optional[Dict[str, Any]] = None
+    clarification: Optional[str] = None
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Sequence
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime
 
@@ -68,4 +68,74 @@ class Phone(BaseModel):
                 "released_year": 2024,
             }
         }
-    )
\ No newline at end of file
+    )
+
+
+# Column projections per intent. Each one lists the `Phone` fields a tool
+# fetches and returns. Full details use every field.
+PHONE_DETAIL_FIELDS = tuple(Phone.model_fields)
+
+# Recommendation list cards
+PHONE_CARD_FIELDS = (
+    "id",
+    "name",
+    "brand",
+    "price",
+    "rating",
+    "os",
+    "processor",
+    "network",
+    "display_size_inch",
+    "refresh_rate",
+    "ram_gb",
+    "storage_gb",
+    "battery_mah",
+    "charging_speed_w",
+    "rear_camera_mp",
+    "features",
+    "use_cases",
+)
+
+# Side-by-side comparison: specs plus the pros/cons highlights
+PHONE_SPEC_FIELDS = (
+    "name",
+    "brand",
+    "price",
+    "rating",
+    "display_size_inch",
+    "display_type",
+    "refresh_rate",
+    "processor",
+    "ram_gb",
+    "storage_gb",
+    "battery_mah",
+    "charging_speed_w",
+    "rear_camera_mp",
+    "front_camera_mp",
+    "weight_g",
+    "pros",
+    "cons",
+)
+
+# Bookkeeping fields the frontend may use but the model never needs
+LLM_EXCLUDED_FIELDS = frozenset({"id", "popularity_score"})
+
+for _projection in (PHONE_CARD_FIELDS, PHONE_SPEC_FIELDS):
+    _unknown = set(_projection) - set(PHONE_DETAIL_FIELDS)
+    if _unknown:
+        raise ValueError(f"Projection references unknown Phone fields: {sorted(_unknown)}")
+
+
+def select_columns(fields: Sequence[str]) -> str:
+    """PostgREST `select` clause for a projection"""
+    return ",".join(fields)
+
+
+def project_phone(record: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    """Validate a phone row and keep only the projected, non-null fields"""
+    return Phone(**record).model_dump(include=set(fields), exclude_none=True)
+
+
+def phone_for_llm(phone: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop fields that only matter to the frontend"""
+    return {key: value for key, value in phone.items() if key not in LLM_EXCLUDED_FIELDS}
@@ -0,0 +1,15 @@
+from typing import Any, Dict, List, TypedDict, Union
+
+# A phone row projected by `project_phone`: the non-null Phone fields
+PhoneRecord = Dict[str, Any]
+
+
+class PhoneComparison(TypedDict):
+    """Artifact of compare_phones"""
+    phones: List[PhoneRecord]  # in the order the user gave them
+    winners: Dict[str, List[str]]  # spec -> names of the best phone(s)
+
+
+# fetch_phone_details: one phone; fetch_recommendations: phones, most popular first;
+# compare_phones: a comparison. Passed by reference from the tool to the API response.
+ToolArtifact = Union[PhoneRecord, List[PhoneRecord], PhoneComparison]
@@ -0,0 +1,313 @@
+"""
+System prompts, built once and shared by every call.
+
+Each node's system prompt is registered here at import time as a single
+`SystemMessage` that is reused on every call. Calls always send
+`[system prompt] + history`, so the static prompt is a stable prefix that
+Gemini's implicit prefix caching can reuse.
+
+Long prompts can also be registered with Gemini's explicit context cache
+(`PROMPT_CACHE_BACKEND=gemini`). The prompt is then sent once at startup
+and referenced by cache name afterwards. The default `local` backend is a
+stand-in that keeps every prompt inline.
+
+Every call records its input, cached and output token counts per prompt,
+from the model's usage metadata.
+"""
+import asyncio
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from google.api_core import exceptions as google_exceptions
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+from agent.prompts.adversarial_intent import ADVERSARIAL_INTENT_PROMPT
+from agent.prompts.chitchat_intent import CHITCHAT_INTENT_PROMPT
+from agent.prompts.compare_intent import COMPARE_INTENT_PROMPT
+from agent.prompts.details_intent import DETAILS_INTENT_PROMPT
+from agent.prompts.fused_router import FUSED_ROUTER_PROMPT
+from agent.prompts.history_summary import HISTORY_SUMMARY_PROMPT
+from agent.prompts.intent_classification import INTENT_CLASSIFICATION_PROMPT
+from agent.prompts.irrelevant_intent import IRRELEVANT_INTENT_PROMPT
+from agent.prompts.query_intent import QUERY_INTENT_PROMPT
+from agent.prompts.search_recommendation_intent import SEARCH_RECOMMENDATION_INTENT_PROMPT
+from agent.prompts.tool_selection import TOOL_SELECTION_PROMPT
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class PrefixCache(ABC):
+    """Provider-side store for long, static prompt prefixes"""
+
+    @abstractmethod
+    async def create(self, name: str, model: str, prompt: str, ttl: int) -> Optional[str]:
+        """Cache `prompt` as a system instruction and return its handle, or None to keep it inline"""
+
+    @abstractmethod
+    async def refresh(self, handle: str, ttl: int):
+        """Extend the lifetime of a cached prefix"""
+
+    @abstractmethod
+    async def delete(self, handle: str):
+        """Release a cached prefix"""
+
+    def is_missing(self, error: BaseException) -> bool:
+        """Whether `error` means a cached prefix is gone, as opposed to a transient failure"""
+        return False
+
+
+class LocalPrefixCache(PrefixCache):
+    """
+    Stand-in that never registers anything, so every prompt is sent inline.
+
+    Gemini 2.5 models still reuse stable prefixes implicitly. Those hits show
+    up as cached tokens in the usage metadata.
+    """
+
+    async def create(self, name: str, model: str, prompt: str, ttl: int) -> Optional[str]:
+        return None
+
+    async def refresh(self, handle: str, ttl: int):
+        pass
+
+    async def delete(self, handle: str):
+        pass
+
+
+class GeminiPrefixCache(PrefixCache):
+    """Gemini API context caching (`cachedContents`)"""
+
+    def __init__(self, api_key: str):
+        # Imported here so the local stand-in does not need the google-genai client
+        from google import genai
+        from google.genai import errors, types
+
+        self._client = genai.Client(api_key=api_key)
+        self._types = types
+        self._errors = errors
+
+    async def create(self, name: str, model: str, prompt: str, ttl: int) -> Optional[str]:
+        cache = await self._client.aio.caches.create(
+            model=model,
+            config=self._types.CreateCachedContentConfig(
+                display_name=name, system_instruction=prompt, ttl=f"{ttl}s"
+            ),
+        )
+        return cache.name
+
+    async def refresh(self, handle: str, ttl: int):
+        await self._client.aio.caches.update(
+            name=handle, config=self._types.UpdateCachedContentConfig(ttl=f"{ttl}s")
+        )
+
+    async def delete(self, handle: str):
+        await self._client.aio.caches.delete(name=handle)
+
+    def is_missing(self, error: BaseException) -> bool:
+        # A deleted or expired cache is reported as 404, or as 403 "not found
+        # (or permission denied)"; timeouts and 5xx leave the cache usable.
+        # Model errors arrive wrapped, so walk the cause chain
+        seen = set()
+        while error is not None and id(error) not in seen:
+            seen.add(id(error))
+            if isinstance(error, (google_exceptions.NotFound, google_exceptions.PermissionDenied)):
+                return True
+            if isinstance(error, google_exceptions.InvalidArgument) and "cache" in str(error).lower():
+                return True
+            if isinstance(error, self._errors.APIError) and error.code in (403, 404):
+                return True
+            error = error.__cause__ or error.__context__
+        return False
+
+
+class _Prompt:
+    __slots__ = ("name", "message", "tokens", "model", "cacheable", "handle")
+
+    def __init__(self, name: str, prompt: str, model: str, cacheable: bool):
+        self.name = name
+        self.message = SystemMessage(content=prompt)
+        self.tokens = count_tokens_approximately([self.message])
+        self.model = model
+        # Explicit caches hold the system instruction and tools together, so a
+        # prompt whose model binds tools per request must stay inline
+        self.cacheable = cacheable
+        self.handle: Optional[str] = None
+
+
+class PromptRegistry:
+    """Frozen system prompts per node, with explicit caching and token accounting"""
+
+    def __init__(self, prefix_cache: PrefixCache, ttl: int = 3600, min_cache_tokens: int = 1024):
+        self.prefix_cache = prefix_cache
+        self.ttl = ttl
+        self.min_cache_tokens = min_cache_tokens
+        self._prompts: Dict[str, _Prompt] = {}
+        self._usage: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, prompt: str, cacheable: bool = True):
+        # Explicit caches are bound to a model: the node's primary model
+        self._prompts[name] = _Prompt(name, prompt, settings.model_profile(name).model, cacheable)
+
+    def system_message(self, name: str) -> SystemMessage:
+        return self._prompts[name].message
+
+    def _request(self, name: str, history: Sequence[BaseMessage]) -> Tuple[List[BaseMessage], Dict[str, Any]]:
+        prompt = self._prompts[name]
+        if prompt.handle is not None:
+            return list(history), {"cached_content": prompt.handle}
+        return [prompt.message, *history], {}
+
+    def _record(self, name: str, result: Any) -> Any:
+        """Count usage from a model result and unwrap `include_raw` structured output"""
+        raw = result
+        if isinstance(result, dict) and "raw" in result:
+            raw = result["raw"]
+        usage = getattr(raw, "usage_metadata", None) if isinstance(raw, AIMessage) else None
+
+        with self._lock:
+            counters = self._usage[name]
+            counters["calls"] += 1
+            if usage:
+                cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+                counters["input_tokens"] += usage.get("input_tokens", 0)
+                counters["cached_tokens"] += cached
+                counters["output_tokens"] += usage.get("output_tokens", 0)
+
+        if raw is not result:
+            if result.get("parsing_error") is not None:
+                raise result["parsing_error"]
+            return result["parsed"]
+        return result
+
+    def _drop_handle(self, name: str, error: Exception) -> bool:
+        """Stop using the cached prefix if `error` says it is gone; returns whether it was dropped"""
+        if not self.prefix_cache.is_missing(error):
+            return False
+        # Re-created on the next refresh pass
+        logger.warning(f"Cached prefix for '{name}' is gone, sending the prompt inline: {error}")
+        self._prompts[name].handle = None
+        return True
+
+    def invoke(self, name: str, model: Any, history: Sequence[BaseMessage]) -> Any:
+        """Call `model` with the `name` system prompt followed by `history`"""
+        messages, kwargs = self._request(name, history)
+        try:
+            result = model.invoke(messages, **kwargs)
+        except Exception as e:
+            if not kwargs or not self._drop_handle(name, e):
+                raise
+            messages, kwargs = self._request(name, history)
+            result = model.invoke(messages, **kwargs)
+        return self._record(name, result)
+
+    async def ainvoke(self, name: str, model: Any, history: Sequence[BaseMessage]) -> Any:
+        messages, kwargs = self._request(name, history)
+        try:
+            result = await model.ainvoke(messages, **kwargs)
+        except Exception as e:
+            if not kwargs or not self._drop_handle(name, e):
+                raise
+            messages, kwargs = self._request(name, history)
+            result = await model.ainvoke(messages, **kwargs)
+        return self._record(name, result)
+
+    async def _register_caches(self):
+        for prompt in self._prompts.values():
+            if prompt.handle is not None or not prompt.cacheable or prompt.tokens < self.min_cache_tokens:
+                continue
+            try:
+                prompt.handle = await self.prefix_cache.create(prompt.name, prompt.model, prompt.message.content, self.ttl)
+                if prompt.handle:
+                    logger.info(f"Cached prompt prefix '{prompt.name}' (~{prompt.tokens} tokens) as {prompt.handle}")
+            except Exception as e:
+                logger.warning(f"Could not cache prompt prefix '{prompt.name}': {e}")
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.ttl / 2)
+            for prompt in self._prompts.values():
+                if prompt.handle is None:
+                    continue
+                try:
+                    await self.prefix_cache.refresh(prompt.handle, self.ttl)
+                except Exception as e:
+                    if not self._drop_handle(prompt.name, e):
+                        logger.warning(f"Could not refresh cached prefix '{prompt.name}': {e}")
+            # Re-create any cache that expired or failed since the last pass
+            await self._register_caches()
+
+    async def start(self):
+        await self._register_caches()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop(), name="prompt-cache-refresh")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for prompt in self._prompts.values():
+            if prompt.handle is not None:
+                try:
+                    await self.prefix_cache.delete(prompt.handle)
+                except Exception as e:
+                    logger.warning(f"Could not delete cached prefix '{prompt.name}': {e}")
+                prompt.handle = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            usage = {name: dict(counters) for name, counters in self._usage.items()}
+        prompts = {}
+        for name, prompt in self._prompts.items():
+            counters = usage.get(name, {})
+            input_tokens = counters.get("input_tokens", 0)
+            cached = counters.get("cached_tokens", 0)
+            prompts[name] = {
+                "prompt_tokens": prompt.tokens,
+                "explicit_cache": prompt.handle is not None,
+                "calls": counters.get("calls", 0),
+                "input_tokens": input_tokens,
+                "cached_tokens": cached,
+                "uncached_tokens": input_tokens - cached,
+                "output_tokens": counters.get("output_tokens", 0),
+                "cached_ratio": cached / input_tokens if input_tokens else 0.0,
+            }
+        return {"backend": type(self.prefix_cache).__name__, "prompts": prompts}
+
+
+def create_prefix_cache() -> PrefixCache:
+    """Build the prefix cache selected by `PROMPT_CACHE_BACKEND`"""
+    if settings.PROMPT_CACHE_BACKEND == "gemini":
+        return GeminiPrefixCache(settings.GOOGLE_API_KEY)
+    return LocalPrefixCache()
+
+
+# Global prompt registry instance
+prompt_registry = PromptRegistry(
+    create_prefix_cache(),
+    ttl=settings.PROMPT_CACHE_TTL,
+    min_cache_tokens=settings.PROMPT_CACHE_MIN_TOKENS,
+)
+for _name, _prompt in (
+    ("intent_classification", INTENT_CLASSIFICATION_PROMPT),
+    ("fused_router", FUSED_ROUTER_PROMPT),
+    ("chitchat", CHITCHAT_INTENT_PROMPT),
+    ("query", QUERY_INTENT_PROMPT),
+    ("irrelevant", IRRELEVANT_INTENT_PROMPT),
+    ("adversarial", ADVERSARIAL_INTENT_PROMPT),
+    ("details", DETAILS_INTENT_PROMPT),
+    ("search_recommendation", SEARCH_RECOMMENDATION_INTENT_PROMPT),
+    ("compare", COMPARE_INTENT_PROMPT),
+    ("history_summary", HISTORY_SUMMARY_PROMPT),
+):
+    prompt_registry.register(_name, _prompt)
+prompt_registry.register("tool_selection", TOOL_SELECTION_PROMPT, cacheable=False)
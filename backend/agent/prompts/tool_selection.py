@@ -1,3 +1,5 @@
+from core.config import settings
+
 ALLOWED_FEATURES = [
     "fast charging",
     "wireless charging",
@@ -176,6 +178,12 @@ ALLOWED_USECASES = [
     "first smartphone",
 ]
 
+
+def format_allowed_values(values) -> str:
+    """Render allowed values as one quoted, comma-separated line for a prompt"""
+    return ", ".join(f'"{value}"' for value in values)
+
+
 TOOL_SELECTION_PROMPT = f"""
 You are a routing assistant in a mobile shopping chatbot.
 
@@ -200,10 +208,11 @@ The user is looking for help related to mobile phones — such as discovering, c
    - “I want a phone with a good camera and long battery life.”
 
 3. **compare_phones(phone_names: list[str])**
-   → Use when the user wants to compare two phones.
+   → Use when the user wants to compare 2 to {settings.COMPARE_MAX_PHONES} phones. Pass every phone in a single call.
    Example queries:
    - “Compare the OnePlus 12R and iQOO Neo 9 Pro.”
    - “Which is better, iPhone 15 or Galaxy S24?”
+   - “Pixel 8a vs Nothing Phone 2a vs OnePlus 12R for camera?”
 
 ---
 
@@ -228,10 +237,10 @@ Do **not** invent new fields like “battery life” or “camera quality” —
 If the user gives vague input like *“best budget phone”*, infer logical filters (e.g., `price <= 20000`) and proceed.
 
 ### Only Following Values are allowed in features field:
-{ALLOWED_FEATURES}
+{format_allowed_values(ALLOWED_FEATURES)}
 
 ### Only following valuaes are allowed in use_cases field:
-{ALLOWED_USECASES}
+{format_allowed_values(ALLOWED_USECASES)}
 
 Do not assume specific numeric values unless provided. Instead, try to look for allowed features or use cases that imply the user's intent.
 
@@ -246,7 +255,7 @@ for crieteria in `fetch_recommendations`, either only give usecase or feature or
 
 ### Decision Logic
 - If the user's query is about one specific phone → call `fetch_phone_details(phone_name)`.
-- If the user's query involves comparing two phones → call `compare_phones(phone_names)`.
+- If the user's query involves comparing two or more phones → call `compare_phones(phone_names)` once with all of them.
 - If the user's query asks for suggestions, recommendations, or best phones by criteria → call `fetch_recommendations(criteria)`.
 - If the query does not relate to any tool → **do not call any tool** and respond naturally.
 
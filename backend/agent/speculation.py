@@ -0,0 +1,92 @@
+"""
+Speculative tool selection for the two-stage router.
+
+With `ROUTER_MODE=speculative`, the Speculative Router node starts the
+tool-selection call together with intent classification when the turn
+looks data-based. Both calls read the same messages, so on data intents the
+tool call is ready when the classifier returns, which hides one model
+round-trip. When the classifier picks a simple intent, the speculative call
+is cancelled, or its result discarded if it already finished.
+
+The prediction uses the fast-path lexical model: it speculates when the
+probability of search_recommendation, compare and details together is at
+least `SPECULATION_MIN_PROBABILITY`.
+"""
+from threading import Lock
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from agent.fast_path_classifier import fast_path_classifier
+from core.config import settings
+from core.metrics import metrics
+
+DATA_INTENTS = {"search_recommendation", "compare", "details"}
+
+SPECULATIONS = metrics.counter(
+    "chatbot_speculation_total",
+    "Router turns by speculation outcome (hit, miss, skipped_data, skipped)",
+    ["outcome"],
+)
+WASTED_TOKENS = metrics.counter(
+    "chatbot_speculation_wasted_tokens_total", "Tokens of discarded speculative tool-selection calls"
+)
+
+
+def data_intent_probability(messages: Sequence[BaseMessage]) -> float:
+    """Lexical-model probability that the last user message has a data intent"""
+    if not messages or not isinstance(messages[-1], HumanMessage):
+        return 0.0
+    posteriors = fast_path_classifier.model.posteriors(str(messages[-1].content))
+    return sum(probability for intent, probability in posteriors.items() if intent in DATA_INTENTS)
+
+
+def should_speculate(messages: Sequence[BaseMessage]) -> bool:
+    return data_intent_probability(messages) >= settings.SPECULATION_MIN_PROBABILITY
+
+
+class SpeculationTracker:
+    """Hit rate and wasted tokens of speculative tool selection"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._counters = {
+            "hit": 0,  # speculated, data intent: the tool call was used
+            "miss": 0,  # speculated, simple intent: the tool call was wasted
+            "skipped_data": 0,  # did not speculate, data intent: a round-trip not saved
+            "skipped": 0,  # did not speculate, simple intent
+            "cancelled": 0,  # misses stopped before the call returned
+            "wasted_input_tokens": 0,
+            "wasted_output_tokens": 0,
+        }
+
+    def record(self, outcome: str, discarded: Optional[AIMessage] = None, cancelled: bool = False):
+        """Count a routed turn; `discarded` is a finished speculative call that was thrown away"""
+        SPECULATIONS.inc(outcome=outcome)
+        usage = getattr(discarded, "usage_metadata", None) or {}
+        input_tokens = usage.get("input_tokens", 0)
+        output_tokens = usage.get("output_tokens", 0)
+        if input_tokens or output_tokens:
+            WASTED_TOKENS.inc(input_tokens + output_tokens)
+        with self._lock:
+            self._counters[outcome] += 1
+            self._counters["cancelled"] += cancelled
+            self._counters["wasted_input_tokens"] += input_tokens
+            self._counters["wasted_output_tokens"] += output_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        speculated = counters["hit"] + counters["miss"]
+        data_turns = counters["hit"] + counters["skipped_data"]
+        return {
+            **counters,
+            # Share of speculative calls that were used
+            "hit_rate": counters["hit"] / speculated if speculated else 0.0,
+            # Share of data-intent turns that saved a round-trip
+            "coverage": counters["hit"] / data_turns if data_turns else 0.0,
+        }
+
+
+# Global speculation tracker instance
+speculation_tracker = SpeculationTracker()
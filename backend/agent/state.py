@@ -2,6 +2,8 @@ from typing import TypedDict, Literal, Annotated, Sequence
 from langchain_core.messages import BaseMessage
 from langgraph.graph.message import add_messages
 
+from agent.models.tool_artifacts import ToolArtifact
+
 
 class AgentState(TypedDict):
     """
@@ -11,7 +13,7 @@ class AgentState(TypedDict):
         messages: The history of messages (Human, AI)
         intent: The classified intent of the user's last message
         response: The AI's response to be added to history
-        context_data: Additional context data from tools
+        context_data: The artifact of the data tool, shared by reference with the API response
     """
     messages: Annotated[Sequence[BaseMessage], add_messages]
     intent: Literal[
@@ -24,4 +26,4 @@ class AgentState(TypedDict):
         "adversarial",
     ] | None
     response: str
-    context_data: list | dict | None
\ No newline at end of file
+    context_data: ToolArtifact | None
\ No newline at end of file
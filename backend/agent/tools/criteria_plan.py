@@ -0,0 +1,143 @@
+"""
+Compile `fetch_recommendations` criteria dicts into canonical query plans.
+
+The LLM produces criteria such as {"price": "<=30000", "use_cases": "Gaming"}.
+`compile_criteria` turns them into a `CriteriaPlan`: a sorted, hashable tuple
+of typed predicates that every backend (the Supabase query builder and the
+local phone catalog) evaluates the same way. Equivalent criteria dicts
+compile to equal plans, so a plan is also a stable cache key.
+"""
+import re
+from typing import Any, Dict, NamedTuple, Tuple
+
+from core.cache import LRUTTLCache
+
+NUMERIC_FILTER_COLUMNS = {
+    "price",
+    "display_size_inch",
+    "refresh_rate",
+    "ram_gb",
+    "storage_gb",
+    "battery_mah",
+    "charging_speed_w",
+    "rear_camera_mp",
+    "front_camera_mp",
+    "released_year",
+}
+TEXT_FILTER_COLUMNS = {
+    "brand",
+    "os",
+    "display_type",
+    "processor",
+    "network",
+    "camera_features",
+}
+TAG_FILTER_COLUMNS = {"features", "use_cases"}
+# Keys honoured by `fetch_recommendations`; anything else is ignored.
+SEARCHABLE_KEYS = NUMERIC_FILTER_COLUMNS | TEXT_FILTER_COLUMNS | TAG_FILTER_COLUMNS
+FLOAT_COLUMNS = {"display_size_inch"}
+
+COMPARISON_PATTERN = re.compile(r"^(<=|>=|<|>)\s*(\d+(?:\.\d+)?)$")
+COMPARISON_OPS = {"<=": "lte", ">=": "gte", "<": "lt", ">": "gt"}
+
+PLAN_CACHE_SIZE = 4096
+
+
+class Predicate(NamedTuple):
+    """One filter on one column.
+
+    op is one of:
+        lt, lte, gt, gte, eq  -- numeric comparison (value is int or float)
+        eq_text               -- exact text match (value is str)
+        ilike                 -- case-insensitive substring (value is lowercase str)
+        contains              -- tag column contains all values (value is a sorted tuple)
+    """
+
+    column: str
+    op: str
+    value: Any
+
+
+class CriteriaPlan(NamedTuple):
+    """Predicates that must all hold, plus tag predicates of which any must hold.
+
+    `features` and `use_cases` are OR-ed together when both are given.
+    """
+
+    predicates: Tuple[Predicate, ...]
+    any_tags: Tuple[Predicate, ...]
+
+
+# Compiled plans keyed by the frozen criteria dict
+plan_cache = LRUTTLCache(max_entries=PLAN_CACHE_SIZE)
+
+
+def _number(column: str, value: Any) -> float:
+    number = float(value)
+    return number if column in FLOAT_COLUMNS else int(number)
+
+
+def _compile_value(column: str, value: Any) -> Predicate:
+    if isinstance(value, bool) or isinstance(value, (list, tuple, dict)):
+        raise ValueError(f"Unsupported filter value for '{column}': {value!r}")
+
+    if column in NUMERIC_FILTER_COLUMNS:
+        if isinstance(value, str):
+            match = COMPARISON_PATTERN.match(value.strip())
+            if match:
+                op, number = match.groups()
+                return Predicate(column, COMPARISON_OPS[op], _number(column, number))
+        try:
+            return Predicate(column, "eq", _number(column, value))
+        except ValueError:
+            raise ValueError(f"Unsupported filter value for '{column}': {value!r}") from None
+
+    if isinstance(value, str):
+        return Predicate(column, "ilike", value.strip().lower())
+    return Predicate(column, "eq_text", str(value))
+
+
+def _compile(criteria: Dict[str, Any]) -> CriteriaPlan:
+    predicates = []
+    any_tags = []
+    for column, value in criteria.items():
+        if column not in SEARCHABLE_KEYS:
+            continue
+        if column in TAG_FILTER_COLUMNS:
+            values = [value] if isinstance(value, str) else value
+            if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+                raise ValueError(f"Unsupported filter value for '{column}': {value!r}")
+            any_tags.append(Predicate(column, "contains", tuple(sorted(set(values)))))
+            continue
+        predicates.append(_compile_value(column, value))
+    return CriteriaPlan(tuple(sorted(predicates, key=repr)), tuple(sorted(any_tags)))
+
+
+def _freeze(value: Any) -> Any:
+    """Hashable, order-independent form of a criteria dict, used as the plan cache key"""
+    if isinstance(value, dict):
+        return frozenset((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    # Keep the type so that 1, 1.0 and True do not share a plan
+    return (type(value), value)
+
+
+def compile_criteria(criteria: Dict[str, Any]) -> CriteriaPlan:
+    """
+    Compile a criteria dict into a canonical plan, reusing cached plans
+
+    Raises:
+        ValueError: if a filter value cannot be applied to its column
+    """
+    try:
+        key = _freeze(criteria)
+        hash(key)
+    except TypeError:
+        return _compile(criteria)
+
+    plan = plan_cache.get(key)
+    if plan is None:
+        plan = _compile(criteria)
+        plan_cache.set(key, plan)
+    return plan
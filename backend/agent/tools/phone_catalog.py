@@ -0,0 +1,347 @@
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Dict, List, Optional
+
+from agent.tools.criteria_plan import CriteriaPlan, Predicate
+from agent.tools.phone_name_index import PhoneNameIndex
+from core.config import settings
+from core.supabase_client import get_async_db
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_COLUMNS = (
+    "price",
+    "display_size_inch",
+    "refresh_rate",
+    "ram_gb",
+    "storage_gb",
+    "battery_mah",
+    "charging_speed_w",
+    "rear_camera_mp",
+    "front_camera_mp",
+    "weight_g",
+    "rating",
+    "popularity_score",
+    "released_year",
+)
+TEXT_COLUMNS = (
+    "brand",
+    "os",
+    "display_type",
+    "processor",
+    "network",
+    "camera_features",
+)
+TAG_COLUMNS = ("features", "use_cases")
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+NUMERIC_OPS = {"lt": "<", "lte": "<=", "gt": ">", "gte": ">=", "eq": "="}
+
+PAGE_SIZE = 1000
+ILIKE_CACHE_SIZE = 1024
+
+
+def _bitset(row_ids, size: int) -> int:
+    """Pack an iterable of row positions into an int bitset."""
+    buffer = bytearray((size + 7) // 8)
+    for row_id in row_ids:
+        buffer[row_id >> 3] |= 1 << (row_id & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def _iter_bits(mask: int):
+    """Yield set bit positions in ascending order."""
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+def _rank_key(row: Dict[str, Any]):
+    """Mirror `ORDER BY popularity_score DESC, rating DESC` (NULLS FIRST)."""
+    popularity = row.get("popularity_score")
+    rating = row.get("rating")
+    return (
+        popularity is not None,
+        -(popularity or 0),
+        rating is not None,
+        -(rating or 0),
+    )
+
+
+class _NumericIndex:
+    """Column stored as a float array plus a sorted (value, row) index."""
+
+    __slots__ = ("values", "sorted_values", "sorted_rows")
+
+    def __init__(self, column: List[Any]):
+        self.values = array("d", (math.nan if v is None else float(v) for v in column))
+        pairs = sorted(
+            (value, row_id)
+            for row_id, value in enumerate(self.values)
+            if not math.isnan(value)
+        )
+        self.sorted_values = array("d", (value for value, _ in pairs))
+        self.sorted_rows = array("l", (row_id for _, row_id in pairs))
+
+    def range_rows(self, op: str, value: float):
+        if op == "<=":
+            return self.sorted_rows[: bisect_right(self.sorted_values, value)]
+        if op == "<":
+            return self.sorted_rows[: bisect_left(self.sorted_values, value)]
+        if op == ">=":
+            return self.sorted_rows[bisect_left(self.sorted_values, value):]
+        if op == ">":
+            return self.sorted_rows[bisect_right(self.sorted_values, value):]
+        start = bisect_left(self.sorted_values, value)
+        end = bisect_right(self.sorted_values, value)
+        return self.sorted_rows[start:end]
+
+
+class _TextIndex:
+    """Dictionary-encoded text column with lowercase and token lookups."""
+
+    __slots__ = ("codes", "distinct", "lowered", "code_rows", "tokens", "_ilike_cache")
+
+    def __init__(self, column: List[Any], size: int):
+        codes: Dict[str, int] = {}
+        rows_per_code: List[List[int]] = []
+        for row_id, value in enumerate(column):
+            if value is None:
+                continue
+            value = str(value)
+            code = codes.setdefault(value, len(codes))
+            if code == len(rows_per_code):
+                rows_per_code.append([])
+            rows_per_code[code].append(row_id)
+
+        self.codes = codes
+        self.distinct = list(codes)
+        self.lowered = [value.lower() for value in self.distinct]
+        self.code_rows = [_bitset(rows, size) for rows in rows_per_code]
+        self.tokens: Dict[str, set] = {}
+        for code, value in enumerate(self.lowered):
+            for token in TOKEN_PATTERN.findall(value):
+                self.tokens.setdefault(token, set()).add(code)
+        self._ilike_cache: Dict[str, int] = {}
+
+    def equals(self, value: str) -> int:
+        code = self.codes.get(value)
+        return 0 if code is None else self.code_rows[code]
+
+    def ilike(self, needle: str) -> int:
+        """Rows whose value contains `needle`, case-insensitively."""
+        needle = needle.lower()
+        cached = self._ilike_cache.get(needle)
+        if cached is not None:
+            return cached
+
+        candidates = range(len(self.distinct))
+        # Only interior tokens of the needle are guaranteed to be whole tokens
+        # of a matching value; the first and last may be partial.
+        interior = TOKEN_PATTERN.findall(needle)[1:-1]
+        for token in interior:
+            candidates = [c for c in candidates if c in self.tokens.get(token, ())]
+
+        mask = 0
+        for code in candidates:
+            if needle in self.lowered[code]:
+                mask |= self.code_rows[code]
+        if len(self._ilike_cache) >= ILIKE_CACHE_SIZE:
+            self._ilike_cache.clear()
+        self._ilike_cache[needle] = mask
+        return mask
+
+
+class _TagIndex:
+    """JSONB array column as one bitset per tag value."""
+
+    __slots__ = ("tags",)
+
+    def __init__(self, column: List[Any], size: int):
+        rows_per_tag: Dict[str, List[int]] = {}
+        for row_id, values in enumerate(column):
+            for tag in values or ():
+                rows_per_tag.setdefault(tag, []).append(row_id)
+        self.tags = {tag: _bitset(rows, size) for tag, rows in rows_per_tag.items()}
+
+    def contains(self, values: List[str], everything: int) -> int:
+        mask = everything
+        for tag in values:
+            mask &= self.tags.get(tag, 0)
+        return mask
+
+
+class _CatalogSnapshot:
+    """Immutable, indexed view of the phones table.
+
+    Rows are stored in ranking order (popularity_score, then rating, both
+    descending) so that the lowest set bits of a filter bitset are already
+    the best-ranked matches.
+    """
+
+    __slots__ = ("rows", "size", "everything", "numeric", "text", "tags", "names")
+
+    def __init__(self, records: List[Dict[str, Any]]):
+        ranked = sorted(range(len(records)), key=lambda i: _rank_key(records[i]))
+
+        self.rows = tuple(records[i] for i in ranked)
+        self.size = len(self.rows)
+        self.everything = (1 << self.size) - 1
+        self.numeric = {
+            column: _NumericIndex([row.get(column) for row in self.rows])
+            for column in NUMERIC_COLUMNS
+        }
+        self.text = {
+            column: _TextIndex([row.get(column) for row in self.rows], self.size)
+            for column in TEXT_COLUMNS
+        }
+        self.tags = {
+            column: _TagIndex([row.get(column) for row in self.rows], self.size)
+            for column in TAG_COLUMNS
+        }
+        self.names = PhoneNameIndex([(row.get("name") or "", row.get("brand") or "") for row in self.rows])
+
+    def _predicate(self, predicate: Predicate) -> int:
+        column, op, value = predicate
+        if op == "contains":
+            return self.tags[column].contains(value, self.everything)
+        if op == "ilike":
+            return self.text[column].ilike(value)
+        if op == "eq_text":
+            return self.text[column].equals(value)
+        return _bitset(self.numeric[column].range_rows(NUMERIC_OPS[op], value), self.size)
+
+    def search(self, plan: CriteriaPlan, limit: int) -> List[Dict[str, Any]]:
+        mask = self.everything
+        for predicate in plan.predicates:
+            mask &= self._predicate(predicate)
+
+        # `features` and `use_cases` are OR-ed together, as in the Supabase query.
+        if plan.any_tags:
+            combined = 0
+            for predicate in plan.any_tags:
+                combined |= self._predicate(predicate)
+            mask &= combined
+
+        results = []
+        for row_id in _iter_bits(mask):
+            if len(results) >= limit:
+                break
+            results.append(dict(self.rows[row_id]))
+        return results
+
+    def find_by_name(self, phone_name: str) -> Optional[Dict[str, Any]]:
+        row_id = self.names.best(phone_name)
+        return dict(self.rows[row_id]) if row_id is not None else None
+
+
+class PhoneCatalog:
+    """In-process copy of the `phones` table that answers tool queries locally.
+
+    The table is loaded once at startup and then refreshed by a background
+    task every `refresh_interval` seconds. Each refresh builds a new
+    snapshot and swaps it in atomically, so readers never take a lock.
+    """
+
+    def __init__(self, refresh_interval: int = 300):
+        self.refresh_interval = refresh_interval
+        self._snapshot: Optional[_CatalogSnapshot] = None
+        self._fingerprint: Optional[str] = None
+        self._listeners: List[Callable[[], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self._snapshot is not None
+
+    async def _fetch_all(self) -> List[Dict[str, Any]]:
+        records: List[Dict[str, Any]] = []
+        start = 0
+        while True:
+            response = await (
+                get_async_db().table("phones")
+                .select("*")
+                .order("id")
+                .range(start, start + PAGE_SIZE - 1)
+                .execute()
+            )
+            page = response.data or []
+            records.extend(page)
+            if len(page) < PAGE_SIZE:
+                return records
+            start += PAGE_SIZE
+
+    def add_listener(self, callback: Callable[[], None]):
+        """Register a callback invoked whenever the catalog contents change."""
+        self._listeners.append(callback)
+
+    def load(self, records: List[Dict[str, Any]]):
+        """(Re)build the catalog from `records`."""
+        fingerprint = hashlib.sha256(
+            json.dumps(records, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        if fingerprint == self._fingerprint:
+            return
+
+        self._snapshot = _CatalogSnapshot(records)
+        self._fingerprint = fingerprint
+        logger.info(f"Phone catalog loaded with {len(records)} phones")
+
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Phone catalog listener failed: {e}", exc_info=True)
+
+    async def refresh(self):
+        """Fetch the table from Supabase and rebuild the catalog off the event loop."""
+        records = await self._fetch_all()
+        await asyncio.to_thread(self.load, records)
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Failed to refresh phone catalog: {e}", exc_info=True)
+
+    async def start(self):
+        """Load the catalog and start the background refresh task."""
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.error(f"Failed to load phone catalog, falling back to Supabase queries: {e}", exc_info=True)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop(), name="phone-catalog-refresh")
+
+    async def stop(self):
+        """Stop the background refresh task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def search(self, plan: CriteriaPlan, limit: int = 5) -> List[Dict[str, Any]]:
+        """Answer a compiled `fetch_recommendations` plan from the local catalog."""
+        return self._snapshot.search(plan, limit)
+
+    def find_by_name(self, phone_name: str) -> Optional[Dict[str, Any]]:
+        """Return the best-scoring phone for `phone_name`, see `phone_name_index`."""
+        return self._snapshot.find_by_name(phone_name)
+
+
+# Global phone catalog instance
+phone_catalog = PhoneCatalog(refresh_interval=settings.PHONE_CATALOG_REFRESH_INTERVAL)
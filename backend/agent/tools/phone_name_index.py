@@ -0,0 +1,170 @@
+"""
+Ranked phone-name resolution.
+
+Turns what a user or the LLM typed ("oneplus 12 r", "Galaxy S24 256GB",
+"iphone15") into the best matching catalog phone. Names are normalized
+first:
+    - case folding, "+" -> "plus", aliases such as "one plus" -> "oneplus"
+    - letters and digits split into separate tokens ("12r" -> "12 r")
+    - storage / RAM variants dropped ("8/256", "128gb", "12 gb ram")
+
+Candidates come from a token and trigram index over the model part of the
+name. Each candidate is scored by weighted token overlap, where a name with
+exactly the query's tokens scores 1.0. Numbers must match exactly, so
+"iPhone 16" never resolves to "iPhone 15". A name may not have variant
+tokens the query lacks (numbers, single letters, "pro", "max", "plus", ...),
+or lack ones the query has, so "Pixel 8" never resolves to "Pixel 8a" and
+"iPhone 15" never to "iPhone 15 Pro Max". A brand named in the query must be
+the phone's brand.
+"""
+import re
+import unicodedata
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+# Below this score a lookup is treated as "not found"
+MIN_SCORE = 0.3
+
+ALIASES = (
+    (re.compile(r"\+"), " plus "),
+    (re.compile(r"\bone\s+plus\b"), "oneplus"),
+    (re.compile(r"\bi\s+phone\b"), "iphone"),
+    (re.compile(r"\bpromax\b"), "pro max"),
+    (re.compile(r"\b5g\b"), " "),
+)
+VARIANT_PATTERN = re.compile(
+    r"\b\d+\s*/\s*\d+\s*(?:gb|tb)?\b|\b\d+\s*(?:gb|tb)\b(?:\s*(?:ram|rom|storage))?"
+)
+TOKEN_PATTERN = re.compile(r"[a-z]+|\d+")
+# Name tokens that tell models of a line apart, besides numbers and single
+# letters ("8a" -> "8 a"); a name keeping one the query lacks is another phone
+VARIANT_TOKENS = frozenset({"pro", "max", "plus", "ultra", "mini", "lite", "fe"})
+
+
+def normalize_phone_name(text: str) -> str:
+    """Canonical lowercase form of a phone name, tokens separated by single spaces"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = VARIANT_PATTERN.sub(" ", text)
+    for pattern, replacement in ALIASES:
+        text = pattern.sub(replacement, text)
+    return " ".join(TOKEN_PATTERN.findall(text))
+
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _is_variant_token(token: str) -> bool:
+    return token.isdigit() or len(token) == 1 or token in VARIANT_TOKENS
+
+
+def _token_similarity(query_token: str, name_token: str) -> float:
+    """Partial credit for a query token that is not in the name verbatim"""
+    if len(query_token) >= 3 and name_token.startswith(query_token):
+        return 0.8
+    a, b = _trigrams(query_token), _trigrams(name_token)
+    similarity = len(a & b) / len(a | b)
+    return similarity if similarity >= 0.4 else 0.0
+
+
+class PhoneNameIndex:
+    """Token/trigram index over phone names, in catalog rank order"""
+
+    __slots__ = ("brand_tokens", "row_brands", "models", "exact", "token_rows", "trigram_rows")
+
+    def __init__(self, phones: Sequence[Tuple[str, str]]):
+        """
+        Args:
+            phones: (name, brand) per row; earlier rows win ties
+        """
+        self.brand_tokens: Set[str] = set()
+        for _, brand in phones:
+            self.brand_tokens.update(normalize_phone_name(brand or "").split())
+
+        self.row_brands: List[FrozenSet[str]] = []
+        self.models: List[Tuple[str, ...]] = []
+        self.exact: Dict[FrozenSet[str], int] = {}
+        self.token_rows: Dict[str, Set[int]] = {}
+        self.trigram_rows: Dict[str, Set[int]] = {}
+
+        for row_id, (name, brand) in enumerate(phones):
+            brand_tokens = tuple(normalize_phone_name(brand or "").split())
+            name_tokens = tuple(normalize_phone_name(name or "").split())
+            row_brand = frozenset(brand_tokens)
+            model = tuple(t for t in name_tokens if t not in row_brand)
+            self.row_brands.append(row_brand)
+            self.models.append(model)
+            self.exact.setdefault(frozenset(name_tokens), row_id)
+            self.exact.setdefault(frozenset(brand_tokens + model), row_id)
+            for token in model:
+                self.token_rows.setdefault(token, set()).add(row_id)
+                for trigram in _trigrams(token):
+                    self.trigram_rows.setdefault(trigram, set()).add(row_id)
+
+    def _candidates(self, tokens: Iterable[str]) -> Set[int]:
+        rows: Set[int] = set()
+        for token in tokens:
+            if token in self.token_rows:
+                rows |= self.token_rows[token]
+            elif not token.isdigit() and token not in self.brand_tokens:
+                for trigram in _trigrams(token):
+                    rows |= self.trigram_rows.get(trigram, set())
+        return rows
+
+    def _score(self, tokens: Tuple[str, ...], row_id: int) -> float:
+        name = self.models[row_id]
+        name_tokens = set(name)
+        # The row's own brand is optional in the query; any other brand rules the row out
+        model = tuple(t for t in tokens if t not in self.row_brands[row_id])
+        if not model or any(t in self.brand_tokens and t not in name_tokens for t in model):
+            return 0.0
+        # A bare model number ("15") only resolves together with the brand
+        if len(model) == len(tokens) and all(t.isdigit() for t in model):
+            return 0.0
+        if set(model) == name_tokens:
+            return 1.0
+
+        credit = 0.0
+        matched: Set[str] = set()
+        for token in set(model):
+            if token in name_tokens:
+                credit += 1.0
+                matched.add(token)
+            elif token.isdigit():
+                return 0.0
+            else:
+                similarity, closest = max(((_token_similarity(token, n), n) for n in name_tokens), default=(0.0, ""))
+                if similarity:
+                    credit += similarity
+                    matched.add(closest)
+                elif _is_variant_token(token):
+                    # "Galaxy S24" for "Galaxy S24 Plus"
+                    return 0.0
+        # Only a superset of the query, such as "Pixel 8a" or "iPhone 15 Pro" for "Pixel 8" or "iPhone 15"
+        if any(_is_variant_token(t) for t in name_tokens - matched):
+            return 0.0
+        # Weighted Jaccard: unmatched tokens on either side dilute the score
+        return credit / (len(set(model)) + len(name_tokens) - credit)
+
+    def search(self, query: str, limit: int = 5) -> List[Tuple[int, float]]:
+        """Best (row_id, score) matches above MIN_SCORE, best first"""
+        tokens = tuple(normalize_phone_name(query).split())
+        if not tokens:
+            return []
+
+        exact = self.exact.get(frozenset(tokens))
+        if exact is not None and limit == 1:
+            return [(exact, 1.0)]
+
+        scored = [
+            (row_id, score)
+            for row_id in self._candidates(tokens)
+            for score in (self._score(tokens, row_id),)
+            if score >= MIN_SCORE
+        ]
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:limit]
+
+    def best(self, query: str) -> Optional[int]:
+        matches = self.search(query, limit=1)
+        return matches[0][0] if matches else None
@@ -1,18 +1,141 @@
-import os
-from supabase import Client
-from typing import Any, Dict, List, Union, Optional
+import asyncio
+import logging
+from typing import Any, Dict, List, Tuple, Union, Optional
 from langchain_core.tools import tool
-from agent.models.phone_details_table_schema import Phone
-import re
+from agent.context_encoding import encode_tool_result
+from agent.models.tool_artifacts import ToolArtifact
+from agent.models.phone_details_table_schema import (
+    PHONE_CARD_FIELDS,
+    PHONE_DETAIL_FIELDS,
+    PHONE_SPEC_FIELDS,
+    phone_for_llm,
+    project_phone,
+    select_columns,
+)
 from core.config import settings
 import json
-from core.supabase_client import get_supabase_client
+from postgrest.exceptions import APIError
+from core.supabase_client import get_async_db
+from core.cache import LRUTTLCache, SingleFlight
+from agent.tools.phone_catalog import phone_catalog
+from agent.tools.criteria_plan import CriteriaPlan, compile_criteria
+from agent.tools.phone_name_index import PhoneNameIndex, normalize_phone_name
+from agent.tracing import backend_timer, record_cache_lookup
 
+logger = logging.getLogger(__name__)
 
-supabase: Client = get_supabase_client()
 
+# Cached tool results are shared between callers and must not be mutated.
+# Phone details are stored as already-validated `Phone` dumps.
+tool_cache = LRUTTLCache(
+    max_entries=settings.TOOL_CACHE_MAX_ENTRIES, ttl=settings.TOOL_CACHE_TTL
+)
+tool_flight = SingleFlight()
+_MISSING = object()
 
-def fetch_single_phone_details(phone_name: str) -> Optional[Dict]:
+
+async def _cached(key: tuple, loader):
+    """
+    Return the cached result for `key`, or load it once for all concurrent callers.
+
+    Empty results (phone not found, no recommendations) are cached with the
+    shorter negative TTL. Exceptions are not cached.
+    """
+    if not settings.TOOL_CACHE_ENABLED:
+        return await loader()
+
+    cached = tool_cache.get(key, _MISSING)
+    record_cache_lookup("tool", cached is not _MISSING)
+    if cached is not _MISSING:
+        return cached
+
+    async def load_and_store():
+        result = await loader()
+        ttl = None if result else settings.TOOL_CACHE_NEGATIVE_TTL
+        tool_cache.set(key, result, ttl=ttl)
+        return result
+
+    return await tool_flight.do(key, load_and_store)
+
+
+def invalidate_tool_cache():
+    """Drop all cached tool results, e.g. after the phone catalog changes."""
+    tool_cache.clear()
+
+
+phone_catalog.add_listener(invalidate_tool_cache)
+
+
+# PostgREST error codes for a database function that does not exist
+_MISSING_FUNCTION_CODES = ("PGRST202", "42883")
+# Rows scored locally per lookup when `resolve_phone_name` is not installed
+_FALLBACK_CANDIDATES = 50
+# None until the first lookup finds out whether `resolve_phone_name` is installed
+_resolve_rpc_installed: Optional[bool] = None
+
+
+async def _resolve_phone_by_candidates(phone_name: str) -> Optional[Dict]:
+    """
+    Score phones whose names share a token with `phone_name` using `PhoneNameIndex`,
+    so the same variant rules apply as with the catalog
+    """
+    tokens = [token for token in phone_name.split() if len(token) >= 2 or token.isdigit()]
+    if not tokens:
+        return None
+    response = await (
+        get_async_db().table("phones")
+        .select("*")
+        .or_(",".join(f"name.ilike.*{token}*" for token in tokens))
+        .order("popularity_score", desc=True)
+        .limit(_FALLBACK_CANDIDATES)
+        .execute()
+    )
+    rows = response.data or []
+    # In popularity order, so the more popular phone wins ties
+    row_id = PhoneNameIndex([(row.get("name") or "", row.get("brand") or "") for row in rows]).best(phone_name)
+    return rows[row_id] if row_id is not None else None
+
+
+async def _resolve_phone_in_db(phone_name: str) -> Optional[Dict]:
+    """
+    Resolve a phone name with the `resolve_phone_name` RPC (pg_trgm ranked match).
+
+    When the function is not installed (see backend/sql/resolve_phone_name.sql),
+    candidate rows are scored here instead; the RPC is not tried again.
+    """
+    global _resolve_rpc_installed
+    if _resolve_rpc_installed is False:
+        return await _resolve_phone_by_candidates(phone_name)
+    try:
+        response = await get_async_db().rpc(
+            "resolve_phone_name", {"query": phone_name, "max_results": 1}
+        ).execute()
+    except APIError as e:
+        if e.code not in _MISSING_FUNCTION_CODES:
+            raise
+        if _resolve_rpc_installed is not False:
+            logger.warning(f"resolve_phone_name RPC is not installed, scoring candidate rows instead: {e.message}")
+        _resolve_rpc_installed = False
+        return await _resolve_phone_by_candidates(phone_name)
+    _resolve_rpc_installed = True
+    return response.data[0] if response.data else None
+
+
+async def _load_phone_details(phone_name: str) -> Optional[Dict]:
+    if phone_catalog.is_ready:
+        with backend_timer("phone_details", "catalog"):
+            phone_record = phone_catalog.find_by_name(phone_name)
+    else:
+        with backend_timer("phone_details", "supabase"):
+            phone_record = await _resolve_phone_in_db(phone_name)
+
+    if phone_record is None:
+        return None
+
+    return project_phone(phone_record, PHONE_DETAIL_FIELDS)
+
+
+async def fetch_single_phone_details(phone_name: str) -> Optional[Dict]:
     """
     Fetch detailed information about a phone from Supabase.
 
@@ -22,33 +145,54 @@ def fetch_single_phone_details(phone_name: str) -> Optional[Dict]:
     Returns:
         dict: Phone details validated via Pydantic, or an error message.
     """
-    if not phone_name or len(phone_name.strip()) < 2:
+    normalized_name = normalize_phone_name(phone_name or "")
+    if len(normalized_name) < 2:
         return {"error": "Invalid phone name."}
 
     try:
-        response = (
-            supabase.table("phones")
-            .select("*")
-            .ilike("name", f"%{phone_name.strip()}%")
-            .limit(1)
-            .execute()
+        phone_details = await _cached(
+            ("phone", normalized_name),
+            lambda: _load_phone_details(normalized_name),
         )
 
-        if not response.data or len(response.data) == 0:
+        if phone_details is None:
             return {"error": f"No phone found matching '{phone_name}'."}
 
-        phone_record = response.data[0]
-
-        phone_obj = Phone(**phone_record)
-
-        return phone_obj.model_dump(exclude_none=True)
+        return phone_details
 
     except Exception as e:
         return {"error": f"Error fetching phone details: {str(e)}"}
 
 
-@tool
-def fetch_phone_details(phone_name: str) -> Optional[Dict]:
+def _tool_result(data: Union[Dict, List[Dict]]) -> Tuple[str, Optional[ToolArtifact]]:
+    """
+    Split a tool result into the ToolMessage content and artifact.
+
+    The content is the model's view of the data: the compact table from
+    `encode_tool_result`, or compact JSON without frontend-only fields when
+    CONTEXT_ENCODING_ENABLED is off. The artifact is the structured data for
+    the frontend, or None on errors; it is passed on by reference and only
+    encoded for the API response.
+    """
+    if isinstance(data, dict) and "error" in data:
+        return json.dumps(data), None
+
+    if settings.CONTEXT_ENCODING_ENABLED:
+        content = encode_tool_result(data)
+        if content is not None:
+            return content, data
+
+    if isinstance(data, list):
+        for_llm = [phone_for_llm(phone) for phone in data]
+    elif "phones" in data:
+        for_llm = {**data, "phones": [phone_for_llm(phone) for phone in data["phones"]]}
+    else:
+        for_llm = phone_for_llm(data)
+    return json.dumps(for_llm, separators=(",", ":"), ensure_ascii=False), data
+
+
+@tool(response_format="content_and_artifact")
+async def fetch_phone_details(phone_name: str) -> Tuple[str, Any]:
     """
     Fetch detailed information about a phone from Supabase.
 
@@ -56,145 +200,139 @@ def fetch_phone_details(phone_name: str) -> Optional[Dict]:
         phone_name (str): The exact model name of the phone (case-insensitive).
 
     Returns:
-        dict or None: Structured phone data, or None if not found.
+        dict: Structured phone data, or an error message.
     """
-    return fetch_single_phone_details(phone_name)
+    return _tool_result(await fetch_single_phone_details(phone_name))
+
+
+def _apply_plan(query, plan: CriteriaPlan):
+    """Translate a compiled criteria plan into PostgREST filters"""
+    for column, op, value in plan.predicates:
+        if op == "ilike":
+            query = query.ilike(column, f"%{value}%")
+        elif op == "eq_text":
+            query = query.eq(column, value)
+        else:
+            query = getattr(query, op)(column, value)
+
+    # Apply OR between features & use_cases
+    tag_filters = [
+        (column, json.dumps(list(values), separators=(",", ":")))
+        for column, _, values in plan.any_tags
+    ]
+    if len(tag_filters) == 1:
+        query = query.filter(tag_filters[0][0], "cs", tag_filters[0][1])
+    elif tag_filters:
+        query = query.or_(",".join(f"{column}.cs.{values}" for column, values in tag_filters))
+    return query
+
+
+async def _load_recommendations(plan: CriteriaPlan, limit: int) -> List[Dict[str, Any]]:
+    if phone_catalog.is_ready:
+        with backend_timer("recommendations", "catalog"):
+            records = phone_catalog.search(plan, limit)
+    else:
+        query = _apply_plan(
+            get_async_db().table("phones").select(select_columns(PHONE_CARD_FIELDS)), plan
+        )
+
+        # Order & execute
+        query = query.order("popularity_score", desc=True).order("rating", desc=True)
+        with backend_timer("recommendations", "supabase"):
+            response = await query.limit(limit).execute()
+        records = response.data or []
+
+    return [project_phone(record, PHONE_CARD_FIELDS) for record in records]
 
 
-@tool
-def fetch_recommendations(
-    criteria: Dict[str, Any], limit: int = 5
+async def _fetch_recommendations(
+    criteria: Dict[str, Any], limit: int
 ) -> Union[List[Dict[str, Any]], Dict[str, str]]:
-    """
-    Fetch phone recommendations from Supabase based on given criteria.
-    - Uses 'ilike' for text partial match.
-    - Uses 'cs' for JSONB containment.
-    - Combines 'features' and 'use_cases' via OR if both present.
-    """
     try:
-        query = supabase.table("phones").select("*")
-
-        VALID_KEYS = {
-            "brand",
-            "price",
-            "os",
-            "display_size_inch",
-            "display_type",
-            "refresh_rate",
-            "processor",
-            "ram_gb",
-            "storage_gb",
-            "battery_mah",
-            "charging_speed_w",
-            "rear_camera_mp",
-            "front_camera_mp",
-            "camera_features",
-            "network",
-            "features",
-            "use_cases",
-            "released_year",
-        }
-
-        TEXT_FIELDS = {
-            "brand",
-            "os",
-            "display_type",
-            "processor",
-            "network",
-            "camera_features",
-        }
-        FLOAT_FIELDS = {"display_size_inch"}
-        JSONB_FIELDS = {"features", "use_cases"}
-
-        feature_filter = None
-        usecase_filter = None
-
-        for key, value in criteria.items():
-            if key not in VALID_KEYS:
-                continue
-
-            # Handle JSONB list filters (contains)
-            if key in JSONB_FIELDS:
-                # Ensure value is a list, even if user gives a single string
-                if isinstance(value, str):
-                    value = [value]
-                if key == "features":
-                    feature_filter = f"{key}=cs.{json.dumps(value)}"
-                elif key == "use_cases":
-                    usecase_filter = f"{key}=cs.{json.dumps(value)}"
-                else:
-                    query = query.filter(key, "cs", json.dumps(value))
-                continue
-
-            # Handle numeric comparisons (<=, >=, <, >)
-            if isinstance(value, str) and re.match(
-                r"^(<=|>=|<|>)\s*\d+(\.\d+)?$", value.strip()
-            ):
-                op, num_str = re.match(
-                    r"^(<=|>=|<|>)\s*(\d+(\.\d+)?)$", value.strip()
-                ).groups()[0:2]
-                num_value = (
-                    float(num_str) if key in FLOAT_FIELDS else int(float(num_str))
-                )
-                if op == "<=":
-                    query = query.lte(key, num_value)
-                elif op == ">=":
-                    query = query.gte(key, num_value)
-                elif op == "<":
-                    query = query.lt(key, num_value)
-                elif op == ">":
-                    query = query.gt(key, num_value)
-                continue
-
-            # Handle case-insensitive "contains" text match
-            if isinstance(value, str) and key in TEXT_FIELDS:
-                query = query.ilike(key, f"%{value.lower()}%")
-                continue
-
-            # Default equality
-            query = query.eq(key, value)
-
-        # Apply OR between features & use_cases
-        if feature_filter and usecase_filter:
-            query = query.or_(f"({feature_filter},{usecase_filter})")
-        elif feature_filter:
-            query = query.filter("features", "cs", json.dumps(criteria["features"]))
-        elif usecase_filter:
-            query = query.filter("use_cases", "cs", json.dumps(criteria["use_cases"]))
-
-        # Order & execute
-        query = query.order("popularity_score", desc=True).order("rating", desc=True)
-        response = query.limit(limit).execute()
+        plan = compile_criteria(criteria)
+        results = await _cached(
+            ("recommendations", plan, limit),
+            lambda: _load_recommendations(plan, limit),
+        )
 
-        if not response.data:
+        if not results:
             return {"error": "No recommendations found based on the given criteria."}
 
-        return response.data
+        return results
 
     except Exception as e:
         return {"error": f"Error fetching recommendations: {str(e)}"}
 
 
-@tool
-def compare_phones(phone1: str, phone2: str) -> Optional[Dict]:
+@tool(response_format="content_and_artifact")
+async def fetch_recommendations(criteria: Dict[str, Any], limit: int = 5) -> Tuple[str, Any]:
     """
-    Compare two phones and return their specifications side by side.
-
-    Args:
-        phone1 (str): Full Name of the first phone.
-        phone2 (str): Full Name of the second phone.
-
-    Returns:
-        dict or None: Comparison data, or None if any phone not found.
+    Fetch phone recommendations from Supabase based on given criteria.
+    - Uses 'ilike' for text partial match.
+    - Uses 'cs' for JSONB containment.
+    - Combines 'features' and 'use_cases' via OR if both present.
     """
-    details1 = fetch_single_phone_details(phone1)
-    details2 = fetch_single_phone_details(phone2)
-
-    if "error" in details1:
-        return {"error": f"Phone 1 error: {details1['error']}"}
-    if "error" in details2:
-        return {"error": f"Phone 2 error: {details2['error']}"}
-
-    comparison = {"phone_1": details1, "phone_2": details2}
-
-    return comparison
+    return _tool_result(await _fetch_recommendations(criteria, limit))
+
+
+# Spec -> whether a higher value wins. Ties list every phone sharing the best value.
+COMPARISON_WINNER_SPECS = {
+    "price": False,
+    "battery_mah": True,
+    "charging_speed_w": True,
+    "rear_camera_mp": True,
+    "front_camera_mp": True,
+    "refresh_rate": True,
+    "ram_gb": True,
+    "storage_gb": True,
+    "rating": True,
+}
+
+
+def _spec_winners(phones: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """Names of the best phone(s) per spec, skipping specs missing on every phone."""
+    winners = {}
+    for spec, higher_is_better in COMPARISON_WINNER_SPECS.items():
+        values = [(phone[spec], phone["name"]) for phone in phones if phone.get(spec) is not None]
+        if not values:
+            continue
+        best = (max if higher_is_better else min)(value for value, _ in values)
+        winners[spec] = [name for value, name in values if value == best]
+    return winners
+
+
+async def _compare_phones(phone_names: List[str]) -> Dict[str, Any]:
+    names = list(dict.fromkeys(name.strip() for name in phone_names if name and name.strip()))
+    if len(names) < 2:
+        return {"error": "Please provide at least two different phones to compare."}
+    if len(names) > settings.COMPARE_MAX_PHONES:
+        return {"error": f"I can compare up to {settings.COMPARE_MAX_PHONES} phones at a time."}
+
+    results = await asyncio.gather(*(fetch_single_phone_details(name) for name in names))
+
+    errors = [result["error"] for result in results if "error" in result]
+    if errors:
+        return {"error": " ".join(errors)}
+
+    phones = list({phone["name"]: phone for phone in results}.values())
+    if len(phones) < 2:
+        return {"error": "These names all refer to the same phone, please name different models."}
+
+    phones = [project_phone(phone, PHONE_SPEC_FIELDS) for phone in phones]
+    return {"phones": phones, "winners": _spec_winners(phones)}
+
+
+@tool(
+    response_format="content_and_artifact",
+    # Given as the description rather than the docstring so the limit follows the setting
+    description=(
+        f"Compare 2 to {settings.COMPARE_MAX_PHONES} phones and return their specifications side by side.\n\n"
+        "Args:\n"
+        "    phone_names (list[str]): Full names of the phones to compare, in the order the user gave them.\n\n"
+        "Returns:\n"
+        '    dict: {"phones": [specs, ...], "winners": {spec: [phone names]}}, or an error message.'
+    ),
+)
+async def compare_phones(phone_names: List[str]) -> Tuple[str, Any]:
+    """Compare up to COMPARE_MAX_PHONES phones side by side (see the tool description)"""
+    return _tool_result(await _compare_phones(phone_names))
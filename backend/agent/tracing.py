@@ -0,0 +1,242 @@
+"""
+Per-request tracing of the agent graph.
+
+A `RequestTrace` is opened for every processed message. Its callback
+handler is passed to the graph run and times each node (Fast Path
+Classifier, Intent Classifier, Database API Call Preparation, Fetch Data,
+the handlers, ...) and collects token usage for every model call made
+inside a node. Tools and caches report backend latency and hits/misses
+through `record_backend_call` / `record_cache_lookup`, which find the
+current trace through a context variable.
+
+Every measurement also feeds the Prometheus metrics served on `/metrics`.
+The per-request breakdown from `RequestTrace.finish` is attached to the
+`response` log event.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from core.config import settings
+from core.metrics import TOKEN_BUCKETS, metrics
+
+NODE_SECONDS = metrics.histogram(
+    "chatbot_node_duration_seconds", "Wall time of one graph node run", ["node"]
+)
+REQUEST_SECONDS = metrics.histogram(
+    "chatbot_request_duration_seconds", "Wall time of one processed message", ["intent"]
+)
+LLM_TOKENS = metrics.histogram(
+    "chatbot_llm_tokens", "Tokens per model call; cached is the part of input read from cache",
+    ["node", "model", "type"], buckets=TOKEN_BUCKETS,
+)
+LLM_COST = metrics.counter(
+    "chatbot_llm_cost_usd_total", "Estimated model cost from token usage", ["node", "model"]
+)
+BACKEND_SECONDS = metrics.histogram(
+    "chatbot_tool_backend_duration_seconds", "Latency of one data backend lookup made by a tool",
+    ["operation", "backend"],
+)
+CACHE_LOOKUPS = metrics.counter(
+    "chatbot_cache_lookups_total", "Cache lookups by cache and result", ["cache", "result"]
+)
+
+_current_trace: ContextVar[Optional["RequestTrace"]] = ContextVar("request_trace", default=None)
+
+
+def llm_cost(model: str, input_tokens: int, cached_tokens: int, output_tokens: int) -> float:
+    """Estimated USD cost of one call to `model`"""
+    price = settings.model_price(model)
+    if price is None:
+        return 0.0
+    return (
+        (input_tokens - cached_tokens) * price.input
+        + cached_tokens * price.cached_input
+        + output_tokens * price.output
+    ) / 1_000_000
+
+
+def _usage(response: LLMResult) -> Optional[Dict[str, Any]]:
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage
+    return None
+
+
+class NodeTracer(BaseCallbackHandler):
+    """Callback handler that reports node runs and model usage to a `RequestTrace`"""
+
+    # Called synchronously from the thread running the node, so timings are not
+    # skewed by callback scheduling
+    run_inline = True
+
+    def __init__(self, trace: "RequestTrace"):
+        self.trace = trace
+        self._nodes: Dict[UUID, Tuple[str, float]] = {}
+        self._model_nodes: Dict[UUID, Tuple[str, str]] = {}
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        # A node's own run carries its name; runs nested inside it only inherit the metadata
+        if node is not None and kwargs.get("name") == node:
+            self._nodes[run_id] = (node, time.perf_counter())
+
+    def _end_chain(self, run_id: UUID):
+        started = self._nodes.pop(run_id, None)
+        if started is not None:
+            node, start = started
+            self.trace.add_node_time(node, time.perf_counter() - start)
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs):
+        self._end_chain(run_id)
+
+    def on_chain_error(self, error, *, run_id: UUID, **kwargs):
+        self._end_chain(run_id)
+
+    def _start_model(self, run_id: UUID, metadata: Optional[Dict[str, Any]]):
+        metadata = metadata or {}
+        self._model_nodes[run_id] = (
+            metadata.get("langgraph_node") or "unknown", metadata.get("ls_model_name") or "unknown"
+        )
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs):
+        self._start_model(run_id, metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, metadata=None, **kwargs):
+        self._start_model(run_id, metadata)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        node, model = self._model_nodes.pop(run_id, ("unknown", "unknown"))
+        self.trace.add_llm_usage(node, model, _usage(response))
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs):
+        self._model_nodes.pop(run_id, None)
+
+
+class RequestTrace:
+    """Timings, token usage and cache hits of one processed message"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.handler = NodeTracer(self)
+        self._nodes: Dict[str, Dict[str, Any]] = {}
+        self._backend_calls: List[Dict[str, Any]] = []
+        self._caches: Dict[str, Dict[str, int]] = {}
+        self._lock = Lock()
+
+    def _node(self, node: str) -> Dict[str, Any]:
+        return self._nodes.setdefault(node, {
+            "runs": 0, "ms": 0.0, "llm_calls": 0,
+            "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0, "cost_usd": 0.0,
+        })
+
+    def add_node_time(self, node: str, seconds: float):
+        NODE_SECONDS.observe(seconds, node=node)
+        with self._lock:
+            stats = self._node(node)
+            stats["runs"] += 1
+            stats["ms"] += seconds * 1000
+
+    def add_llm_usage(self, node: str, model: str, usage: Optional[Dict[str, Any]]):
+        input_tokens = cached = output_tokens = 0
+        if usage:
+            input_tokens = usage.get("input_tokens", 0)
+            cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+            output_tokens = usage.get("output_tokens", 0)
+            LLM_TOKENS.observe(input_tokens, node=node, model=model, type="input")
+            LLM_TOKENS.observe(cached, node=node, model=model, type="cached")
+            LLM_TOKENS.observe(output_tokens, node=node, model=model, type="output")
+        cost = llm_cost(model, input_tokens, cached, output_tokens)
+        LLM_COST.inc(cost, node=node, model=model)
+        with self._lock:
+            stats = self._node(node)
+            stats["llm_calls"] += 1
+            stats["model"] = model
+            stats["input_tokens"] += input_tokens
+            stats["cached_tokens"] += cached
+            stats["output_tokens"] += output_tokens
+            stats["cost_usd"] += cost
+
+    def add_backend_call(self, operation: str, backend: str, seconds: float):
+        with self._lock:
+            self._backend_calls.append(
+                {"operation": operation, "backend": backend, "ms": round(seconds * 1000, 2)}
+            )
+
+    def add_cache_lookup(self, cache: str, hit: bool):
+        with self._lock:
+            counts = self._caches.setdefault(cache, {"hits": 0, "misses": 0})
+            counts["hits" if hit else "misses"] += 1
+
+    def finish(self, intent: Optional[str]) -> Dict[str, Any]:
+        """Record the request duration and return the per-node breakdown"""
+        seconds = time.perf_counter() - self.started
+        REQUEST_SECONDS.observe(seconds, intent=intent or "none")
+        with self._lock:
+            totals = {
+                key: sum(stats[key] for stats in self._nodes.values())
+                for key in ("input_tokens", "cached_tokens", "output_tokens", "cost_usd")
+            }
+            # Model usage fields are left out for nodes that made no model call
+            nodes = {
+                node: {
+                    key: value if key == "model" else round(value, 8 if key == "cost_usd" else 2)
+                    for key, value in stats.items()
+                    if key in ("runs", "ms") or stats["llm_calls"]
+                }
+                for node, stats in self._nodes.items()
+            }
+            return {
+                "total_ms": round(seconds * 1000, 2),
+                "nodes": nodes,
+                "backend_calls": list(self._backend_calls),
+                "caches": {cache: dict(counts) for cache, counts in self._caches.items()},
+                **totals,
+                "cost_usd": round(totals["cost_usd"], 8),
+            }
+
+
+@contextmanager
+def request_trace() -> Iterator[Optional[RequestTrace]]:
+    """Open a trace for the current message, or yield None when tracing is disabled"""
+    if not settings.TRACING_ENABLED:
+        yield None
+        return
+    trace = RequestTrace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def record_backend_call(operation: str, backend: str, seconds: float):
+    BACKEND_SECONDS.observe(seconds, operation=operation, backend=backend)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_backend_call(operation, backend, seconds)
+
+
+@contextmanager
+def backend_timer(operation: str, backend: str) -> Iterator[None]:
+    """Time a data backend lookup, including lookups that raise"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_backend_call(operation, backend, time.perf_counter() - start)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_cache_lookup(cache, hit)
@@ -1,15 +1,137 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
 from datetime import datetime
+from typing import Any, Awaitable, Dict, Optional, Tuple, TypeVar
+import asyncio
 import logging
 
 from api.models import ChatRequest, ChatResponse, NewSessionResponse, ErrorResponse
 from core.session_manager import session_manager
-from agent.graph import process_message
+from agent.graph import process_message, stream_message
+from agent.conversation_memory import conversation_memory
+from agent.fast_path_classifier import fast_path_classifier
+from agent.model_client import model_client
+from agent.prompt_registry import prompt_registry
+from agent.speculation import speculation_tracker
+from agent.tools.supabase_tools import tool_cache, tool_flight
+from agent.tools.criteria_plan import plan_cache
+from core.admission import AdmissionRejected, AdmissionTicket, admission_controller
+from core.deadline import DeadlineExceeded
 from core.log_service import log_service
+from core.metrics import metrics
+from core.response_cache import response_cache
+from core.serialization import FastJSONResponse, dumps, pre_encode
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+T = TypeVar("T")
+
+ABANDONED = metrics.counter(
+    "chatbot_requests_abandoned_total",
+    "Chat requests stopped before completion (disconnect, deadline)",
+    ["reason"],
+)
+
+# nginx's status for a request the client closed before the response was ready
+CLIENT_CLOSED_REQUEST = 499
+
+
+class ClientDisconnected(Exception):
+    """The client went away before the response was ready"""
+
+
+async def _resolve_session(session_id: Optional[str]) -> Tuple[str, Dict]:
+    """Create a new session or fetch an existing one, raising 404 if it expired"""
+    if not session_id:
+        session_id = await session_manager.create_session()
+        log_service.log_event(session_id, "new_session")
+        logger.info(f"Created new session: {session_id}")
+
+    session = await session_manager.get_session(session_id)
+    if not session:
+        log_service.log_event(session_id, "error", error_details="Session not found or expired")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found or expired. Please create a new session."
+        )
+
+    return session_id, session
+
+
+def _too_many_requests(rejected: AdmissionRejected) -> HTTPException:
+    """429 for a request the admission controller turned away"""
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="The assistant is busy right now. Please try again shortly.",
+        headers={"Retry-After": str(rejected.retry_after)},
+    )
+
+
+def _gateway_timeout() -> HTTPException:
+    """504 for a request that ran out of its deadline budget"""
+    return HTTPException(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        detail="The assistant took too long to answer. Please try again.",
+    )
+
+
+async def _wait_for_disconnect(http_request: Request):
+    while (await http_request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _unless_disconnected(http_request: Request, work: Awaitable[T]) -> T:
+    """
+    Await `work`, cancelling it if the client disconnects first
+
+    Raises:
+        ClientDisconnected: once `work` has been cancelled and has stopped
+    """
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(http_request))
+    try:
+        done, _ = await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except BaseException:
+        task.cancel()
+        raise
+    finally:
+        watcher.cancel()
+    if task in done:
+        return task.result()
+
+    # Wait for the graph to unwind, so the admission slot is only freed once it has stopped
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    raise ClientDisconnected()
+
+
+class _AdmittedStreamingResponse(StreamingResponse):
+    """
+    Streaming response that releases its admission ticket however it ends
+
+    Starlette never starts the body iterator if the client is gone before the
+    first chunk, so the iterator's own cleanup cannot be relied on for this.
+    """
+
+    def __init__(self, content: Any, ticket: AdmissionTicket, **kwargs: Any):
+        super().__init__(content, **kwargs)
+        self.ticket = ticket
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.ticket.release()
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format a server-sent event"""
+    return f"event: {event}\ndata: {dumps(data).decode()}\n\n"
+
 
 @router.post(
     "/chat",
@@ -17,10 +139,12 @@ router = APIRouter()
     responses={
         400: {"model": ErrorResponse},
         404: {"model": ErrorResponse},
-        500: {"model": ErrorResponse}
+        429: {"model": ErrorResponse},
+        500: {"model": ErrorResponse},
+        504: {"model": ErrorResponse}
     }
 )
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
     """
     Process a chat message and return AI response
     
@@ -29,49 +153,53 @@ async def chat(request: ChatRequest):
     """
     session_id = request.session_id
     try:
-        if not session_id:
-            session_id = session_manager.create_session()
-            log_service.log_event(session_id, "new_session")
-            logger.info(f"Created new session: {session_id}")
-        else:
-            session = session_manager.get_session(session_id)
-            if not session:
-                log_service.log_event(session_id, "error", error_details="Session not found or expired")
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Session not found or expired. Please create a new session."
-                )
-
-        session = session_manager.get_session(session_id)
-        
-        log_service.log_event(session_id, "message", user_message=request.message)
+        # Held until the history is stored, so turns of one session never overlap
+        async with admission_controller.admit(session_id):
+            session_id, session = await _resolve_session(session_id)
+
+            log_service.log_event(session_id, "message", user_message=request.message)
+
+            history = conversation_memory.build_history(session)
+            result = await _unless_disconnected(http_request, process_message(
+                message=request.message,
+                conversation_history=history
+            ))
+
+            await conversation_memory.store(session_id, history, result["messages"])
 
-        result = await process_message(
-            message=request.message,
-            conversation_history=session["messages"]
-        )
-        
-        session_manager.update_session(session_id, result["messages"])
-        
         log_service.log_event(
             session_id,
             "response",
             user_message=request.message,
             bot_response=result.get("response", ""),
             intent=result.get("intent"),
-            metadata={"context_data": result.get("context_data")}
+            metadata={"context_data": result.get("context_data"), "trace": result.get("trace")}
         )
 
         logger.info(f"Processed message for session {session_id}, intent: {result.get('intent')}")
-        
-        return ChatResponse(
-            session_id=session_id,
-            intent=result.get("intent"),
-            response=result.get("response", ""),
-            context_data=result.get("context_data"),
-            timestamp=datetime.now().isoformat()
-        )
+
+        # Encoded once, straight from the tool artifact; `ChatResponse` only documents the shape
+        return FastJSONResponse({
+            "session_id": session_id,
+            "intent": result.get("intent"),
+            "response": result.get("response", ""),
+            "context_data": result.get("context_data"),
+            "timestamp": datetime.now().isoformat(),
+        })
     
+    except AdmissionRejected as rejected:
+        log_service.log_event(session_id or "unknown", "error", error_details=str(rejected))
+        raise _too_many_requests(rejected)
+    except ClientDisconnected:
+        ABANDONED.inc(reason="disconnect")
+        log_service.log_event(session_id, "error", error_details="Client disconnected")
+        logger.info(f"Client disconnected, cancelled message for session {session_id}")
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except DeadlineExceeded as exceeded:
+        ABANDONED.inc(reason="deadline")
+        log_service.log_event(session_id or "unknown", "error", error_details=str(exceeded))
+        logger.warning(f"Message for session {session_id} abandoned: {exceeded}")
+        raise _gateway_timeout()
     except HTTPException as he:
         # Log HTTP exceptions specifically
         log_service.log_event(session_id or "unknown", "error", error_details=str(he.detail))
@@ -86,6 +214,115 @@ async def chat(request: ChatRequest):
         )
 
 
+@router.post(
+    "/chat/stream",
+    responses={
+        200: {"content": {"text/event-stream": {}}},
+        404: {"model": ErrorResponse},
+        429: {"model": ErrorResponse},
+        500: {"model": ErrorResponse}
+    }
+)
+async def chat_stream(request: ChatRequest):
+    """
+    Process a chat message and stream the AI response as server-sent events
+    
+    Events, in order:
+    - **session**: the session ID used for this conversation
+    - **intent**: the classified intent, as soon as it is known
+    - **context_data**: data fetched for data-based intents
+    - **token**: chunks of the response text as they are generated
+    - **done**: the complete response, same shape as `/chat`
+    - **error**: emitted instead of `done` if processing fails
+    """
+    session_id = request.session_id
+    try:
+        # Released as soon as the stream ends, and in any case once the response is done
+        ticket = await admission_controller.acquire(session_id)
+    except AdmissionRejected as rejected:
+        log_service.log_event(session_id or "unknown", "error", error_details=str(rejected))
+        raise _too_many_requests(rejected)
+
+    try:
+        session_id, session = await _resolve_session(session_id)
+    except BaseException as e:
+        ticket.release()
+        if isinstance(e, HTTPException):
+            log_service.log_event(session_id or "unknown", "error", error_details=str(e.detail))
+        raise
+
+    log_service.log_event(session_id, "message", user_message=request.message)
+
+    async def event_stream():
+        events = None
+        # The tool artifact, encoded once for both the context_data and the done event
+        artifact = encoded_artifact = None
+        try:
+            history = conversation_memory.build_history(session)
+            events = stream_message(message=request.message, conversation_history=history)
+            yield _sse_event("session", {"session_id": session_id})
+            async for event in events:
+                if event["event"] == "intent":
+                    yield _sse_event("intent", {"intent": event["intent"]})
+                elif event["event"] == "context_data":
+                    artifact = event["context_data"]
+                    encoded_artifact = pre_encode(artifact)
+                    yield _sse_event("context_data", {"context_data": encoded_artifact})
+                elif event["event"] == "token":
+                    yield _sse_event("token", {"text": event["text"]})
+                elif event["event"] == "done":
+                    await conversation_memory.store(session_id, history, event["messages"])
+
+                    log_service.log_event(
+                        session_id,
+                        "response",
+                        user_message=request.message,
+                        bot_response=event.get("response", ""),
+                        intent=event.get("intent"),
+                        metadata={"context_data": event.get("context_data"), "trace": event.get("trace")}
+                    )
+
+                    logger.info(f"Streamed message for session {session_id}, intent: {event.get('intent')}")
+
+                    context_data = event.get("context_data")
+                    yield _sse_event("done", {
+                        "session_id": session_id,
+                        "intent": event.get("intent"),
+                        "response": event.get("response", ""),
+                        "context_data": encoded_artifact if context_data is artifact else context_data,
+                        "timestamp": datetime.now().isoformat(),
+                    })
+        except asyncio.CancelledError:
+            # The client disconnected; the finally block below stops the graph
+            ABANDONED.inc(reason="disconnect")
+            log_service.log_event(session_id, "error", error_details="Client disconnected")
+            logger.info(f"Client disconnected, cancelled stream for session {session_id}")
+            raise
+        except DeadlineExceeded as exceeded:
+            ABANDONED.inc(reason="deadline")
+            log_service.log_event(session_id, "error", error_details=str(exceeded))
+            logger.warning(f"Stream for session {session_id} abandoned: {exceeded}")
+            yield _sse_event("error", {"detail": _gateway_timeout().detail})
+        except Exception as e:
+            log_service.log_event(session_id, "error", error_details=str(e))
+            logger.error(f"Error streaming chat message: {e}", exc_info=True)
+            yield _sse_event("error", {"detail": "Error processing your message. Please try again."})
+        finally:
+            # Closing the stream stops the graph, even if this generator is dropped at a yield
+            try:
+                if events is not None:
+                    await events.aclose()
+            finally:
+                ticket.release()
+
+    return _AdmittedStreamingResponse(
+        event_stream(),
+        ticket,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post(
     "/sessions/new",
     response_model=NewSessionResponse,
@@ -94,7 +331,7 @@ async def chat(request: ChatRequest):
 async def create_new_session():
     """Create a new chat session"""
     try:
-        session_id = session_manager.create_session()
+        session_id = await session_manager.create_session()
         log_service.log_event(session_id, "new_session")
         logger.info(f"Created new session via endpoint: {session_id}")
         return NewSessionResponse(
@@ -118,7 +355,7 @@ async def create_new_session():
 async def delete_session(session_id: str):
     """Delete a chat session"""
     try:
-        session_manager.delete_session(session_id)
+        await session_manager.delete_session(session_id)
         logger.info(f"Deleted session: {session_id}")
         return None
     except Exception as e:
@@ -133,7 +370,7 @@ async def delete_session(session_id: str):
 async def get_session_history(session_id: str):
     """Get conversation history for a session"""
     try:
-        session = session_manager.get_session(session_id)
+        session = await session_manager.get_session(session_id)
         if not session:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -143,6 +380,8 @@ async def get_session_history(session_id: str):
         return {
             "session_id": session_id,
             "messages": session["messages"],
+            "summary": session.get("summary"),
+            "memory": conversation_memory.session_stats(session),
             "created_at": session["created_at"].isoformat(),
             "last_accessed": session["last_accessed"].isoformat()
         }
@@ -154,3 +393,20 @@ async def get_session_history(session_id: str):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error retrieving session history"
         )
+
+
+@router.get("/stats")
+async def get_stats():
+    """Get runtime counters for the agent pipeline"""
+    return {
+        "fast_path": fast_path_classifier.stats(),
+        "response_cache": response_cache.stats(),
+        "tool_cache": {**tool_cache.stats(), "single_flight": tool_flight.stats()},
+        "criteria_plans": plan_cache.stats(),
+        "log_writer": log_service.stats(),
+        "conversation_memory": conversation_memory.stats(),
+        "prompt_cache": prompt_registry.stats(),
+        "admission": admission_controller.stats(),
+        "speculation": speculation_tracker.stats(),
+        "model_client": model_client.stats(),
+    }
@@ -0,0 +1,105 @@
+"""
+Token cost of the tool result the response model reads, per encoding.
+
+Builds details, recommendation and comparison results from a sample of
+phone rows, then measures the text handed to the intent handlers as:
+    - full_json: full rows as JSON, as `ToolNode` produced them before
+      column projections
+    - projected_json: the projected ToolMessage content from `_tool_result`
+    - table: the compact table rendering from `encode_tool_result`
+
+Tokens are approximated with `count_tokens_approximately` by default.
+`--gemini` counts them with the Gemini tokenizer instead; that calls the
+API once per text, so it needs GOOGLE_API_KEY.
+
+Usage (from the backend directory):
+    python -m benchmarks.context_encoding_benchmark
+    python -m benchmarks.context_encoding_benchmark --gemini
+"""
+import argparse
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from langchain_core.messages import ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+from agent.context_encoding import encode_tool_result
+from agent.models.phone_details_table_schema import (
+    PHONE_CARD_FIELDS,
+    PHONE_DETAIL_FIELDS,
+    PHONE_SPEC_FIELDS,
+    project_phone,
+)
+from agent.tools.supabase_tools import _spec_winners, _tool_result
+
+DEFAULT_PHONES = Path(__file__).parent / "data" / "phones_sample.jsonl"
+
+
+def build_scenarios(rows: List[Dict[str, Any]]) -> Dict[str, List[Tuple[Any, Any]]]:
+    """Scenario -> list of (full result, projected result) pairs"""
+    details = [project_phone(row, PHONE_DETAIL_FIELDS) for row in rows]
+    ranked = sorted(rows, key=lambda row: -(row.get("popularity_score") or 0))
+
+    def comparison(phones: List[Dict[str, Any]], fields) -> Dict[str, Any]:
+        phones = [project_phone(phone, fields) for phone in phones]
+        return {"phones": phones, "winners": _spec_winners(phones)}
+
+    return {
+        "details": [(phone, phone) for phone in details],
+        "recommend_5": [
+            (window, [project_phone(row, PHONE_CARD_FIELDS) for row in window])
+            for window in (ranked[i:i + 5] for i in range(len(ranked) - 4))
+        ],
+        "compare_2": [
+            (comparison(details[i:i + 2], PHONE_DETAIL_FIELDS), comparison(details[i:i + 2], PHONE_SPEC_FIELDS))
+            for i in range(len(details) - 1)
+        ],
+        "compare_4": [
+            (comparison(details[i:i + 4], PHONE_DETAIL_FIELDS), comparison(details[i:i + 4], PHONE_SPEC_FIELDS))
+            for i in range(len(details) - 3)
+        ],
+    }
+
+
+ENCODINGS: Dict[str, Callable[[Any, Any], str]] = {
+    "full_json": lambda full, projected: json.dumps(full, ensure_ascii=False),
+    "projected_json": lambda full, projected: _tool_result(projected)[0],
+    "table": lambda full, projected: encode_tool_result(projected),
+}
+
+
+def approximate_tokens(text: str) -> int:
+    return count_tokens_approximately([ToolMessage(content=text, tool_call_id="benchmark")])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--phones", type=Path, default=DEFAULT_PHONES, help="JSONL file of phone rows")
+    parser.add_argument("--gemini", action="store_true", help="Count tokens with the Gemini tokenizer (API calls)")
+    args = parser.parse_args()
+
+    with open(args.phones, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+
+    count_tokens = approximate_tokens
+    if args.gemini:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        count_tokens = ChatGoogleGenerativeAI(model="gemini-2.5-flash").get_num_tokens
+
+    print(f"{'scenario':<12} {'encoding':<15} {'chars':>7} {'tokens':>7} {'vs full':>8}")
+    print("-" * 53)
+    for scenario, results in build_scenarios(rows).items():
+        baseline = None
+        for encoding, encode in ENCODINGS.items():
+            texts = [encode(full, projected) for full, projected in results]
+            chars = sum(len(text) for text in texts) / len(texts)
+            tokens = sum(count_tokens(text) for text in texts) / len(texts)
+            baseline = baseline or tokens
+            print(f"{scenario:<12} {encoding:<15} {chars:>7.0f} {tokens:>7.0f} {tokens / baseline - 1:>+8.0%}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Microbenchmark of criteria compilation for `fetch_recommendations`.
+
+For every criteria dict in the corpus, measures:
+    - select_only: creating the query builder, the floor for the next three
+    - legacy: the previous inline compilation (sets rebuilt per call, the
+      comparison regex matched twice, filters chained onto the query builder)
+    - plan_cold: `compile_criteria` with an empty plan cache, plus applying
+      the plan to the query builder
+    - plan_warm: the same with the plan cache populated
+    - catalog: evaluating the compiled plan against the in-memory catalog
+
+Also reports how many distinct plans (and so recommendation cache keys) the
+corpus collapses to.
+
+Usage (from the backend directory):
+    python -m benchmarks.criteria_benchmark --repeat 2000
+"""
+import argparse
+import json
+import random
+import re
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from agent.tools.criteria_plan import compile_criteria, plan_cache
+from agent.tools.phone_catalog import PhoneCatalog
+from agent.tools.supabase_tools import _apply_plan
+from core.supabase_client import get_async_db
+
+DEFAULT_CORPUS = Path(__file__).parent / "data" / "criteria_corpus.jsonl"
+
+
+def legacy_build_query(query, criteria: Dict[str, Any]):
+    """The pre-plan compilation from `_load_recommendations`, kept as a baseline"""
+    VALID_KEYS = {
+        "brand", "price", "os", "display_size_inch", "display_type", "refresh_rate",
+        "processor", "ram_gb", "storage_gb", "battery_mah", "charging_speed_w",
+        "rear_camera_mp", "front_camera_mp", "camera_features", "network",
+        "features", "use_cases", "released_year",
+    }
+    TEXT_FIELDS = {"brand", "os", "display_type", "processor", "network", "camera_features"}
+    FLOAT_FIELDS = {"display_size_inch"}
+    JSONB_FIELDS = {"features", "use_cases"}
+
+    feature_filter = None
+    usecase_filter = None
+    for key, value in criteria.items():
+        if key not in VALID_KEYS:
+            continue
+        if key in JSONB_FIELDS:
+            if isinstance(value, str):
+                value = [value]
+            if key == "features":
+                feature_filter = f"{key}=cs.{json.dumps(value)}"
+            else:
+                usecase_filter = f"{key}=cs.{json.dumps(value)}"
+            continue
+        if isinstance(value, str) and re.match(r"^(<=|>=|<|>)\s*\d+(\.\d+)?$", value.strip()):
+            op, num_str = re.match(r"^(<=|>=|<|>)\s*(\d+(\.\d+)?)$", value.strip()).groups()[0:2]
+            num_value = float(num_str) if key in FLOAT_FIELDS else int(float(num_str))
+            query = {"<=": query.lte, ">=": query.gte, "<": query.lt, ">": query.gt}[op](key, num_value)
+            continue
+        if isinstance(value, str) and key in TEXT_FIELDS:
+            query = query.ilike(key, f"%{value.lower()}%")
+            continue
+        query = query.eq(key, value)
+
+    if feature_filter and usecase_filter:
+        query = query.or_(f"({feature_filter},{usecase_filter})")
+    elif feature_filter:
+        query = query.filter("features", "cs", json.dumps(criteria["features"]))
+    elif usecase_filter:
+        query = query.filter("use_cases", "cs", json.dumps(criteria["use_cases"]))
+    return query
+
+
+def synthetic_catalog(size: int) -> PhoneCatalog:
+    rng = random.Random(7)
+    brands = ["Apple", "Samsung", "OnePlus", "Google", "Xiaomi", "iQOO", "Motorola"]
+    features = ["5G", "NFC", "AMOLED Display", "Fast Charging", "Wireless Charging", "Flagship Chipset"]
+    use_cases = ["gaming", "photography", "daily use", "long battery life", "compact phone", "business", "Gaming"]
+    catalog = PhoneCatalog()
+    catalog.load([
+        {
+            "id": i,
+            "name": f"{rng.choice(brands)} Model {i}",
+            "brand": rng.choice(brands),
+            "price": rng.randrange(7000, 160000, 500),
+            "os": rng.choice(["Android", "iOS"]),
+            "display_size_inch": rng.choice([6.1, 6.4, 6.7, 6.8]),
+            "display_type": rng.choice(["AMOLED", "LTPO AMOLED", "LCD"]),
+            "refresh_rate": rng.choice([60, 90, 120, 144]),
+            "processor": rng.choice(["Snapdragon 8 Gen 2", "Dimensity 8200", "Apple A17 Pro", "Tensor G3"]),
+            "ram_gb": rng.choice([4, 6, 8, 12, 16]),
+            "storage_gb": rng.choice([64, 128, 256, 512]),
+            "battery_mah": rng.randrange(3000, 7000, 100),
+            "charging_speed_w": rng.choice([18, 33, 45, 67, 100, 120]),
+            "rear_camera_mp": rng.choice([12, 48, 50, 64, 108, 200]),
+            "camera_features": rng.choice(["OIS", "OIS, Night Mode", "Wide Angle"]),
+            "network": rng.choice(["4G", "5G"]),
+            "released_year": rng.choice([2022, 2023, 2024]),
+            "popularity_score": rng.randrange(100),
+            "rating": rng.choice([3.8, 4.1, 4.4, 4.7]),
+            "features": rng.sample(features, 3),
+            "use_cases": rng.sample(use_cases, 2),
+        }
+        for i in range(size)
+    ])
+    return catalog
+
+
+def time_per_call(fn: Callable[[Dict[str, Any]], Any], corpus: List[Dict[str, Any]], repeat: int, before_each: Callable[[], None] = None) -> float:
+    total = 0.0
+    for _ in range(repeat):
+        if before_each:
+            before_each()
+        start = time.perf_counter()
+        for criteria in corpus:
+            fn(criteria)
+        total += time.perf_counter() - start
+    return total / (repeat * len(corpus)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS, help="JSONL file of criteria dicts")
+    parser.add_argument("--repeat", type=int, default=2000, help="Passes over the corpus per measurement")
+    parser.add_argument("--catalog-size", type=int, default=2000, help="Phones in the synthetic catalog")
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+
+    table = get_async_db().table("phones")
+    catalog = synthetic_catalog(args.catalog_size)
+
+    results = {
+        "select_only": time_per_call(lambda c: table.select("*"), corpus, args.repeat),
+        "legacy": time_per_call(lambda c: legacy_build_query(table.select("*"), c), corpus, args.repeat),
+        "plan_cold": time_per_call(
+            lambda c: _apply_plan(table.select("*"), compile_criteria(c)), corpus, args.repeat, plan_cache.clear
+        ),
+        "plan_warm": time_per_call(lambda c: _apply_plan(table.select("*"), compile_criteria(c)), corpus, args.repeat),
+        "compile_warm": time_per_call(compile_criteria, corpus, args.repeat),
+        "catalog": time_per_call(lambda c: catalog.search(compile_criteria(c), 5), corpus, max(1, args.repeat // 10)),
+    }
+
+    print(f"{'stage':<14} {'us/call':>9}")
+    print("-" * 24)
+    for stage, micros in results.items():
+        print(f"{stage:<14} {micros:>9.2f}")
+
+    raw_keys = {json.dumps(c, sort_keys=True) for c in corpus}
+    plans = {compile_criteria(c) for c in corpus}
+    print(f"\n{len(corpus)} criteria dicts, {len(raw_keys)} distinct as JSON, {len(plans)} distinct plans")
+
+
+if __name__ == "__main__":
+    main()
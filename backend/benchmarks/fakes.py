@@ -0,0 +1,352 @@
+"""
+Offline stand-ins for Gemini and Supabase, for benchmarks and load tests.
+
+    - FakeGeminiChatModel: a chat model that answers from a script keyed by
+      the user's message, after a configurable delay (with an optional slow
+      tail and injected 503 errors), and reports token usage like Gemini does. It supports the structured output and tool
+      binding calls the graph makes. Named models can be made to fail, to
+      exercise fallbacks.
+    - FakeSupabase: an in-memory PostgREST stand-in behind an
+      `httpx.MockTransport`. It serves the `phones` table (filters, order,
+      limit/offset), counts `logs` inserts and answers the
+      `resolve_phone_name` RPC. The real client, connection pool and query
+      builders are used unchanged.
+    - synthetic_phones: a deterministic `phones` table of any size.
+
+`install_fakes` must run before `main` or `agent.graph` is imported: the
+graph builds its models at import time.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import httpx
+from google.api_core.exceptions import ServiceUnavailable
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+FAKE_SUPABASE_URL = "http://supabase.offline"
+
+# Settings requires these to import; the fakes never send them anywhere
+OFFLINE_ENV = {
+    "GOOGLE_API_KEY": "offline",
+    "SUPABASE_URL": FAKE_SUPABASE_URL,
+    "SUPABASE_KEY": "offline",
+}
+
+
+class ScriptedTurn(NamedTuple):
+    """What the fake model "decides" for one user message"""
+
+    intent: str
+    tool_name: Optional[str] = None
+    tool_args: Optional[Dict[str, Any]] = None
+
+
+class ModelProfile:
+    """Latency, failures and output size of the fake model, shared by every instance"""
+
+    def __init__(self, latency: float = 0.3, jitter: float = 0.1, output_tokens: int = 120, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.output_tokens = output_tokens
+        # Share of calls that take `tail_latency` instead, like a slow upstream replica
+        self.tail_rate = 0.0
+        self.tail_latency = 5.0
+        # Share of calls that fail with 503 after the usual latency
+        self.error_rate = 0.0
+        # Models whose every call fails with 503
+        self.failing_models: Set[str] = set()
+        self.script: Dict[str, ScriptedTurn] = {}
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    def delay(self) -> float:
+        if self.tail_rate and self._random.random() < self.tail_rate:
+            return self.tail_latency
+        return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+    def fails(self, model: str) -> bool:
+        if model in self.failing_models:
+            return True
+        return bool(self.error_rate) and self._random.random() < self.error_rate
+
+
+profile = ModelProfile()
+
+
+def _last_user_message(messages: Sequence[BaseMessage]) -> str:
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            return str(message.content)
+    return ""
+
+
+class FakeGeminiChatModel(BaseChatModel):
+    """Deterministic drop-in for `ChatGoogleGenerativeAI`, driven by `profile`"""
+
+    model: str = "gemini-2.5-flash"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def _reply(self, messages: List[BaseMessage], **kwargs: Any) -> AIMessage:
+        profile.calls += 1
+        turn = profile.script.get(_last_user_message(messages), ScriptedTurn("chitchat"))
+        schema = kwargs.get("structured")
+
+        if schema is not None:
+            content = {"intent": turn.intent}
+            if "tool_name" in schema.model_fields and turn.tool_name:
+                content.update(tool_name=turn.tool_name, tool_args=turn.tool_args)
+            message = AIMessage(content=json.dumps(content))
+        elif kwargs.get("tools") and turn.tool_name in kwargs["tools"]:
+            message = AIMessage(
+                content="",
+                tool_calls=[{"name": turn.tool_name, "args": turn.tool_args or {}, "id": f"call_{time.time_ns()}"}],
+            )
+        else:
+            # Roughly one token per short word
+            message = AIMessage(content=" ".join(["phone"] * profile.output_tokens))
+
+        input_tokens = count_tokens_approximately(messages)
+        output_tokens = count_tokens_approximately([message])
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        return message
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(profile.delay())
+        if profile.fails(self.model):
+            raise ServiceUnavailable("fake Gemini is overloaded")
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages, **kwargs))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(profile.delay())
+        if profile.fails(self.model):
+            raise ServiceUnavailable("fake Gemini is overloaded")
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages, **kwargs))])
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[tool.name for tool in tools])
+
+    def with_structured_output(self, schema, *, include_raw: bool = False, **kwargs):
+        def parse(message: AIMessage):
+            parsed = schema.model_validate_json(message.content)
+            if include_raw:
+                return {"raw": message, "parsed": parsed, "parsing_error": None}
+            return parsed
+
+        return self.bind(structured=schema) | RunnableLambda(parse)
+
+
+BRANDS = {
+    "Samsung": ("Galaxy S", "Galaxy A", "Galaxy M"),
+    "Apple": ("iPhone",),
+    "OnePlus": ("OnePlus", "OnePlus Nord"),
+    "Xiaomi": ("Redmi Note", "Xiaomi"),
+    "Google": ("Pixel",),
+    "Vivo": ("Vivo V", "Vivo T"),
+    "Realme": ("Realme", "Realme Narzo"),
+    "Motorola": ("Moto G", "Motorola Edge"),
+}
+SUFFIXES = ("", " Pro", " Plus", " Ultra", " Lite", "a", " 5G")
+FEATURES = ("Fast Charging", "Wireless Charging", "AMOLED Display", "Stereo Speakers", "IP68", "5G", "eSIM")
+USE_CASES = ("Gaming", "Photography", "Battery Life", "Everyday Use", "Business", "Vlogging")
+PROCESSORS = ("Snapdragon 8 Gen 3", "Snapdragon 7 Gen 3", "Dimensity 9300", "Dimensity 7200", "Tensor G3", "A17 Pro", "Exynos 2400")
+
+
+def synthetic_phones(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """`count` phone rows with unique names and plausible specs"""
+    rng = random.Random(seed)
+    names = set()
+    rows = []
+    while len(rows) < count:
+        brand = rng.choice(list(BRANDS))
+        name = f"{rng.choice(BRANDS[brand])} {rng.randint(5, 60)}{rng.choice(SUFFIXES)}"
+        if name in names:
+            continue
+        names.add(name)
+        price = rng.randrange(8000, 160000, 1000) - 1
+        rows.append({
+            "id": len(rows) + 1,
+            "name": name,
+            "brand": brand,
+            "price": price,
+            "os": "iOS" if brand == "Apple" else "Android",
+            "display_size_inch": round(rng.uniform(6.0, 6.9), 1),
+            "display_type": rng.choice(("AMOLED", "LCD", "OLED")),
+            "refresh_rate": rng.choice((60, 90, 120, 144)),
+            "processor": rng.choice(PROCESSORS),
+            "ram_gb": rng.choice((4, 6, 8, 12, 16)),
+            "storage_gb": rng.choice((64, 128, 256, 512)),
+            "battery_mah": rng.randrange(4000, 6500, 100),
+            "charging_speed_w": rng.choice((18, 25, 33, 45, 67, 80, 100, 120)),
+            "rear_camera_mp": rng.choice((12, 48, 50, 64, 108, 200)),
+            "front_camera_mp": rng.choice((8, 12, 16, 32)),
+            "camera_features": "OIS, Night Mode",
+            "network": "5G",
+            "weight_g": rng.randrange(160, 240),
+            "rating": round(rng.uniform(3.5, 4.9), 1),
+            "popularity_score": rng.randint(1, 100),
+            "features": rng.sample(FEATURES, 3),
+            "use_cases": rng.sample(USE_CASES, 2),
+            "pros": ["Good value"],
+            "cons": ["No headphone jack"],
+            "released_year": rng.choice((2022, 2023, 2024, 2025)),
+        })
+    return rows
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Split an `or=(...)` list on commas that are not inside [...] or "..." """
+    parts, depth, quoted, current = [], 0, False, ""
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char in "[(":
+            depth += 1
+        elif not quoted and char in "])":
+            depth -= 1
+        if char == "," and depth == 0 and not quoted:
+            parts.append(current)
+            current = ""
+        else:
+            current += char
+    return parts + [current]
+
+
+def _coerce(value: str, like: Any) -> Any:
+    if isinstance(like, bool):
+        return value == "true"
+    if isinstance(like, (int, float)):
+        return float(value)
+    return value
+
+
+def _matches(row: Dict[str, Any], column: str, op: str, value: str) -> bool:
+    field = row.get(column)
+    if op == "cs":
+        return field is not None and set(json.loads(value)) <= set(field)
+    if field is None:
+        return False
+    if op == "ilike":
+        pattern = re.escape(value.lower()).replace("%", ".*").replace(r"\*", ".*")
+        return re.fullmatch(pattern, str(field).lower(), re.DOTALL) is not None
+    target = _coerce(value, field)
+    if op == "eq":
+        return field == target
+    if op == "neq":
+        return field != target
+    return {"lt": field < target, "lte": field <= target, "gt": field > target, "gte": field >= target}[op]
+
+
+def _condition(column: str, expression: str):
+    op, _, value = expression.partition(".")
+    return lambda row: _matches(row, column, op, value)
+
+
+class FakeSupabase:
+    """In-memory PostgREST for the `phones` and `logs` tables"""
+
+    def __init__(self, phones: List[Dict[str, Any]], latency: float = 0.0):
+        from agent.tools.phone_name_index import PhoneNameIndex
+
+        self.phones = phones
+        # Only counted, so a long run does not grow the process
+        self.logs_written = 0
+        self.latency = latency
+        self.requests = 0
+        ranked = sorted(phones, key=lambda row: -(row.get("popularity_score") or 0))
+        self._ranked = ranked
+        self._names = PhoneNameIndex([(row["name"], row["brand"]) for row in ranked])
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        path = request.url.path.removeprefix("/rest/v1/")
+
+        if request.method == "POST" and path == "logs":
+            body = json.loads(request.content)
+            self.logs_written += len(body) if isinstance(body, list) else 1
+            return httpx.Response(201)
+        if request.method == "POST" and path == "rpc/resolve_phone_name":
+            args = json.loads(request.content)
+            matches = self._names.search(args["query"], limit=args.get("max_results", 1))
+            return httpx.Response(200, json=[self._ranked[row_id] for row_id, _ in matches])
+        if request.method == "GET" and path == "phones":
+            return httpx.Response(200, json=self._select(request.url.params.multi_items()))
+        return httpx.Response(404, json={"message": f"{request.method} {path} is not emulated"})
+
+    def _select(self, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        columns, order, limit, offset = None, [], None, 0
+        conditions = []
+        for key, value in params:
+            if key == "select":
+                columns = None if value == "*" else value.split(",")
+            elif key == "order":
+                order = [term.split(".") for term in value.split(",")]
+            elif key == "limit":
+                limit = int(value)
+            elif key == "offset":
+                offset = int(value)
+            elif key == "or":
+                alternatives = []
+                for term in _split_top_level(value.strip("()")):
+                    column, _, expression = term.partition(".")
+                    alternatives.append(_condition(column, expression))
+                conditions.append(lambda row, alternatives=alternatives: any(c(row) for c in alternatives))
+            else:
+                conditions.append(_condition(key, value))
+
+        rows = [row for row in self.phones if all(condition(row) for condition in conditions)]
+        # Stable sorts applied from the last key to the first. Like PostgREST,
+        # nulls sort last ascending and first descending.
+        for column, *modifiers in reversed(order):
+            rows.sort(
+                key=lambda row: (row.get(column) is None, row.get(column) or 0),
+                reverse="desc" in modifiers,
+            )
+        rows = rows[offset:offset + limit if limit is not None else None]
+        if columns is not None:
+            rows = [{column: row.get(column) for column in columns} for row in rows]
+        return rows
+
+
+def install_fakes(phones: List[Dict[str, Any]], db_latency: float = 0.0) -> FakeSupabase:
+    """
+    Route Gemini and Supabase to the offline fakes
+
+    Must be called before `main` or `agent.graph` is imported.
+    """
+    for key, value in OFFLINE_ENV.items():
+        os.environ[key] = value
+
+    import langchain_google_genai
+
+    langchain_google_genai.ChatGoogleGenerativeAI = FakeGeminiChatModel
+
+    from core import supabase_client
+    from core.config import settings
+
+    supabase = FakeSupabase(phones, latency=db_latency)
+    supabase_client._http_client = httpx.AsyncClient(
+        transport=supabase.transport(),
+        limits=httpx.Limits(max_connections=settings.SUPABASE_POOL_MAX_CONNECTIONS),
+    )
+    return supabase
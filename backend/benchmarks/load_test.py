@@ -0,0 +1,318 @@
+"""
+Offline load test of the chat API.
+
+Runs the FastAPI app in-process, with Gemini replaced by a scripted fake
+with configurable latency and the Supabase database replaced by an
+in-memory PostgREST stand-in seeded with a synthetic `phones` table (see
+`benchmarks.fakes`). No API keys or network access are needed. The app's
+own lifespan runs, so the phone catalog, log writer, session store and
+prompt registry start as in production.
+
+Requests are drawn from a weighted mix of queries
+(data/load_mix.jsonl) and sent to `POST /api/v1/chat` over `--sessions`
+sessions by `--concurrency` concurrent clients. Reports:
+    - p50 / p95 / p99 / max latency and requests per second
+    - model calls and Supabase requests per chat request
+    - estimated model cost per chat request, and per node, from the token
+      usage of each node's model (see MODEL_PROFILES)
+    - retained memory per session, measured with tracemalloc in a separate
+      phase so tracing does not slow the timed run
+
+Any setting can be overridden through the environment as usual, e.g.
+FAST_PATH_ENABLED=false, ROUTER_MODE=fused or MODEL_HEDGE_ENABLED=false.
+
+Usage (from the backend directory):
+    python -m benchmarks.load_test --requests 2000 --concurrency 50
+    python -m benchmarks.load_test --llm-latency 0.5 --output load.json
+    python -m benchmarks.load_test --llm-tail-rate 0.02 --llm-error-rate 0.01
+    python -m benchmarks.load_test --llm-failing-model gemini-2.5-flash-lite
+    python -m benchmarks.load_test --baseline load.json --max-regression 0.1
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import httpx
+
+from benchmarks.fakes import ScriptedTurn, install_fakes, profile, synthetic_phones
+
+DEFAULT_MIX = Path(__file__).parent / "data" / "load_mix.jsonl"
+PRICES = (15000, 20000, 25000, 30000, 40000, 50000, 60000, 80000)
+
+
+def _render(value: Any, fields: Dict[str, Any]) -> Any:
+    if isinstance(value, str):
+        return value.format(**fields)
+    if isinstance(value, list):
+        return [_render(item, fields) for item in value]
+    if isinstance(value, dict):
+        return {key: _render(item, fields) for key, item in value.items()}
+    return value
+
+
+def build_workload(
+    mix_path: Path, phones: List[Dict[str, Any]], size: int, seed: int
+) -> List[str]:
+    """
+    Draw `size` queries from the weighted mix and script the fake model's answer to each
+
+    Returns:
+        The queries, in the order they are sent
+    """
+    with open(mix_path, encoding="utf-8") as f:
+        templates = [json.loads(line) for line in f if line.strip()]
+
+    rng = random.Random(seed)
+    weights = [template.get("weight", 1) for template in templates]
+    brands = sorted({phone["brand"] for phone in phones})
+    use_cases = sorted({use_case for phone in phones for use_case in phone["use_cases"]})
+
+    queries = []
+    for template in rng.choices(templates, weights=weights, k=size):
+        phone, phone2 = rng.sample(phones, 2)
+        fields = {
+            "phone": phone["name"],
+            "phone2": phone2["name"],
+            "brand": rng.choice(brands),
+            "price": rng.choice(PRICES),
+            "use_case": rng.choice(use_cases),
+        }
+        query = template["query"].format(**fields)
+        profile.script[query] = ScriptedTurn(
+            template["intent"], template.get("tool_name"), _render(template.get("tool_args"), fields)
+        )
+        queries.append(query)
+    return queries
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+async def new_sessions(client: httpx.AsyncClient, count: int) -> List[str]:
+    responses = await asyncio.gather(*(client.post("/api/v1/sessions/new") for _ in range(count)))
+    return [response.json()["session_id"] for response in responses]
+
+
+async def drive(
+    client: httpx.AsyncClient, sessions: List[str], queries: List[str], concurrency: int
+) -> Tuple[List[float], Dict[int, int], float]:
+    """
+    Send every query once from `concurrency` workers
+
+    Returns:
+        (latencies in seconds of successful requests, status code counts, wall time)
+    """
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    next_index = iter(range(len(queries)))
+
+    async def worker():
+        for i in next_index:
+            start = time.perf_counter()
+            try:
+                response = await client.post(
+                    "/api/v1/chat",
+                    json={"message": queries[i], "session_id": sessions[i % len(sessions)]},
+                )
+                status = response.status_code
+            except Exception:
+                status = 0
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - started
+
+
+async def session_memory(
+    client: httpx.AsyncClient, queries: List[str], sessions: int, turns: int, concurrency: int
+) -> float:
+    """Bytes retained per session after `turns` turns on `sessions` fresh sessions"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    ids = await new_sessions(client, sessions)
+    for turn in range(turns):
+        batch = [queries[(turn * sessions + i) % len(queries)] for i in range(sessions)]
+        await drive(client, ids, batch, concurrency)
+
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / sessions
+
+
+def model_outcomes(model_client) -> Dict[str, int]:
+    """Model call outcomes (ok, hedged_ok, retried_ok, ...) summed over all models"""
+    totals: Dict[str, int] = {}
+    for stats in model_client.stats()["models"].values():
+        for outcome, count in stats.items():
+            if isinstance(count, int):
+                totals[outcome] = totals.get(outcome, 0) + count
+    return totals
+
+
+def node_costs(model_client) -> Dict[str, float]:
+    """Estimated model cost so far per node, over its model and fallback"""
+    return {
+        node: sum(target["cost_usd"] for target in stats["targets"].values())
+        for node, stats in model_client.stats()["models"].items()
+    }
+
+
+async def run(args: argparse.Namespace, supabase) -> Dict[str, Any]:
+    # Imported only now: the graph builds its models at import time
+    import main
+    from agent.model_client import model_client
+
+    queries = build_workload(args.mix, supabase.phones, args.requests + args.warmup, args.seed)
+
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+            sessions = await new_sessions(client, args.sessions)
+            await drive(client, sessions, queries[:args.warmup], args.concurrency)
+
+            model_calls, db_requests = profile.calls, supabase.requests
+            outcomes_before = model_outcomes(model_client)
+            costs_before = node_costs(model_client)
+            latencies, statuses, wall = await drive(client, sessions, queries[args.warmup:], args.concurrency)
+            model_calls, db_requests = profile.calls - model_calls, supabase.requests - db_requests
+            outcomes = {
+                outcome: count - outcomes_before.get(outcome, 0)
+                for outcome, count in model_outcomes(model_client).items()
+            }
+            costs = {node: cost - costs_before.get(node, 0.0) for node, cost in node_costs(model_client).items()}
+
+            memory = await session_memory(
+                client, queries, args.memory_sessions, args.memory_turns, args.concurrency
+            )
+
+    return {
+        "config": {
+            key: str(value) if isinstance(value, Path) else value
+            for key, value in vars(args).items()
+            if key not in ("output", "baseline")
+        },
+        "requests": args.requests,
+        "ok": len(latencies),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "wall_seconds": round(wall, 3),
+        "requests_per_second": round(len(latencies) / wall, 2),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 1),
+            "p95": round(percentile(latencies, 95) * 1000, 1),
+            "p99": round(percentile(latencies, 99) * 1000, 1),
+            "max": round(max(latencies, default=0) * 1000, 1),
+            "mean": round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+        },
+        "model_calls_per_request": round(model_calls / args.requests, 3),
+        "supabase_requests_per_request": round(db_requests / args.requests, 3),
+        "model_outcomes": {outcome: count for outcome, count in sorted(outcomes.items()) if count},
+        "llm_cost_usd_per_request": round(sum(costs.values()) / args.requests, 8),
+        "llm_cost_usd_by_node": {node: round(cost, 6) for node, cost in sorted(costs.items()) if cost},
+        "memory_per_session_kb": round(memory / 1024, 1),
+    }
+
+
+def regressions(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Metrics that got worse than `baseline` by more than `tolerance` (relative)"""
+    checks = [
+        ("requests_per_second", result["requests_per_second"], baseline["requests_per_second"], False),
+        ("latency p95", result["latency_ms"]["p95"], baseline["latency_ms"]["p95"], True),
+        ("latency p99", result["latency_ms"]["p99"], baseline["latency_ms"]["p99"], True),
+        ("memory per session", result["memory_per_session_kb"], baseline["memory_per_session_kb"], True),
+    ]
+    failed = []
+    for name, value, reference, lower_is_better in checks:
+        if not reference:
+            continue
+        change = value / reference - 1
+        if (change if lower_is_better else -change) > tolerance:
+            failed.append(f"{name}: {reference} -> {value} ({change:+.1%})")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000, help="Timed chat requests")
+    parser.add_argument("--warmup", type=int, default=100, help="Untimed requests sent first")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--sessions", type=int, default=200, help="Sessions the requests are spread over")
+    parser.add_argument("--phones", type=int, default=500, help="Rows in the synthetic phones table")
+    parser.add_argument("--mix", type=Path, default=DEFAULT_MIX, help="JSONL query mix")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Seconds per fake model call")
+    parser.add_argument("--llm-jitter", type=float, default=0.1, help="Uniform +/- seconds on each call")
+    parser.add_argument("--llm-tail-rate", type=float, default=0.0, help="Share of model calls that are slow")
+    parser.add_argument("--llm-tail-latency", type=float, default=5.0, help="Seconds per slow model call")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Share of model calls that fail with 503")
+    parser.add_argument("--llm-failing-model", action="append", default=[], help="Gemini model whose calls all fail (repeatable)")
+    parser.add_argument("--output-tokens", type=int, default=120, help="Tokens per fake model answer")
+    parser.add_argument("--db-latency", type=float, default=0.01, help="Seconds per fake Supabase request")
+    parser.add_argument("--no-catalog", action="store_true", help="Query the fake Supabase instead of the catalog")
+    parser.add_argument("--memory-sessions", type=int, default=100)
+    parser.add_argument("--memory-turns", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    parser.add_argument("--baseline", type=Path, help="Earlier --output file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.1, help="Allowed relative regression")
+    parser.add_argument("--verbose", action="store_true", help="Keep the app's INFO logging")
+    args = parser.parse_args()
+
+    if args.no_catalog:
+        os.environ["PHONE_CATALOG_ENABLED"] = "false"
+    profile.latency, profile.jitter, profile.output_tokens = args.llm_latency, args.llm_jitter, args.output_tokens
+    profile.tail_rate, profile.tail_latency = args.llm_tail_rate, args.llm_tail_latency
+    profile.error_rate, profile.failing_models = args.llm_error_rate, set(args.llm_failing_model)
+    supabase = install_fakes(synthetic_phones(args.phones, seed=args.seed), db_latency=args.db_latency)
+
+    if not args.verbose:
+        # main configures INFO logging on import; one line per request drowns the report
+        logging.disable(logging.INFO)
+
+    result = asyncio.run(run(args, supabase))
+
+    latency = result["latency_ms"]
+    print(f"requests        {result['ok']}/{result['requests']} ok  statuses {result['statuses']}")
+    print(f"throughput      {result['requests_per_second']} req/s over {result['wall_seconds']}s")
+    print(f"latency (ms)    p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  max {latency['max']}")
+    print(f"per request     {result['model_calls_per_request']} model calls, "
+          f"{result['supabase_requests_per_request']} Supabase requests")
+    print(f"model outcomes  {result['model_outcomes']}")
+    print(f"llm cost/req    ${result['llm_cost_usd_per_request']:.6f}  {result['llm_cost_usd_by_node']}")
+    print(f"memory          {result['memory_per_session_kb']} KiB per session "
+          f"after {args.memory_turns} turns")
+
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2))
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("config") != result["config"]:
+            print("warning: the baseline was recorded with different options")
+        failed = regressions(result, baseline, args.max_regression)
+        for line in failed:
+            print(f"REGRESSION {line}")
+        if failed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
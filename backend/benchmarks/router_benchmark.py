@@ -0,0 +1,191 @@
+"""
+Compare latency and token usage of the two-stage, fused and speculative routers.
+
+Runs each recorded query through:
+    - two_stage: Intent Classifier, then Database API Call Preparation for data intents
+    - fused: Fused Router, with the two-stage fallback when its output is invalid
+    - speculative: Speculative Router, with tool selection started alongside
+      intent classification when the turn looks data-based
+
+Usage (from the backend directory, with real API keys configured):
+    python -m benchmarks.router_benchmark --repeat 3 --output router_results.json
+
+The routers use the "router" profile of MODEL_PROFILES; run the benchmark
+with a different profile in the environment to compare models.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import RunnableLambda
+
+from agent.graph import (
+    SIMPLE_INTENTS,
+    fused_router,
+    intent_classification,
+    prepare_tool_call,
+    speculative_router,
+)
+from agent.speculation import speculation_tracker
+
+DEFAULT_QUERIES = Path(__file__).parent / "data" / "router_queries.jsonl"
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Accumulates model calls and token usage reported by chat models"""
+
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        self.calls += 1
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    self.input_tokens += usage.get("input_tokens", 0)
+                    self.output_tokens += usage.get("output_tokens", 0)
+
+
+def load_queries(path: Path) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def build_state(record: Dict[str, Any]) -> Dict[str, Any]:
+    messages = []
+    for role, content in record.get("history", []):
+        messages.append(HumanMessage(content=content) if role == "human" else AIMessage(content=content))
+    messages.append(HumanMessage(content=record["query"]))
+    return {"messages": messages, "intent": None, "response": "", "context_data": None}
+
+
+async def route_two_stage(state: Dict[str, Any]) -> Dict[str, Any]:
+    result = await intent_classification(state)
+    if result["intent"] not in SIMPLE_INTENTS:
+        tool_result = await prepare_tool_call({**state, **result})
+        result = {**result, **tool_result}
+    return {**result, "fallback": False}
+
+
+async def route_fused(state: Dict[str, Any]) -> Dict[str, Any]:
+    result = await fused_router(state)
+    if result.get("intent") is None:
+        return {**await route_two_stage(state), "fallback": True}
+    return {**result, "fallback": False}
+
+
+async def route_speculative(state: Dict[str, Any]) -> Dict[str, Any]:
+    result = await speculative_router(state)
+    if result["intent"] not in SIMPLE_INTENTS and "messages" not in result:
+        result = {**result, **await prepare_tool_call({**state, **result})}
+    return {**result, "fallback": False}
+
+
+ROUTERS = {"two_stage": route_two_stage, "fused": route_fused, "speculative": route_speculative}
+
+
+def run_once(mode: str, record: Dict[str, Any]) -> Dict[str, Any]:
+    usage = TokenUsageCallback()
+    started = time.perf_counter()
+    result = asyncio.run(RunnableLambda(ROUTERS[mode]).ainvoke(
+        build_state(record), config={"callbacks": [usage]}
+    ))
+    latency_ms = (time.perf_counter() - started) * 1000
+
+    messages = result.get("messages") or []
+    tool_calls = messages[-1].tool_calls if messages and isinstance(messages[-1], AIMessage) else []
+    return {
+        "mode": mode,
+        "query": record["query"],
+        "expected_intent": record.get("expected_intent"),
+        "intent": result.get("intent"),
+        "tool_call": tool_calls[0]["name"] if tool_calls else None,
+        "fallback": result["fallback"],
+        "latency_ms": latency_ms,
+        "model_calls": usage.calls,
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+    }
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    latencies = [run["latency_ms"] for run in runs]
+    labelled = [run for run in runs if run["expected_intent"]]
+    return {
+        "runs": len(runs),
+        "latency_mean_ms": statistics.mean(latencies),
+        "latency_p50_ms": percentile(latencies, 50),
+        "latency_p95_ms": percentile(latencies, 95),
+        "model_calls_mean": statistics.mean(run["model_calls"] for run in runs),
+        "input_tokens_mean": statistics.mean(run["input_tokens"] for run in runs),
+        "output_tokens_mean": statistics.mean(run["output_tokens"] for run in runs),
+        "intent_accuracy": (
+            sum(run["intent"] == run["expected_intent"] for run in labelled) / len(labelled)
+            if labelled else None
+        ),
+        "fallback_rate": sum(run["fallback"] for run in runs) / len(runs),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=Path, default=DEFAULT_QUERIES, help="JSONL file of recorded queries")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per query and mode")
+    parser.add_argument("--modes", nargs="+", default=list(ROUTERS), choices=list(ROUTERS))
+    parser.add_argument("--output", type=Path, help="Write per-run results and summary as JSON")
+    args = parser.parse_args()
+
+    records = load_queries(args.queries)
+    runs: Dict[str, List[Dict[str, Any]]] = {mode: [] for mode in args.modes}
+    for _ in range(args.repeat):
+        for record in records:
+            # Alternate modes per query so provider-side drift affects both equally
+            for mode in args.modes:
+                runs[mode].append(run_once(mode, record))
+
+    summary = {mode: summarize(mode_runs) for mode, mode_runs in runs.items()}
+
+    header = f"{'mode':<12} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'calls':>6} {'in tok':>8} {'out tok':>8} {'acc':>6} {'fallbk':>7}"
+    print(header)
+    print("-" * len(header))
+    for mode, stats in summary.items():
+        accuracy = f"{stats['intent_accuracy']:.2f}" if stats["intent_accuracy"] is not None else "-"
+        print(
+            f"{mode:<12} {stats['latency_mean_ms']:>9.0f} {stats['latency_p50_ms']:>9.0f} "
+            f"{stats['latency_p95_ms']:>9.0f} {stats['model_calls_mean']:>6.2f} "
+            f"{stats['input_tokens_mean']:>8.0f} {stats['output_tokens_mean']:>8.0f} "
+            f"{accuracy:>6} {stats['fallback_rate']:>7.2f}"
+        )
+
+    if "speculative" in runs:
+        speculation = speculation_tracker.stats()
+        summary["speculative"]["speculation"] = speculation
+        print(
+            f"\nspeculation: hit rate {speculation['hit_rate']:.2f}, coverage {speculation['coverage']:.2f}, "
+            f"{speculation['cancelled']} cancelled, "
+            f"{speculation['wasted_input_tokens'] + speculation['wasted_output_tokens']} wasted tokens"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "runs": runs}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Microbenchmark of the in-memory session map under concurrent get/update.
+
+Fills the map with `--sessions` live sessions, then runs `--threads` worker
+threads that each do get + update on random sessions while a sweeper thread
+calls the expiry sweep every `--sweep-interval` seconds. A small fraction of
+sessions is made to expire during the run so every sweep has work to do.
+
+Compares:
+    - global_lock: the previous design, one dict behind one lock, with a full
+      O(n) scan per sweep
+    - sharded: `ShardedSessionMap`, lock-striped shards with heap-ordered expiry
+
+Usage (from the backend directory):
+    python -m benchmarks.session_store_benchmark --sessions 100000 --threads 8
+"""
+import argparse
+import heapq
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from core.session_manager import ShardedSessionMap
+
+
+class GlobalLockSessionMap:
+    """The pre-sharding in-memory session manager, kept as a baseline"""
+
+    def __init__(self, timeout: int = 3600):
+        self.timeout = timeout
+        self._sessions: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def create(self) -> str:
+        session_id = str(uuid.uuid4())
+        with self._lock:
+            self._sessions[session_id] = {
+                "created_at": datetime.now(),
+                "last_accessed": datetime.now(),
+                "messages": [],
+            }
+        return session_id
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if datetime.now() - session["last_accessed"] > timedelta(seconds=self.timeout):
+                del self._sessions[session_id]
+                return None
+            session["last_accessed"] = datetime.now()
+            return session
+
+    def update(self, session_id: str, messages: list, fields: Dict[str, Any]):
+        with self._lock:
+            if session_id in self._sessions:
+                self._sessions[session_id].update(fields)
+                self._sessions[session_id]["messages"] = messages
+                self._sessions[session_id]["last_accessed"] = datetime.now()
+
+    def sweep(self) -> int:
+        with self._lock:
+            now = datetime.now()
+            expired = [
+                sid for sid, data in self._sessions.items()
+                if now - data["last_accessed"] > timedelta(seconds=self.timeout)
+            ]
+            for sid in expired:
+                del self._sessions[sid]
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+MAPS: Dict[str, Callable[[int], Any]] = {
+    "global_lock": lambda timeout: GlobalLockSessionMap(timeout=timeout),
+    "sharded": lambda timeout: ShardedSessionMap(timeout=timeout),
+}
+
+
+def expire_later(session_map: Any, session_id: str, delay: float):
+    """Backdate a session so it expires `delay` seconds from now"""
+    if isinstance(session_map, GlobalLockSessionMap):
+        last_accessed = datetime.now() - timedelta(seconds=session_map.timeout - delay)
+        session_map._sessions[session_id]["last_accessed"] = last_accessed
+    else:
+        shard = session_map._shard(session_id)
+        expires_at = time.monotonic() + delay
+        shard.sessions[session_id].expires_at = expires_at
+        heapq.heappush(shard.expiry_heap, (expires_at, session_id))
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(name: str, sessions: int, threads: int, duration: float, sweep_interval: float, expiring: float) -> Dict[str, Any]:
+    session_map = MAPS[name](3600)
+    ids = [session_map.create() for _ in range(sessions)]
+    # Age a slice of the sessions so they expire during the run; workers only
+    # touch the rest
+    short_lived, ids = ids[:int(sessions * expiring)], ids[int(sessions * expiring):]
+    for session_id in short_lived:
+        expire_later(session_map, session_id, random.uniform(0, duration))
+
+    stop = threading.Event()
+    latencies: List[List[float]] = [[] for _ in range(threads)]
+    sweeps: List[float] = []
+    removed = [0]
+    messages = ["message"] * 10
+
+    def worker(index: int):
+        rng = random.Random(index)
+        samples = latencies[index]
+        while not stop.is_set():
+            session_id = ids[rng.randrange(len(ids))]
+            start = time.perf_counter()
+            session_map.get(session_id)
+            session_map.update(session_id, messages, {"memory": {"turns": 1}})
+            samples.append(time.perf_counter() - start)
+
+    def sweeper():
+        while not stop.wait(sweep_interval):
+            start = time.perf_counter()
+            removed[0] += session_map.sweep()
+            sweeps.append(time.perf_counter() - start)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    pool.append(threading.Thread(target=sweeper))
+    for thread in pool:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in pool:
+        thread.join()
+
+    ops = [sample for samples in latencies for sample in samples]
+    return {
+        "map": name,
+        "ops_per_s": len(ops) / duration,
+        "op_p50_us": percentile(ops, 50) * 1e6,
+        "op_p99_us": percentile(ops, 99) * 1e6,
+        "op_max_ms": max(ops) * 1e3,
+        "sweeps": len(sweeps),
+        "sweep_mean_ms": sum(sweeps) / len(sweeps) * 1e3 if sweeps else 0.0,
+        "expired_removed": removed[0],
+        "live_sessions": len(session_map),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100_000, help="Live sessions to create")
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent get/update threads")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds to run each map")
+    parser.add_argument("--sweep-interval", type=float, default=0.05, help="Seconds between expiry sweeps")
+    parser.add_argument("--expiring", type=float, default=0.01, help="Fraction of sessions that expire during the run")
+    parser.add_argument("--maps", nargs="+", default=list(MAPS), choices=list(MAPS))
+    args = parser.parse_args()
+
+    header = f"{'map':<12} {'ops/s':>10} {'p50 us':>8} {'p99 us':>8} {'max ms':>8} {'sweeps':>7} {'sweep ms':>9} {'expired':>8}"
+    print(header)
+    print("-" * len(header))
+    for name in args.maps:
+        stats = run(name, args.sessions, args.threads, args.duration, args.sweep_interval, args.expiring)
+        print(
+            f"{name:<12} {stats['ops_per_s']:>10.0f} {stats['op_p50_us']:>8.1f} {stats['op_p99_us']:>8.1f} "
+            f"{stats['op_max_ms']:>8.2f} {stats['sweeps']:>7} {stats['sweep_mean_ms']:>9.3f} {stats['expired_removed']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Admission control for chat requests.
+
+At most `max_concurrency` graph executions run at once. Requests beyond
+that wait in a FIFO queue of at most `max_queue` entries. A request is
+rejected up front when the queue is full, or when the estimated wait
+(queue position x mean service time / concurrency) already exceeds
+`queue_timeout`. A request is also rejected if it is still queued when
+`queue_timeout` runs out. Each rejection carries a Retry-After estimate.
+
+Requests for the same session are serialized, so a double submit cannot
+race the history update. At most `max_session_pending` requests may wait
+behind the one that is running for a session; more are rejected.
+Session serialization is per process. With several workers and the Redis
+session store it only covers requests that reach the same worker.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from core.config import settings
+from core.metrics import metrics
+
+IN_FLIGHT = metrics.gauge("chatbot_admission_in_flight", "Chat requests currently executing")
+QUEUE_DEPTH = metrics.gauge("chatbot_admission_queue_depth", "Chat requests waiting for a slot")
+WAIT_SECONDS = metrics.histogram(
+    "chatbot_admission_wait_seconds", "Time admitted requests waited for their session and a slot"
+)
+REJECTED = metrics.counter(
+    "chatbot_admission_rejected_total", "Chat requests rejected by admission control", ["reason"]
+)
+
+# Mean service time assumed before the first request completes
+INITIAL_SERVICE_TIME = 2.0
+# Weight of the latest request in the mean service time
+SERVICE_TIME_ALPHA = 0.1
+
+
+class AdmissionRejected(Exception):
+    """The request cannot be admitted; retry after `retry_after` seconds"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Request rejected ({reason}), retry after {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _SessionGate:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        # Requests holding or waiting for the lock
+        self.users = 0
+
+
+class AdmissionTicket:
+    """An admitted request; `release` frees its slot and session (idempotent)"""
+
+    __slots__ = ("_controller", "_session_id", "_started", "_released")
+
+    def __init__(self, controller: "AdmissionController", session_id: Optional[str]):
+        self._controller = controller
+        self._session_id = session_id
+        self._started = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        self._controller._release(self._session_id, time.monotonic() - self._started)
+
+
+class AdmissionController:
+    """Concurrency cap, bounded wait queue and per-session serialization"""
+
+    def __init__(
+        self,
+        max_concurrency: int = 32,
+        max_queue: int = 128,
+        queue_timeout: float = 10.0,
+        max_session_pending: int = 1,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_session_pending = max_session_pending
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._sessions: Dict[str, _SessionGate] = {}
+        self._service_time = INITIAL_SERVICE_TIME
+        self._counters = {"admitted": 0, "queued": 0, "rejected": 0}
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil((len(self._waiters) + 1) * self._service_time / self.max_concurrency))
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        REJECTED.inc(reason=reason)
+        self._counters["rejected"] += 1
+        return AdmissionRejected(reason, self._retry_after())
+
+    @staticmethod
+    async def _wait(future: asyncio.Future, timeout: float) -> bool:
+        """Wait for `future` without cancelling it on timeout; True if it completed"""
+        done, _ = await asyncio.wait({future}, timeout=max(0.0, timeout))
+        return bool(done)
+
+    async def _enter_session(self, session_id: str, deadline: float):
+        gate = self._sessions.get(session_id)
+        if gate is None:
+            gate = self._sessions[session_id] = _SessionGate()
+        if gate.users > self.max_session_pending:
+            raise self._reject("session_busy")
+
+        gate.users += 1
+        try:
+            await asyncio.wait_for(gate.lock.acquire(), timeout=max(0.0, deadline - time.monotonic()))
+        except BaseException as e:
+            self._leave_session(session_id, locked=False)
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._reject("session_timeout") from None
+            raise
+
+    def _leave_session(self, session_id: str, locked: bool = True):
+        gate = self._sessions[session_id]
+        if locked:
+            gate.lock.release()
+        gate.users -= 1
+        if gate.users == 0:
+            del self._sessions[session_id]
+
+    async def _take_slot(self, deadline: float):
+        if self._in_flight < self.max_concurrency and not self._waiters:
+            self._in_flight += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full")
+        # Reject now rather than after waiting out the timeout for nothing
+        if (len(self._waiters) + 1) * self._service_time / self.max_concurrency > deadline - time.monotonic():
+            raise self._reject("deadline")
+
+        slot = asyncio.get_running_loop().create_future()
+        self._waiters.append(slot)
+        self._counters["queued"] += 1
+        QUEUE_DEPTH.set(len(self._waiters))
+        try:
+            admitted = await self._wait(slot, deadline - time.monotonic())
+        except BaseException:
+            # Cancelled while queued; hand the slot on if it was just granted
+            admitted = slot.done()
+            if admitted:
+                self._release_slot()
+            else:
+                self._drop_waiter(slot)
+            raise
+        if not admitted:
+            self._drop_waiter(slot)
+            raise self._reject("timeout")
+
+    def _drop_waiter(self, slot: asyncio.Future):
+        slot.cancel()
+        try:
+            self._waiters.remove(slot)
+        except ValueError:
+            pass
+        QUEUE_DEPTH.set(len(self._waiters))
+
+    def _release_slot(self):
+        # The slot passes straight to the oldest waiter, so in-flight stays the same
+        while self._waiters:
+            slot = self._waiters.popleft()
+            if not slot.done():
+                slot.set_result(None)
+                QUEUE_DEPTH.set(len(self._waiters))
+                return
+        QUEUE_DEPTH.set(0)
+        self._in_flight -= 1
+        IN_FLIGHT.set(self._in_flight)
+
+    async def acquire(self, session_id: Optional[str] = None) -> AdmissionTicket:
+        """
+        Wait for the session and an execution slot
+
+        Raises:
+            AdmissionRejected: if the request should be retried later
+        """
+        arrived = time.monotonic()
+        deadline = arrived + self.queue_timeout
+        if session_id is not None:
+            await self._enter_session(session_id, deadline)
+        try:
+            await self._take_slot(deadline)
+        except BaseException:
+            if session_id is not None:
+                self._leave_session(session_id)
+            raise
+
+        IN_FLIGHT.set(self._in_flight)
+        WAIT_SECONDS.observe(time.monotonic() - arrived)
+        self._counters["admitted"] += 1
+        return AdmissionTicket(self, session_id)
+
+    @asynccontextmanager
+    async def admit(self, session_id: Optional[str] = None) -> AsyncIterator[AdmissionTicket]:
+        """`acquire` for the duration of a block"""
+        ticket = await self.acquire(session_id)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def _release(self, session_id: Optional[str], service_time: float):
+        self._service_time += SERVICE_TIME_ALPHA * (service_time - self._service_time)
+        self._release_slot()
+        if session_id is not None:
+            self._leave_session(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._counters,
+            "in_flight": self._in_flight,
+            "queue_depth": len(self._waiters),
+            "sessions_busy": len(self._sessions),
+            "mean_service_seconds": round(self._service_time, 3),
+        }
+
+
+# Global admission controller instance
+admission_controller = AdmissionController(
+    max_concurrency=settings.ADMISSION_MAX_CONCURRENCY,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+    max_session_pending=settings.ADMISSION_MAX_SESSION_PENDING,
+)
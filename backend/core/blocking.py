@@ -0,0 +1,28 @@
+"""
+Bounded thread pool for work that cannot avoid blocking.
+
+The graph nodes are native coroutines, so the event loop only hands work to
+threads for blocking I/O and CPU-heavy steps (SQLite response cache,
+catalog rebuilds, synchronous callbacks). `main.lifespan` installs this pool
+as the loop's default executor, so `asyncio.to_thread` and
+`run_in_executor(None, ...)` share the same bound.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from core.config import settings
+
+T = TypeVar("T")
+
+# Global blocking executor instance
+blocking_executor = ThreadPoolExecutor(
+    max_workers=settings.BLOCKING_POOL_SIZE, thread_name_prefix="blocking"
+)
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run `func` on the blocking pool without holding up the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor, functools.partial(func, *args, **kwargs))
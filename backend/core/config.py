@@ -1,5 +1,22 @@
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List, Literal, Optional
+
+
+class ModelProfile(BaseModel):
+    """Gemini model and generation settings for a group of nodes"""
+    model: str
+    fallback_model: Optional[str] = None  # called when `model` fails or its breaker is open
+    max_output_tokens: Optional[int] = None  # includes thinking tokens
+    temperature: Optional[float] = None
+    thinking_budget: Optional[int] = None  # 0 turns thinking off; None keeps the model's default
+
+
+class ModelPrice(BaseModel):
+    """List prices in USD per million tokens"""
+    input: float
+    cached_input: float
+    output: float
 
 
 class Settings(BaseSettings):
@@ -10,13 +27,143 @@ class Settings(BaseSettings):
     # Supabase Configuration
     SUPABASE_URL: str
     SUPABASE_KEY: str
+    SUPABASE_POOL_MAX_CONNECTIONS: int = 20
+    SUPABASE_POOL_MAX_KEEPALIVE: int = 10
+    SUPABASE_POOL_KEEPALIVE_EXPIRY: float = 30.0  # seconds
+    SUPABASE_CONNECT_TIMEOUT: float = 5.0  # seconds
+    SUPABASE_READ_TIMEOUT: float = 10.0  # seconds
     
     # Application Settings
     DEBUG: bool = False
     ALLOWED_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:5173", "*"]
     SESSION_TIMEOUT: int = 3600  # 1 hour in seconds
-    MAX_CONVERSATION_HISTORY: int = 50
+    SESSION_STORE: Literal["memory", "redis"] = "memory"
+    SESSION_REDIS_URL: str = "redis://localhost:6379/0"
+    SESSION_SWEEP_INTERVAL: int = 60  # seconds between expired-session sweeps (memory store)
+    SESSION_SHARDS: int = 64  # lock-striped shards (memory store)
+    MAX_CONVERSATION_HISTORY: int = 50  # messages kept per session
+    HISTORY_TOKEN_BUDGET: int = 4000  # approximate tokens of history sent per turn
+    HISTORY_SUMMARY_ENABLED: bool = False  # summarize messages dropped from a session
+
+    # Agent Settings
+    ROUTER_MODE: Literal["two_stage", "fused", "speculative"] = "two_stage"
+    # Speculative mode: start tool selection with intent classification at this data-intent probability
+    SPECULATION_MIN_PROBABILITY: float = 0.4
+    FAST_PATH_ENABLED: bool = True
+    FAST_PATH_CONFIDENCE_THRESHOLD: float = 0.95
+    # Intents the lexical model may resolve on its own; the rest always go to Gemini
+    FAST_PATH_LEXICAL_INTENTS: List[str] = ["chitchat", "query", "irrelevant", "search_recommendation"]
+    # Lexical model built with `python -m agent.fast_path_classifier`; None trains it in memory
+    # from the examples in the intent classification prompt
+    FAST_PATH_MODEL_PATH: Optional[str] = None
+    # Render tool results as compact tables for the response model (False: raw JSON)
+    CONTEXT_ENCODING_ENABLED: bool = True
+
+    # Prompt Prefix Cache Settings ("local" keeps prompts inline; "gemini" uses context caching)
+    PROMPT_CACHE_BACKEND: Literal["local", "gemini"] = "local"
+    PROMPT_CACHE_TTL: int = 3600  # seconds; refreshed at half-life
+    PROMPT_CACHE_MIN_TOKENS: int = 1024  # Gemini's minimum for explicit caches
+
+    # Response Cache Settings (query, irrelevant and adversarial intents, keyed on the earlier turns too)
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTL: int = 86400  # 1 day in seconds
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1000
+    RESPONSE_CACHE_MAX_BYTES: int = 8 * 1024 * 1024
+    RESPONSE_CACHE_SIMILARITY_THRESHOLD: Optional[float] = None  # e.g. 0.9; None disables
+    RESPONSE_CACHE_SQLITE_PATH: Optional[str] = None
+
+    # Tool Result Cache Settings
+    TOOL_CACHE_ENABLED: bool = True
+    TOOL_CACHE_TTL: int = 600  # 10 minutes in seconds
+    TOOL_CACHE_NEGATIVE_TTL: int = 60  # not-found results
+    TOOL_CACHE_MAX_ENTRIES: int = 2048
+
+    # Maximum number of phones in a single comparison
+    COMPARE_MAX_PHONES: int = 4
+
+    # Request Deadline Settings (seconds; None disables)
+    REQUEST_TIMEOUT: Optional[float] = 30.0  # budget for one chat message, shared by all nodes
+    NODE_TIMEOUT: Optional[float] = 20.0  # cap for a single node within that budget
+    BLOCKING_POOL_SIZE: int = 8  # threads for blocking work (SQLite cache, catalog rebuilds)
+
+    # Model Routing Settings (JSON in the environment)
+    # Short answers and routing use the cheapest model; only recommendation and compare synthesis the bigger one
+    MODEL_PROFILES: Dict[str, ModelProfile] = {
+        "router": ModelProfile(
+            model="gemini-2.5-flash-lite", fallback_model="gemini-2.5-flash",
+            max_output_tokens=512, temperature=0.0, thinking_budget=0,
+        ),
+        "short_answer": ModelProfile(
+            model="gemini-2.5-flash-lite", fallback_model="gemini-2.5-flash",
+            max_output_tokens=1024, thinking_budget=0,
+        ),
+        "synthesis": ModelProfile(
+            model="gemini-2.5-flash", fallback_model="gemini-2.5-flash-lite",
+            max_output_tokens=4096, thinking_budget=1024,
+        ),
+    }
+    # Profile per model-calling node, keyed by the node's prompt name
+    NODE_MODEL_PROFILES: Dict[str, str] = {
+        "intent_classification": "router",
+        "fused_router": "router",
+        "tool_selection": "router",
+        "chitchat": "short_answer",
+        "query": "short_answer",
+        "irrelevant": "short_answer",
+        "adversarial": "short_answer",
+        "details": "short_answer",
+        "history_summary": "short_answer",
+        "search_recommendation": "synthesis",
+        "compare": "synthesis",
+    }
+    DEFAULT_MODEL_PROFILE: str = "synthesis"  # nodes missing from NODE_MODEL_PROFILES
+
+    # Model Client Settings (every Gemini call, see agent/model_client.py)
+    MODEL_CALL_TIMEOUT: float = 15.0  # seconds per attempt
+    MODEL_MAX_RETRIES: int = 2  # on timeouts, 5xx and rate limits
+    MODEL_RETRY_BASE_DELAY: float = 0.5  # seconds; full jitter, doubled per retry
+    MODEL_HEDGE_ENABLED: bool = True
+    MODEL_HEDGE_QUANTILE: float = 0.95  # hedge once a call is slower than this share of recent calls
+    MODEL_HEDGE_MIN_DELAY: float = 0.25  # seconds
+    MODEL_HEDGE_MIN_SAMPLES: int = 20  # latencies observed before hedging starts
+    MODEL_BREAKER_FAILURE_THRESHOLD: int = 5  # failed attempts in a row that open the breaker
+    MODEL_BREAKER_RESET_TIMEOUT: float = 30.0  # seconds open before a trial call
+    MODEL_UNAVAILABLE_RESPONSE: str = (
+        "Sorry, I can't reach my language model right now. Please try again in a minute."
+    )
+
+    # Admission Control Settings (chat requests)
+    ADMISSION_MAX_CONCURRENCY: int = 32  # graph executions running at once
+    ADMISSION_MAX_QUEUE: int = 128  # requests waiting for a slot; more get 429
+    ADMISSION_QUEUE_TIMEOUT: float = 10.0  # seconds a request may wait before 429
+    ADMISSION_MAX_SESSION_PENDING: int = 1  # requests queued behind a session's running one
+
+    # Tracing Settings (per-node timings on /metrics and in the response log event)
+    TRACING_ENABLED: bool = True
+    # Prices per model, for estimated cost; unlisted models are priced as DEFAULT_MODEL_PROFILE's model
+    LLM_PRICES_PER_MTOK: Dict[str, ModelPrice] = {
+        "gemini-2.5-flash": ModelPrice(input=0.30, cached_input=0.03, output=2.50),
+        "gemini-2.5-flash-lite": ModelPrice(input=0.10, cached_input=0.01, output=0.40),
+        "gemini-2.5-pro": ModelPrice(input=1.25, cached_input=0.125, output=10.00),
+    }
+
+    # Log Writer Settings
+    LOG_QUEUE_MAX_SIZE: int = 10000
+    LOG_BATCH_SIZE: int = 100
+    LOG_FLUSH_INTERVAL: float = 1.0  # seconds
+
+    # Phone Catalog Settings
+    PHONE_CATALOG_ENABLED: bool = True
+    PHONE_CATALOG_REFRESH_INTERVAL: int = 300  # 5 minutes in seconds
     
+    def model_profile(self, node: str) -> ModelProfile:
+        """Model settings for the node whose prompt is `node`"""
+        return self.MODEL_PROFILES[self.NODE_MODEL_PROFILES.get(node, self.DEFAULT_MODEL_PROFILE)]
+
+    def model_price(self, model: str) -> Optional[ModelPrice]:
+        default = self.MODEL_PROFILES[self.DEFAULT_MODEL_PROFILE].model
+        return self.LLM_PRICES_PER_MTOK.get(model) or self.LLM_PRICES_PER_MTOK.get(default)
+
     model_config = {
         "env_file": ".env",
         "case_sensitive": True,
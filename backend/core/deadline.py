@@ -0,0 +1,74 @@
+"""
+Per-request deadline budget.
+
+`request_deadline(seconds)` fixes the time by which the current request must
+finish. Everything awaited inside it, including graph nodes running in
+their own tasks, sees the same deadline through a context variable.
+`within_deadline` awaits one step within the remaining budget, optionally
+capped per step, and cancels the step when the budget runs out.
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request ran out of time while `stage` was running"""
+
+    def __init__(self, stage: str, budget: float):
+        super().__init__(f"Deadline exceeded in {stage} after {budget:.1f}s")
+        self.stage = stage
+        self.budget = budget
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float]) -> Iterator[None]:
+    """Give the block `seconds` to finish; a nested deadline never extends the outer one"""
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current request's budget, or None without a deadline"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+async def within_deadline(step: Awaitable[T], stage: str, limit: Optional[float] = None) -> T:
+    """
+    Await `step` within the remaining request budget, and at most `limit` seconds
+
+    Raises:
+        DeadlineExceeded: if the time ran out; `step` is cancelled. A timeout
+            raised by `step` itself before then (a model or HTTP call timing
+            out) propagates unchanged
+    """
+    budget = remaining()
+    if limit is not None:
+        budget = limit if budget is None else min(budget, limit)
+    if budget is None:
+        return await step
+    started = time.monotonic()
+    try:
+        return await asyncio.wait_for(step, timeout=budget)
+    except asyncio.TimeoutError:
+        if time.monotonic() - started < budget:
+            raise
+        raise DeadlineExceeded(stage, budget) from None
+
@@ -1,18 +1,40 @@
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, List, Optional, Set
 from datetime import datetime
 from zoneinfo import ZoneInfo
-from core.supabase_client import get_supabase_client
+from postgrest.types import ReturnMethod
+from core.config import settings
+from core.supabase_client import get_async_db
 from agent.models.log_entry import LogEntry
 
 logger = logging.getLogger(__name__)
 IST = ZoneInfo("Asia/Kolkata")
 
+_STOP = object()
+
+
 class LogService:
-    """A service for logging chat session events to Supabase."""
+    """
+    A service for logging chat session events to Supabase.
+
+    Once `start()` has been called, events are put on a bounded queue and a
+    background task writes them with bulk inserts, flushing whenever
+    `batch_size` events are pending or `flush_interval` seconds have passed.
+    When the queue is full, new events are dropped and counted. Before
+    `start()` (or after `stop()`), each event is inserted by its own task.
+    """
 
-    def __init__(self):
-        self.supabase = get_supabase_client()
+    def __init__(self, max_queue_size: int = 10000, batch_size: int = 100, flush_interval: float = 1.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inline_tasks: Set[asyncio.Task] = set()
+        self._counters = {"enqueued": 0, "written": 0, "dropped": 0, "failed": 0, "batches": 0}
 
     def log_event(
         self,
@@ -47,9 +69,125 @@ class LogService:
             # Convert datetime to ISO 8601 string format
             log_dict['timestamp'] = log_entry.timestamp.isoformat()
 
-            self.supabase.table("logs").insert(log_dict).execute()
+            if self._task is None:
+                self._insert_later(log_dict)
+                return
+
+            try:
+                running_loop = asyncio.get_running_loop()
+            except RuntimeError:
+                running_loop = None
+            if running_loop is self._loop:
+                self._enqueue(log_dict)
+            else:
+                self._loop.call_soon_threadsafe(self._enqueue, log_dict)
         except Exception as e:
             logger.error(f"Failed to log event to Supabase: {e}", exc_info=True)
 
+    def _enqueue(self, log_dict: Dict[str, Any]):
+        try:
+            self._queue.put_nowait(log_dict)
+            self._counters["enqueued"] += 1
+        except asyncio.QueueFull:
+            self._counters["dropped"] += 1
+
+    def _insert_later(self, log_dict: Dict[str, Any]):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop to write from; nothing can be sent
+            self._counters["dropped"] += 1
+            return
+        task = loop.create_task(self._flush([log_dict]))
+        self._inline_tasks.add(task)
+        task.add_done_callback(self._inline_tasks.discard)
+
+    async def _insert(self, batch: List[Dict[str, Any]]):
+        # default_to_null=False keeps column defaults for keys missing from some rows
+        await (
+            get_async_db().table("logs")
+            .insert(batch, returning=ReturnMethod.minimal, default_to_null=False)
+            .execute()
+        )
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        try:
+            await self._insert(batch)
+            self._counters["written"] += len(batch)
+            self._counters["batches"] += 1
+        except Exception as e:
+            self._counters["failed"] += len(batch)
+            logger.error(f"Failed to write {len(batch)} log events to Supabase: {e}", exc_info=True)
+
+    async def _run(self):
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = await asyncio.wait_for(
+                    self._queue.get(), timeout=max(0.0, deadline - time.monotonic())
+                )
+            except asyncio.TimeoutError:
+                item = None
+
+            if item is _STOP:
+                # Drain whatever is still queued, then exit
+                while not self._queue.empty():
+                    pending = self._queue.get_nowait()
+                    if pending is not _STOP:
+                        batch.append(pending)
+                for start in range(0, len(batch), self.batch_size):
+                    await self._flush(batch[start:start + self.batch_size])
+                return
+
+            if item is not None:
+                batch.append(item)
+
+            if len(batch) >= self.batch_size or (batch and time.monotonic() >= deadline):
+                await self._flush(batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+
+    async def start(self):
+        """Start the background writer task on the running event loop"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._run(), name="log-writer")
+
+    async def stop(self, timeout: float = 10.0):
+        """Flush queued events and stop the background writer task"""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        if task.done():
+            # Nothing is left to take the stop marker off a full queue
+            reason = "cancelled" if task.cancelled() else repr(task.exception())
+            logger.error(f"Log writer had already stopped ({reason}); {self._queue.qsize()} events lost")
+        else:
+            deadline = time.monotonic() + timeout
+            try:
+                # The stop marker must not be dropped when the queue is full, but
+                # only a running writer makes room for it, so the wait is bounded
+                try:
+                    self._queue.put_nowait(_STOP)
+                except asyncio.QueueFull:
+                    await asyncio.wait_for(self._queue.put(_STOP), timeout=timeout)
+                await asyncio.wait_for(task, timeout=max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                task.cancel()
+                logger.error(f"Log writer did not drain within {timeout}s; {self._queue.qsize()} events lost")
+        if self._inline_tasks:
+            await asyncio.gather(*self._inline_tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._counters, "queue_depth": self._queue.qsize() if self._queue else 0}
+
 # Global instance of the LogService
-log_service = LogService()
+log_service = LogService(
+    max_queue_size=settings.LOG_QUEUE_MAX_SIZE,
+    batch_size=settings.LOG_BATCH_SIZE,
+    flush_interval=settings.LOG_FLUSH_INTERVAL,
+)
@@ -0,0 +1,222 @@
+import hashlib
+import logging
+import math
+import operator
+import re
+import sqlite3
+import time
+import unicodedata
+from array import array
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+from core.cache import LRUTTLCache
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIMENSIONS = 512
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold, strip punctuation and collapse whitespace"""
+    query = unicodedata.normalize("NFKC", query).lower()
+    return " ".join(WORD_PATTERN.findall(query))
+
+
+def embed(normalized_query: str) -> array:
+    """Hashed bag of words and character trigrams, L2-normalized.
+
+    A cheap local stand-in for a sentence embedding: good enough to match
+    rephrasings such as "what's ois vs eis" and "ois vs eis what is it".
+    """
+    vector = [0.0] * EMBEDDING_DIMENSIONS
+    features = normalized_query.split()
+    padded = f" {normalized_query} "
+    features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode(), digest_size=4).digest()
+        vector[int.from_bytes(digest, "little") % EMBEDDING_DIMENSIONS] += 1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return array("f", (v / norm for v in vector))
+
+
+def _entry_size(entry: Tuple[str, Optional[array]]) -> int:
+    response, embedding = entry
+    return len(response.encode()) + (embedding.itemsize * len(embedding) if embedding else 0)
+
+
+def context_fingerprint(context: str) -> str:
+    """Short hash of the conversation a query was asked in; empty for a first message"""
+    if not context:
+        return ""
+    return hashlib.blake2b(context.encode(), digest_size=8).hexdigest()
+
+
+class ResponseCache:
+    """Cache of model answers for stateless intents, keyed on intent, context and normalized query.
+
+    The context is the conversation the model saw before the query, so an
+    answer that depends on earlier turns is only reused in the same
+    conversation state; first messages are shared by everyone.
+
+    Entries live in a bounded in-memory LRU with TTL. When a SQLite path is
+    configured, entries are also written through to disk so they survive
+    restarts. When a similarity threshold is configured, a miss on the exact
+    key falls back to the closest cached query of the same intent.
+    """
+
+    def __init__(
+        self,
+        ttl: int = 86400,
+        max_entries: int = 1000,
+        max_bytes: int = 8 * 1024 * 1024,
+        similarity_threshold: Optional[float] = None,
+        sqlite_path: Optional[str] = None,
+    ):
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self._memory = LRUTTLCache(
+            max_entries=max_entries, ttl=ttl, max_bytes=max_bytes, sizeof=_entry_size
+        )
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = Lock()
+        self._counter_lock = Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if sqlite_path:
+            self._open_db(sqlite_path)
+
+    def _open_db(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db_lock:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, intent TEXT NOT NULL, query TEXT NOT NULL, "
+                "response TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM response_cache WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+            rows = self._db.execute(
+                "SELECT key, query, response, expires_at FROM response_cache "
+                "ORDER BY expires_at DESC LIMIT ?",
+                (self._memory.max_entries,),
+            ).fetchall()
+
+        # Warm the in-memory cache, oldest first so the LRU order is preserved
+        now = time.time()
+        for key, query, response, expires_at in reversed(rows):
+            self._memory.set(key, (response, self._embedding(query)), ttl=expires_at - now)
+        logger.info(f"Response cache warmed with {len(rows)} entries from {path}")
+
+    @property
+    def blocking(self) -> bool:
+        """Whether calls may block the caller: SQLite I/O or a similarity scan over all entries"""
+        return self._db is not None or self.similarity_threshold is not None
+
+    def _embedding(self, normalized_query: str) -> Optional[array]:
+        return embed(normalized_query) if self.similarity_threshold is not None else None
+
+    def _count(self, counter: str):
+        with self._counter_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _disk_get(self, key: str) -> Optional[Tuple[str, float]]:
+        """The stored response and its expiry time, if it has not expired"""
+        if self._db is None:
+            return None
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT response, expires_at FROM response_cache WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def _similar(self, prefix: str, normalized: str) -> Optional[str]:
+        query_vector = embed(normalized)
+        best_score, best_response = 0.0, None
+        for key, (response, vector) in self._memory.items():
+            if not key.startswith(prefix) or vector is None:
+                continue
+            score = sum(map(operator.mul, query_vector, vector))
+            if score > best_score:
+                best_score, best_response = score, response
+        if best_score >= self.similarity_threshold:
+            return best_response
+        return None
+
+    def get(self, intent: str, query: str, context: str = "") -> Optional[str]:
+        """Return a cached response for this intent and query asked after `context`, if any"""
+        normalized = normalize_query(query)
+        if not normalized:
+            return None
+        prefix = f"{intent}:{context_fingerprint(context)}:"
+        key = prefix + normalized
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._count("hits")
+            return entry[0]
+
+        stored = self._disk_get(key)
+        if stored is not None:
+            response, expires_at = stored
+            # Keeps the expiry it was written with
+            self._memory.set(key, (response, self._embedding(normalized)), ttl=expires_at - time.time())
+            self._count("disk_hits")
+            return response
+
+        if self.similarity_threshold is not None:
+            response = self._similar(prefix, normalized)
+            if response is not None:
+                self._count("semantic_hits")
+                return response
+
+        self._count("misses")
+        return None
+
+    def put(self, intent: str, query: str, response: str, context: str = ""):
+        """Cache a response for this intent and query asked after `context`"""
+        normalized = normalize_query(query)
+        if not normalized or not response:
+            return
+        key = f"{intent}:{context_fingerprint(context)}:{normalized}"
+        self._memory.set(key, (response, self._embedding(normalized)))
+
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?, ?)",
+                        (key, intent, normalized, response, time.time() + self.ttl),
+                    )
+                    self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Failed to persist cached response: {e}", exc_info=True)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.semantic_hits + self.disk_hits + self.misses
+        memory = self._memory.stats()
+        return {
+            "entries": memory["entries"],
+            "bytes": memory["bytes"],
+            "evictions": memory["evictions"],
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (lookups - self.misses) / lookups if lookups else 0.0,
+        }
+
+
+# Global response cache instance
+response_cache = ResponseCache(
+    ttl=settings.RESPONSE_CACHE_TTL,
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+    similarity_threshold=settings.RESPONSE_CACHE_SIMILARITY_THRESHOLD,
+    sqlite_path=settings.RESPONSE_CACHE_SQLITE_PATH,
+)
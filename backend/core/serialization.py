@@ -0,0 +1,42 @@
+"""
+JSON encoding at the API boundary.
+
+Graph state, tool artifacts and response dicts hold plain Python objects
+by reference; they are encoded once, when the HTTP response or a
+server-sent event is written. orjson is used when it is installed, the
+standard library otherwise.
+"""
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON; values JSON has no type for are written as strings"""
+    if orjson is not None:
+        return orjson.dumps(value, default=str)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str).encode()
+
+
+def pre_encode(value: Any) -> Any:
+    """
+    Encode `value` now, so it can be embedded in several payloads without encoding it again
+
+    Without orjson, `value` is returned unchanged and encoded with each payload.
+    """
+    if orjson is None or value is None:
+        return value
+    return orjson.Fragment(orjson.dumps(value, default=str))
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with `dumps`"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,68 +1,375 @@
-from datetime import datetime, timedelta
-from typing import Dict, Optional
+import asyncio
+import heapq
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from threading import Lock
 import uuid
 
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def serialize_messages(messages: List[BaseMessage]) -> List[Dict[str, Any]]:
+    """Convert messages to JSON-safe dicts, dropping empty and redundant fields"""
+    serialized = []
+    for message in messages:
+        data = message_to_dict(message)
+        data["data"] = {
+            key: value for key, value in data["data"].items()
+            if key == "content" or (key != "type" and value not in (None, "", [], {}))
+        }
+        serialized.append(data)
+    return serialized
+
+
+def deserialize_messages(data: List[Dict[str, Any]]) -> List[BaseMessage]:
+    return messages_from_dict(data)
+
+
+def _is_message_list(value: Any) -> bool:
+    return isinstance(value, list) and bool(value) and all(isinstance(item, BaseMessage) for item in value)
+
+
+class SessionStore(ABC):
+    """
+    Storage for chat sessions.
+
+    A session is read like a dict: `created_at`, `last_accessed` and
+    `messages`, plus any extra fields stored with `update_session`. Sessions expire `timeout`
+    seconds after they were last accessed.
+    """
 
-class SessionManager:
-    """Thread-safe session manager for handling chat sessions"""
-    
     def __init__(self, timeout: int = 3600):
-        self._sessions: Dict[str, Dict] = {}
-        self._lock = Lock()
         self.timeout = timeout
-    
-    def create_session(self) -> str:
+
+    @abstractmethod
+    async def create_session(self) -> str:
         """Create a new session and return session ID"""
+
+    @abstractmethod
+    async def get_session(self, session_id: str) -> Optional[Dict]:
+        """Get session data by session ID, refreshing its expiry"""
+
+    @abstractmethod
+    async def update_session(self, session_id: str, messages: list, **fields):
+        """Update session with new messages and any extra session fields"""
+
+    @abstractmethod
+    async def modify_session(self, session_id: str, modify: Callable[[Dict], Tuple[list, Dict[str, Any]]]) -> bool:
+        """
+        Atomically update a session from its current state
+
+        `modify` gets the stored session and returns its new messages and the
+        fields to set. It may be called more than once, so it must not have
+        side effects. Returns False if the session no longer exists.
+        """
+
+    @abstractmethod
+    async def delete_session(self, session_id: str):
+        """Delete a session"""
+
+    async def start(self):
+        """Start any background work the store needs"""
+
+    async def stop(self):
+        """Stop background work and release connections"""
+
+
+class Session:
+    """
+    Per-session state, with read access like a dict.
+
+    Timestamps are stored as epoch floats and only turned into `datetime`
+    when read through `session["created_at"]` / `session["last_accessed"]`.
+    """
+
+    __slots__ = ("created_at", "last_accessed", "expires_at", "messages", "fields")
+
+    def __init__(self, now: float, expires_at: float):
+        self.created_at = now
+        self.last_accessed = now
+        self.expires_at = expires_at  # time.monotonic() deadline
+        self.messages: list = []
+        self.fields: Dict[str, Any] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "messages":
+            return self.messages
+        if key in ("created_at", "last_accessed"):
+            return datetime.fromtimestamp(getattr(self, key))
+        return self.fields[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+class _Shard:
+    __slots__ = ("lock", "sessions", "expiry_heap")
+
+    def __init__(self):
+        self.lock = Lock()
+        self.sessions: Dict[str, Session] = {}
+        # (expires_at, session_id); at most one entry per live session
+        self.expiry_heap: List[Tuple[float, str]] = []
+
+
+class ShardedSessionMap:
+    """
+    Thread-safe session map split across lock-striped shards.
+
+    Each shard keeps a min-heap of expiry deadlines. A session refreshed
+    since its heap entry was pushed is re-pushed only when that entry
+    reaches the top, so accesses never touch the heap and a sweep only
+    visits sessions whose original deadline has passed.
+    """
+
+    def __init__(self, timeout: int = 3600, shards: int = 64):
+        self.timeout = timeout
+        self._shards = [_Shard() for _ in range(shards)]
+
+    def _shard(self, session_id: str) -> _Shard:
+        return self._shards[hash(session_id) % len(self._shards)]
+
+    def create(self) -> str:
         session_id = str(uuid.uuid4())
-        with self._lock:
-            self._sessions[session_id] = {
-                "created_at": datetime.now(),
-                "last_accessed": datetime.now(),
-                "messages": []
-            }
+        expires_at = time.monotonic() + self.timeout
+        shard = self._shard(session_id)
+        with shard.lock:
+            shard.sessions[session_id] = Session(time.time(), expires_at)
+            heapq.heappush(shard.expiry_heap, (expires_at, session_id))
         return session_id
-    
-    def get_session(self, session_id: str) -> Optional[Dict]:
-        """Get session data by session ID"""
-        with self._lock:
-            if session_id not in self._sessions:
+
+    def get(self, session_id: str) -> Optional[Session]:
+        shard = self._shard(session_id)
+        now = time.monotonic()
+        with shard.lock:
+            session = shard.sessions.get(session_id)
+            if session is None:
                 return None
-            
-            session = self._sessions[session_id]
-            
-            # Check if session has expired
-            if datetime.now() - session["last_accessed"] > timedelta(seconds=self.timeout):
-                del self._sessions[session_id]
+            if session.expires_at <= now:
+                # The heap entry is skipped by the next sweep
+                del shard.sessions[session_id]
                 return None
-            
-            session["last_accessed"] = datetime.now()
+            session.last_accessed = time.time()
+            session.expires_at = now + self.timeout
             return session
-    
-    def update_session(self, session_id: str, messages: list):
-        """Update session with new messages"""
-        with self._lock:
-            if session_id in self._sessions:
-                self._sessions[session_id]["messages"] = messages
-                self._sessions[session_id]["last_accessed"] = datetime.now()
-    
-    def delete_session(self, session_id: str):
-        """Delete a session"""
-        with self._lock:
-            if session_id in self._sessions:
-                del self._sessions[session_id]
-    
-    def cleanup_expired_sessions(self):
-        """Remove expired sessions"""
-        with self._lock:
-            current_time = datetime.now()
-            expired = [
-                sid for sid, data in self._sessions.items()
-                if current_time - data["last_accessed"] > timedelta(seconds=self.timeout)
-            ]
-            for sid in expired:
-                del self._sessions[sid]
-
-
-# Global session manager instance
-session_manager = SessionManager()
\ No newline at end of file
+
+    def update(self, session_id: str, messages: list, fields: Dict[str, Any]):
+        self.modify(session_id, lambda session: (messages, fields))
+
+    def modify(self, session_id: str, modify: Callable[[Session], Tuple[list, Dict[str, Any]]]) -> bool:
+        shard = self._shard(session_id)
+        with shard.lock:
+            session = shard.sessions.get(session_id)
+            if session is None:
+                return False
+            messages, fields = modify(session)
+            session.fields.update(fields)
+            session.messages = messages
+            session.last_accessed = time.time()
+            session.expires_at = time.monotonic() + self.timeout
+            return True
+
+    def delete(self, session_id: str):
+        shard = self._shard(session_id)
+        with shard.lock:
+            shard.sessions.pop(session_id, None)
+
+    def sweep(self) -> int:
+        """Remove expired sessions and return how many were removed"""
+        removed = 0
+        now = time.monotonic()
+        for shard in self._shards:
+            with shard.lock:
+                heap = shard.expiry_heap
+                while heap and heap[0][0] <= now:
+                    _, session_id = heapq.heappop(heap)
+                    session = shard.sessions.get(session_id)
+                    if session is None:
+                        continue
+                    if session.expires_at <= now:
+                        del shard.sessions[session_id]
+                        removed += 1
+                    else:
+                        heapq.heappush(heap, (session.expires_at, session_id))
+        return removed
+
+    def __len__(self) -> int:
+        return sum(len(shard.sessions) for shard in self._shards)
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Process-local session store backed by a `ShardedSessionMap`.
+
+    Sessions are only visible to the process that created them, so this store
+    needs sticky routing when running more than one worker. A background task
+    removes expired sessions every `sweep_interval` seconds.
+    """
+
+    def __init__(self, timeout: int = 3600, sweep_interval: int = 60, shards: int = 64):
+        super().__init__(timeout)
+        self.sweep_interval = sweep_interval
+        self._sessions = ShardedSessionMap(timeout=timeout, shards=shards)
+        self._sweeper: Optional[asyncio.Task] = None
+
+    async def create_session(self) -> str:
+        return self._sessions.create()
+
+    async def get_session(self, session_id: str) -> Optional[Session]:
+        return self._sessions.get(session_id)
+
+    async def update_session(self, session_id: str, messages: list, **fields):
+        self._sessions.update(session_id, messages, fields)
+
+    async def modify_session(self, session_id: str, modify: Callable[[Dict], Tuple[list, Dict[str, Any]]]) -> bool:
+        return self._sessions.modify(session_id, modify)
+
+    async def delete_session(self, session_id: str):
+        self._sessions.delete(session_id)
+
+    def cleanup_expired_sessions(self) -> int:
+        """Remove expired sessions and return how many were removed"""
+        return self._sessions.sweep()
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                removed = self.cleanup_expired_sessions()
+                if removed:
+                    logger.info(f"Removed {removed} expired sessions")
+            except Exception as e:
+                logger.error(f"Session sweep failed: {e}", exc_info=True)
+
+    async def start(self):
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep_loop(), name="session-sweeper")
+
+    async def stop(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Session store on any Redis-protocol server (Redis, Valkey, KeyDB, ...).
+
+    Each session is one JSON value under `{prefix}{session_id}`, and expiry
+    uses the server's native key TTL. No sweeper is needed, and any worker can
+    serve any session.
+    """
+
+    def __init__(self, url: str, timeout: int = 3600, prefix: str = "session:"):
+        super().__init__(timeout)
+        # Imported here so the in-memory store does not require the redis package
+        from redis.asyncio import Redis
+        from redis.exceptions import WatchError
+
+        self.prefix = prefix
+        self._redis = Redis.from_url(url)
+        self._watch_error = WatchError
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}"
+
+    def _dump(self, session: Dict) -> str:
+        data = {key: value for key, value in session.items() if key != "_message_fields"}
+        # Any field holding messages is encoded the same way, and its name recorded for _load
+        message_fields = [key for key, value in data.items() if _is_message_list(value)]
+        for key in message_fields:
+            data[key] = serialize_messages(data[key])
+        return json.dumps({
+            **data,
+            "created_at": session["created_at"].isoformat(),
+            "last_accessed": session["last_accessed"].isoformat(),
+            "_message_fields": message_fields,
+        }, separators=(",", ":"), default=str)
+
+    def _load(self, raw: bytes) -> Dict:
+        session = json.loads(raw)
+        session["created_at"] = datetime.fromisoformat(session["created_at"])
+        session["last_accessed"] = datetime.fromisoformat(session["last_accessed"])
+        for key in session.pop("_message_fields", []):
+            session[key] = deserialize_messages(session[key])
+        return session
+
+    async def create_session(self) -> str:
+        session_id = str(uuid.uuid4())
+        now = datetime.now()
+        session = {"created_at": now, "last_accessed": now, "messages": []}
+        await self._redis.set(self._key(session_id), self._dump(session), ex=self.timeout, nx=True)
+        return session_id
+
+    async def get_session(self, session_id: str) -> Optional[Dict]:
+        # GETEX reads the session and slides its TTL in one round trip
+        raw = await self._redis.getex(self._key(session_id), ex=self.timeout)
+        if raw is None:
+            return None
+        session = self._load(raw)
+        session["last_accessed"] = datetime.now()
+        return session
+
+    async def update_session(self, session_id: str, messages: list, **fields):
+        await self.modify_session(session_id, lambda session: (messages, fields))
+
+    async def modify_session(self, session_id: str, modify: Callable[[Dict], Tuple[list, Dict[str, Any]]]) -> bool:
+        # Optimistic read-modify-write: WATCH makes EXEC fail if another writer
+        # (another worker, or the background summarizer) changed the session
+        # after we read it, and we retry on the fresh value
+        key = self._key(session_id)
+        async with self._redis.pipeline() as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    raw = await pipe.get(key)
+                    if raw is None:
+                        return False
+                    session = self._load(raw)
+                    messages, fields = modify(session)
+                    session.update(fields)
+                    session["messages"] = messages
+                    session["last_accessed"] = datetime.now()
+                    pipe.multi()
+                    # xx=True: never resurrect a session that was deleted meanwhile
+                    pipe.set(key, self._dump(session), ex=self.timeout, xx=True)
+                    await pipe.execute()
+                    return True
+                except self._watch_error:
+                    continue
+
+    async def delete_session(self, session_id: str):
+        await self._redis.delete(self._key(session_id))
+
+    async def stop(self):
+        await self._redis.aclose()
+
+
+def create_session_store() -> SessionStore:
+    """Build the session store selected by `SESSION_STORE`"""
+    if settings.SESSION_STORE == "redis":
+        return RedisSessionStore(settings.SESSION_REDIS_URL, timeout=settings.SESSION_TIMEOUT)
+    return InMemorySessionStore(
+        timeout=settings.SESSION_TIMEOUT,
+        sweep_interval=settings.SESSION_SWEEP_INTERVAL,
+        shards=settings.SESSION_SHARDS,
+    )
+
+
+# Global session store instance
+session_manager = create_session_store()
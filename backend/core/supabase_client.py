@@ -1,6 +1,59 @@
+from typing import Optional
+
+import httpx
+from postgrest import AsyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
 from supabase import create_client, Client
 from core.config import settings
 
+_http_client: Optional[httpx.AsyncClient] = None
+_postgrest_client: Optional[AsyncPostgrestClient] = None
+
+
 def get_supabase_client() -> Client:
     """Initializes and returns the Supabase client."""
     return create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Returns the shared, pooled async HTTP client used for all Supabase calls."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.SUPABASE_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.SUPABASE_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=settings.SUPABASE_POOL_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                settings.SUPABASE_READ_TIMEOUT,
+                connect=settings.SUPABASE_CONNECT_TIMEOUT,
+            ),
+            follow_redirects=True,
+        )
+    return _http_client
+
+
+def get_async_db() -> AsyncPostgrestClient:
+    """Returns the shared async PostgREST client for the Supabase database."""
+    global _postgrest_client
+    if _postgrest_client is None or _postgrest_client.session.is_closed:
+        _postgrest_client = AsyncPostgrestClient(
+            f"{settings.SUPABASE_URL}/rest/v1",
+            headers={
+                **DEFAULT_POSTGREST_CLIENT_HEADERS,
+                "apikey": settings.SUPABASE_KEY,
+                "Authorization": f"Bearer {settings.SUPABASE_KEY}",
+            },
+            http_client=get_http_client(),
+        )
+    return _postgrest_client
+
+
+async def close_async_clients():
+    """Closes the shared HTTP connection pool."""
+    global _http_client, _postgrest_client
+    if _http_client is not None:
+        await _http_client.aclose()
+    _http_client = None
+    _postgrest_client = None
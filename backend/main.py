@@ -3,12 +3,20 @@ from dotenv import load_dotenv
 load_dotenv()
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 
 from api.routes import router
+from core.blocking import blocking_executor
 from core.config import settings
+from agent.tools.phone_catalog import phone_catalog
+from agent.prompt_registry import prompt_registry
+from core.log_service import log_service
+from core.metrics import metrics
+from core.session_manager import session_manager
+from core.supabase_client import close_async_clients
 
 # Configure logging
 logging.basicConfig(
@@ -21,8 +29,20 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """Lifespan event handler for startup and shutdown"""
     logger.info("Starting up the application...")
+    # Bound the threads used by to_thread and any remaining synchronous callbacks
+    asyncio.get_running_loop().set_default_executor(blocking_executor)
+    await log_service.start()
+    await session_manager.start()
+    if settings.PHONE_CATALOG_ENABLED:
+        await phone_catalog.start()
+    await prompt_registry.start()
     yield
     logger.info("Shutting down the application...")
+    await prompt_registry.stop()
+    await phone_catalog.stop()
+    await session_manager.stop()
+    await log_service.stop()
+    await close_async_clients()
 
 
 app = FastAPI(
@@ -51,6 +71,12 @@ async def health_check():
     return {"status": "healthy", "version": "1.0.0"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus metrics: per-node latency, token usage, backend latency and cache hits"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler"""
@@ -0,0 +1,70 @@
+-- Ranked phone-name resolution for `fetch_phone_details` when the in-process
+-- phone catalog is disabled or still loading. Run once in the Supabase SQL editor.
+--
+-- The query argument is already normalized by the API
+-- (agent/tools/phone_name_index.py): lowercase, letters and digits split
+-- ("12R" -> "12 r"), storage variants removed. phone_name_key() applies the
+-- same shape to stored names so both sides compare like for like.
+
+create extension if not exists pg_trgm;
+
+create or replace function public.phone_name_key(name text)
+returns text
+language sql
+immutable
+as $$
+  select trim(regexp_replace(
+    regexp_replace(
+      regexp_replace(
+        replace(lower(coalesce(name, '')), '+', ' plus '),
+        '([a-z])([0-9])', '\1 \2', 'g'),
+      '([0-9])([a-z])', '\1 \2', 'g'),
+    '[^a-z0-9]+', ' ', 'g'))
+$$;
+
+create index if not exists phones_name_key_trgm
+  on public.phones using gin (public.phone_name_key(name) gin_trgm_ops);
+
+-- Exact key matches first, then trigram similarity (with or without the brand),
+-- then the usual popularity ranking. Every number in the query must appear in
+-- the name, so "iphone 16" never resolves to "iPhone 15". Variant tokens
+-- (numbers, single letters, pro/max/plus/ultra/mini/lite/fe) must appear on
+-- both sides, so "pixel 8" never resolves to "Pixel 8a" and "iphone 15"
+-- never to "iPhone 15 Pro Max".
+create or replace function public.resolve_phone_name(query text, max_results int default 1)
+returns setof public.phones
+language sql
+stable
+as $$
+  select p.*
+  from public.phones p
+  where (public.phone_name_key(p.name) % query or public.phone_name_key(p.name) = query)
+    and not exists (
+      select 1
+      from regexp_matches(query, '\d+', 'g') as number
+      where ' ' || public.phone_name_key(p.name) || ' ' not like '% ' || number[1] || ' %'
+    )
+    and not exists (
+      -- "5G" in a stored name is not a variant, as in the API's normalization
+      select 1
+      from regexp_split_to_table(regexp_replace(public.phone_name_key(p.name), '(^| )5 g( |$)', ' ', 'g'), ' ') as token
+      where token ~ '^([0-9]+|[a-z]|pro|max|plus|ultra|mini|lite|fe)$'
+        and ' ' || query || ' ' not like '% ' || token || ' %'
+    )
+    and not exists (
+      select 1
+      from regexp_split_to_table(query, ' ') as token
+      where token ~ '^([a-z]|pro|max|plus|ultra|mini|lite|fe)$'
+        and ' ' || public.phone_name_key(p.brand || ' ' || p.name) || ' ' not like '% ' || token || ' %'
+    )
+  order by
+    (public.phone_name_key(p.name) = query
+      or public.phone_name_key(p.brand || ' ' || p.name) = query) desc,
+    greatest(
+      similarity(public.phone_name_key(p.name), query),
+      similarity(public.phone_name_key(p.brand || ' ' || p.name), query)
+    ) desc,
+    p.popularity_score desc,
+    p.rating desc
+  limit max_results
+$$;
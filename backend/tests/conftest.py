@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Settings are read at import time; the tests never reach these services
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "eyJhbGciOiJIUzI1NiJ9.e30.test")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
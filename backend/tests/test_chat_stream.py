@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+from starlette.requests import ClientDisconnect
+
+from agent.conversation_memory import conversation_memory
+from api import routes
+from api.models import ChatRequest
+from core.admission import admission_controller
+from core.session_manager import session_manager
+
+SCOPE = {"type": "http", "asgi": {"spec_version": "2.4"}}
+
+
+async def receive():
+    return {"type": "http.disconnect"}
+
+
+def admitted():
+    stats = admission_controller.stats()
+    return stats["in_flight"], stats["sessions_busy"]
+
+
+async def open_stream():
+    session_id = await session_manager.create_session()
+    response = await routes.chat_stream(ChatRequest(message="hi", session_id=session_id))
+    assert admitted() == (1, 1)
+    return response
+
+
+def test_disconnect_before_the_stream_starts_releases_the_ticket():
+    async def disconnected(message):
+        raise OSError("connection reset")
+
+    async def run():
+        response = await open_stream()
+        with pytest.raises(ClientDisconnect):
+            await response(SCOPE, receive, disconnected)
+
+    asyncio.run(run())
+    assert admitted() == (0, 0)
+
+
+def test_failed_stream_setup_releases_the_ticket(monkeypatch):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    def build_history(session):
+        raise RuntimeError("corrupt session")
+
+    monkeypatch.setattr(conversation_memory, "build_history", build_history)
+
+    async def run():
+        response = await open_stream()
+        await response(SCOPE, receive, send)
+
+    asyncio.run(run())
+    assert admitted() == (0, 0)
+    body = b"".join(message.get("body", b"") for message in sent)
+    assert body.startswith(b"event: error")
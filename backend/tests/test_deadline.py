@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+from core.deadline import DeadlineExceeded, request_deadline, within_deadline
+
+
+async def sleep_then(seconds, error=None):
+    await asyncio.sleep(seconds)
+    if error is not None:
+        raise error
+    return "done"
+
+
+async def run(step, deadline, limit=None):
+    with request_deadline(deadline):
+        return await within_deadline(step, "test", limit)
+
+
+def test_step_within_budget():
+    assert asyncio.run(run(sleep_then(0.01), 1.0)) == "done"
+
+
+@pytest.mark.parametrize("deadline, limit", [(0.05, None), (1.0, 0.05)])
+def test_running_out_of_time_is_a_deadline(deadline, limit):
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run(sleep_then(1.0), deadline, limit))
+
+
+def test_timeout_inside_the_step_is_not_a_deadline():
+    with pytest.raises(asyncio.TimeoutError) as raised:
+        asyncio.run(run(sleep_then(0.01, asyncio.TimeoutError("upstream")), 1.0))
+    assert not isinstance(raised.value, DeadlineExceeded)
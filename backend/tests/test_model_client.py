@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+from agent.model_client import CircuitBreaker, ModelTarget, ResilientModel
+from core.config import settings
+from core.deadline import request_deadline
+
+
+class FailingStreamModel(BaseChatModel):
+    """Streams two tokens and then fails, on every call"""
+
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "failing-stream"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        raise NotImplementedError
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        for token in ("Hello", " there"):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+        raise google_exceptions.ServiceUnavailable("overloaded")
+
+
+class FlakyModel(BaseChatModel):
+    """Fails its first call before producing any output"""
+
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "flaky"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        raise NotImplementedError
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.calls += 1
+        if self.calls == 1:
+            raise google_exceptions.ServiceUnavailable("overloaded")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="ok"))])
+
+
+def resilient(*models, hedge=False):
+    targets = [ModelTarget(f"model-{i}", model, None, CircuitBreaker(f"model-{i}")) for i, model in enumerate(models)]
+    return ResilientModel("test", "test", targets, hedge=hedge)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_RETRY_BASE_DELAY", 0.0)
+
+
+def test_streamed_call_is_not_retried_or_sent_to_fallback():
+    primary, fallback = FailingStreamModel(), FlakyModel()
+    model = resilient(primary, fallback)
+    tokens = []
+
+    async def node(messages):
+        return await model.ainvoke(messages)
+
+    async def run():
+        async for event in RunnableLambda(node).astream_events([HumanMessage("hi")], version="v2"):
+            if event["event"] == "on_chat_model_stream":
+                tokens.append(event["data"]["chunk"].content)
+
+    with pytest.raises(google_exceptions.ServiceUnavailable):
+        asyncio.run(run())
+    assert tokens == ["Hello", " there"]
+    assert primary.calls == 1
+    assert fallback.calls == 0
+
+
+def test_failure_before_output_is_retried():
+    flaky = FlakyModel()
+    assert asyncio.run(resilient(flaky).ainvoke([HumanMessage("hi")])).content == "ok"
+    assert flaky.calls == 2
+
+
+def test_cancelled_hedge_request_does_not_fail_the_call(monkeypatch):
+    calls = 0
+
+    async def answer(_):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await asyncio.sleep(0.02)
+            raise asyncio.CancelledError()
+        await asyncio.sleep(0.05)
+        return AIMessage(content="hedged")
+
+    model = resilient(RunnableLambda(answer), hedge=True)
+    monkeypatch.setattr(ResilientModel, "hedge_delay", lambda self, target: 0.01)
+    assert asyncio.run(model.ainvoke([HumanMessage("hi")])).content == "hedged"
+
+
+def test_request_deadline_does_not_open_the_breaker():
+    async def slow(_):
+        await asyncio.sleep(1.0)
+        return AIMessage(content="late")
+
+    model = resilient(RunnableLambda(slow), RunnableLambda(slow))
+
+    async def run():
+        with request_deadline(0.02):
+            await model.ainvoke([HumanMessage("hi")])
+
+    for _ in range(model.targets[0].breaker.failure_threshold + 1):
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(run())
+    assert all(target.breaker.times_opened == 0 for target in model.targets)
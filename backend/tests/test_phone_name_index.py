@@ -0,0 +1,71 @@
+import pytest
+
+from agent.tools.phone_name_index import PhoneNameIndex, normalize_phone_name
+
+PHONES = [
+    ("OnePlus 12R", "OnePlus"),
+    ("iPhone 15 Pro Max", "Apple"),
+    ("Galaxy S24 Ultra", "Samsung"),
+    ("Samsung Galaxy S24", "Samsung"),
+    ("Pixel 8a", "Google"),
+    ("Redmi Note 13 Pro+", "Xiaomi"),
+    ("Nothing Phone (2a)", "Nothing"),
+    ("Galaxy A15 5G", "Samsung"),
+    ("Moto Edge 50 Fusion", "Motorola"),
+]
+
+
+@pytest.fixture
+def index():
+    return PhoneNameIndex(PHONES)
+
+
+def name(index, query):
+    row = index.best(query)
+    return PHONES[row][0] if row is not None else None
+
+
+def test_normalize():
+    assert normalize_phone_name("Redmi Note 13 Pro+ 8/256GB") == "redmi note 13 pro plus"
+    assert normalize_phone_name("one plus 12R") == "oneplus 12 r"
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("oneplus 12 r", "OnePlus 12R"),
+    ("OnePlus 12R 256GB", "OnePlus 12R"),
+    ("iphone 15 pro max", "iPhone 15 Pro Max"),
+    ("Apple iPhone 15 ProMax", "iPhone 15 Pro Max"),
+    ("Galaxy S24", "Samsung Galaxy S24"),
+    ("samsung s24 ultra", "Galaxy S24 Ultra"),
+    ("google pixel 8a", "Pixel 8a"),
+    ("redmi note 13 pro plus", "Redmi Note 13 Pro+"),
+    ("samsung a15", "Galaxy A15 5G"),
+    ("moto edge 50", "Moto Edge 50 Fusion"),
+])
+def test_resolves(index, query, expected):
+    assert name(index, query) == expected
+
+
+@pytest.mark.parametrize("query", [
+    # Only a variant with more tokens matches
+    "Pixel 8",
+    "iPhone 15",
+    "iphone 15 pro",
+    "oneplus 12",
+    "redmi note 13",
+    "nothing phone 2",
+    "galaxy s24 plus",
+    # Numbers must match
+    "iPhone 16 Pro Max",
+    "15",
+    # The query's brand must be the phone's
+    "samsung pixel 8a",
+])
+def test_not_found(index, query):
+    assert name(index, query) is None
+
+
+def test_exact_token_set_wins_over_superset():
+    index = PhoneNameIndex([("iPhone 15 Pro Max", "Apple"), ("iPhone 15", "Apple")])
+    assert [row for row, _ in index.search("iphone 15")] == [1]
+    assert index.search("15 iphone", limit=1) == [(1, 1.0)]
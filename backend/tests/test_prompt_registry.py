@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_google_genai.chat_models import ChatGoogleGenerativeAIError
+
+from agent.model_client import model_client
+from agent.prompt_registry import GeminiPrefixCache, PromptRegistry
+from agent.models.intent_classification_response import IntentClassificationResponse
+
+HANDLE = "cachedContents/intent"
+PROMPT = "Classify the intent."
+
+
+class FakeCache(GeminiPrefixCache):
+    """Gemini's error handling without its client"""
+
+    def __init__(self):
+        from google.genai import errors
+
+        self._errors = errors
+
+
+class FlakyModel:
+    """Fails the first call with `error`, then answers"""
+
+    def __init__(self, error):
+        self.error = error
+        self.calls = []
+
+    async def ainvoke(self, messages, **kwargs):
+        self.calls.append((messages, kwargs))
+        if len(self.calls) == 1:
+            raise self.error
+        return AIMessage(content="ok")
+
+
+def registry_with_handle():
+    registry = PromptRegistry(FakeCache())
+    registry.register("intent_classification", PROMPT)
+    registry._prompts["intent_classification"].handle = HANDLE
+    return registry
+
+
+def test_cached_prompt_reaches_structured_model(monkeypatch):
+    seen = []
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, cached_content=None, **kwargs):
+        seen.append((messages, cached_content or self.cached_content))
+        message = AIMessage(content='{"intent": "chitchat"}')
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    monkeypatch.setattr(ChatGoogleGenerativeAI, "_agenerate", _agenerate)
+    model = model_client.for_node("intent_classification", lambda chat: chat.with_structured_output(
+        schema=IntentClassificationResponse, method="json_mode", include_raw=True
+    ))
+
+    result = asyncio.run(registry_with_handle().ainvoke("intent_classification", model, [HumanMessage("hi")]))
+
+    assert result.intent == "chitchat"
+    messages, cached_content = seen[0]
+    assert cached_content == HANDLE
+    assert not any(isinstance(message, SystemMessage) for message in messages)
+
+
+def test_uncached_calls_do_not_carry_a_handle(monkeypatch):
+    seen = []
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, cached_content=None, **kwargs):
+        seen.append((messages, cached_content or self.cached_content))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="hello"))])
+
+    monkeypatch.setattr(ChatGoogleGenerativeAI, "_agenerate", _agenerate)
+    registry = registry_with_handle()
+    model = model_client.for_node("intent_classification")
+    asyncio.run(registry.ainvoke("intent_classification", model, [HumanMessage("hi")]))
+    registry._prompts["intent_classification"].handle = None
+    asyncio.run(registry.ainvoke("intent_classification", model, [HumanMessage("hi")]))
+
+    assert [cached for _, cached in seen] == [HANDLE, None]
+    assert isinstance(seen[1][0][0], SystemMessage)
+
+
+@pytest.mark.parametrize("error", [
+    google_exceptions.NotFound("CachedContent not found"),
+    google_exceptions.PermissionDenied("CachedContent not found (or permission denied)"),
+    ChatGoogleGenerativeAIError("Invalid argument provided to Gemini: 400 Cache content 123 is expired."),
+])
+def test_missing_cache_falls_back_inline(error):
+    if isinstance(error, ChatGoogleGenerativeAIError):
+        error.__cause__ = google_exceptions.InvalidArgument("Cache content 123 is expired.")
+    registry = registry_with_handle()
+    model = FlakyModel(error)
+
+    assert asyncio.run(registry.ainvoke("intent_classification", model, [HumanMessage("hi")])).content == "ok"
+    assert registry._prompts["intent_classification"].handle is None
+    retry_messages, retry_kwargs = model.calls[1]
+    assert retry_kwargs == {}
+    assert retry_messages[0].content == PROMPT
+
+
+@pytest.mark.parametrize("error", [
+    google_exceptions.ServiceUnavailable("overloaded"),
+    asyncio.TimeoutError("no answer"),
+])
+def test_transient_error_keeps_cache(error):
+    registry = registry_with_handle()
+    model = FlakyModel(error)
+
+    with pytest.raises(type(error)):
+        asyncio.run(registry.ainvoke("intent_classification", model, [HumanMessage("hi")]))
+    assert registry._prompts["intent_classification"].handle == HANDLE
+    assert len(model.calls) == 1
@@ -0,0 +1,37 @@
+import time
+
+from core.response_cache import ResponseCache
+
+
+def test_answers_are_only_reused_in_the_same_context():
+    cache = ResponseCache()
+    cache.put("query", "What is OIS?", "Optical image stabilization.")
+    cache.put("query", "and the other one?", "EIS is electronic.", context="Human: What is OIS?")
+
+    assert cache.get("query", "what is ois") == "Optical image stabilization."
+    assert cache.get("query", "What is OIS?", context="Human: compare these phones") is None
+    assert cache.get("irrelevant", "What is OIS?") is None
+    assert cache.get("query", "and the other one?") is None
+    assert cache.get("query", "and the other one?", context="Human: What is OIS?") == "EIS is electronic."
+
+
+def test_disk_hit_keeps_the_original_expiry(tmp_path, monkeypatch):
+    path = str(tmp_path / "responses.db")
+    ResponseCache(ttl=100, sqlite_path=path).put("query", "what is ois", "OIS")
+    wall, monotonic = time.time(), time.monotonic()
+
+    def advance(seconds):
+        monkeypatch.setattr(time, "time", lambda: wall + seconds)
+        monkeypatch.setattr(time, "monotonic", lambda: monotonic + seconds)
+
+    advance(60)
+    restarted = ResponseCache(ttl=100, sqlite_path=path)
+    restarted._memory.clear()
+    assert restarted.get("query", "what is ois") == "OIS"
+    assert restarted.disk_hits == 1
+
+    # Served from memory now, which must not outlive the entry's original TTL
+    advance(101)
+    restarted._db.close()
+    restarted._db = None
+    assert restarted.get("query", "what is ois") is None
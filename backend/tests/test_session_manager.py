@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from core.session_manager import RedisSessionStore
+
+
+def test_redis_store_round_trips_every_message_field():
+    store = RedisSessionStore("redis://localhost:6379/0")
+    now = datetime.now()
+    session = {
+        "created_at": now,
+        "last_accessed": now,
+        "messages": [HumanMessage(content="hi"), AIMessage(content="hello")],
+        "summary": "Asked about phones.",
+        "archived": [HumanMessage(content="older turn")],
+        "empty": [],
+    }
+
+    loaded = store._load(store._dump(session).encode())
+
+    assert loaded == session
+    assert "_message_fields" not in loaded
@@ -0,0 +1,56 @@
+import asyncio
+
+import httpx
+import pytest
+
+from agent.tools import supabase_tools
+from benchmarks.fakes import FakeSupabase
+from core import supabase_client
+
+PHONES = [
+    {"id": 1, "name": "Pixel 8 Pro", "brand": "Google", "popularity_score": 95},
+    {"id": 2, "name": "Pixel 8a", "brand": "Google", "popularity_score": 90},
+    {"id": 3, "name": "Pixel 8", "brand": "Google", "popularity_score": 80},
+    {"id": 4, "name": "iPhone 15 Pro Max", "brand": "Apple", "popularity_score": 99},
+]
+
+
+class NoRpcSupabase(FakeSupabase):
+    """A database without the `resolve_phone_name` function"""
+
+    rpc_calls = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/rpc/resolve_phone_name"):
+            self.rpc_calls += 1
+            return httpx.Response(404, json={
+                "code": "PGRST202", "message": "Could not find the function public.resolve_phone_name",
+                "details": None, "hint": None,
+            })
+        return await super().handle(request)
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = NoRpcSupabase(PHONES)
+    monkeypatch.setattr(supabase_client, "_http_client", httpx.AsyncClient(transport=database.transport()))
+    monkeypatch.setattr(supabase_client, "_postgrest_client", None)
+    monkeypatch.setattr(supabase_tools, "_resolve_rpc_installed", None)
+    return database
+
+
+def resolve(query):
+    row = asyncio.run(supabase_tools._resolve_phone_in_db(query))
+    return row["name"] if row else None
+
+
+def test_fallback_applies_variant_rules(database):
+    assert resolve("pixel 8") == "Pixel 8"
+    assert resolve("pixel 8 a") == "Pixel 8a"
+    assert resolve("iphone 15") is None
+
+
+def test_missing_rpc_is_only_tried_once(database):
+    for query in ("pixel 8", "pixel 8 pro", "iphone 15 pro max"):
+        resolve(query)
+    assert database.rpc_calls == 1
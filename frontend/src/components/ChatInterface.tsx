@@ -41,21 +41,51 @@ export function ChatInterface({ sessionId, onNewChat }: ChatInterfaceProps) {
     setInputValue('');
     setIsLoading(true);
 
-    try {
-      const response = await apiService.sendMessage({
-        message: inputValue,
-        session_id: sessionId,
+    const assistantIndex = messages.length + 1;
+    const updateAssistantMessage = (update: Partial<Message>) => {
+      setMessages((prev) => {
+        const next = [...prev];
+        const current: Message = next[assistantIndex] ?? {
+          role: 'assistant',
+          content: '',
+          timestamp: new Date().toISOString(),
+        };
+        next[assistantIndex] = { ...current, ...update };
+        return next;
       });
+    };
 
-      const assistantMessage: Message = {
-        role: 'assistant',
-        content: response.response,
-        intent: response.intent,
-        context_data: response.context_data,
-        timestamp: response.timestamp,
-      };
-
-      setMessages((prev) => [...prev, assistantMessage]);
+    try {
+      // Intent and context data arrive before the first token; hold them until
+      // there is text to show so the "Thinking..." indicator stays up meanwhile.
+      let pending: Partial<Message> = {};
+      let streamedContent = '';
+      await apiService.sendMessageStream(
+        {
+          message: inputValue,
+          session_id: sessionId,
+        },
+        {
+          onIntent: (intent) => {
+            pending = { ...pending, intent };
+          },
+          onContextData: (contextData) => {
+            pending = { ...pending, context_data: contextData ?? undefined };
+          },
+          onToken: (text) => {
+            streamedContent += text;
+            setIsLoading(false);
+            updateAssistantMessage({ ...pending, content: streamedContent });
+          },
+          onDone: (response) =>
+            updateAssistantMessage({
+              content: response.response,
+              intent: response.intent,
+              context_data: response.context_data,
+              timestamp: response.timestamp,
+            }),
+        }
+      );
     } catch (error) {
       const errorMessage: Message = {
         role: 'assistant',
@@ -65,7 +95,7 @@ export function ChatInterface({ sessionId, onNewChat }: ChatInterfaceProps) {
             : 'Sorry, I encountered an error. Please try again.',
         timestamp: new Date().toISOString(),
       };
-      setMessages((prev) => [...prev, errorMessage]);
+      setMessages((prev) => [...prev.slice(0, assistantIndex), errorMessage]);
     } finally {
       setIsLoading(false);
     }
@@ -1,5 +1,5 @@
 import { Bot, User } from 'lucide-react';
-import type { Message, PhoneDetails, ComparisonData } from '../types/api.types';
+import type { Message, PhoneCard, PhoneDetails, ComparisonData } from '../types/api.types';
 import { PhoneDetailCard } from './PhoneDetailCard';
 import { PhoneComparison } from './PhoneComparison';
 import { PhoneList } from './PhoneList';
@@ -31,7 +31,7 @@ export function ChatMessage({ message }: ChatMessageProps) {
         );
 
       case 'search_recommendation':
-        const phones = message.context_data as PhoneDetails[];
+        const phones = message.context_data as PhoneCard[];
         return (
           <div className="mt-3">
             <PhoneList phones={phones} />
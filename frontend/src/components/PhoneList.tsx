@@ -1,8 +1,8 @@
 import { Battery, Camera, Cpu, Monitor, Star } from 'lucide-react';
-import type { PhoneDetails } from '../types/api.types';
+import type { PhoneCard } from '../types/api.types';
 
 interface PhoneListProps {
-  phones: PhoneDetails[];
+  phones: PhoneCard[];
 }
 
 export function PhoneList({ phones }: PhoneListProps) {
@@ -2,6 +2,7 @@ import { API_CONFIG } from '../config/api.config';
 import type {
   ChatRequest,
   ChatResponse,
+  ChatStreamHandlers,
   NewSessionResponse,
   ErrorResponse,
 } from '../types/api.types';
@@ -66,6 +67,83 @@ class APIService {
     return this.handleResponse<ChatResponse>(response);
   }
 
+  async sendMessageStream(
+    request: ChatRequest,
+    handlers: ChatStreamHandlers
+  ): Promise<ChatResponse> {
+    const url = `${this.baseUrl}${API_CONFIG.ENDPOINTS.CHAT_STREAM}`;
+    const response = await this.fetchWithTimeout(url, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        Accept: 'text/event-stream',
+      },
+      body: JSON.stringify(request),
+    });
+
+    if (!response.ok || !response.body) {
+      return this.handleResponse<ChatResponse>(response);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let finalResponse: ChatResponse | null = null;
+
+    const dispatch = (rawEvent: string) => {
+      let eventName = 'message';
+      const dataLines: string[] = [];
+      for (const line of rawEvent.split('\n')) {
+        if (line.startsWith('event:')) {
+          eventName = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+          dataLines.push(line.slice(5).trimStart());
+        }
+      }
+      if (dataLines.length === 0) return;
+      const data = JSON.parse(dataLines.join('\n'));
+
+      switch (eventName) {
+        case 'session':
+          handlers.onSession?.(data.session_id);
+          break;
+        case 'intent':
+          handlers.onIntent?.(data.intent);
+          break;
+        case 'context_data':
+          handlers.onContextData?.(data.context_data);
+          break;
+        case 'token':
+          handlers.onToken?.(data.text);
+          break;
+        case 'done':
+          finalResponse = data as ChatResponse;
+          handlers.onDone?.(finalResponse);
+          break;
+        case 'error':
+          throw new Error(data.detail || 'An error occurred');
+      }
+    };
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        dispatch(buffer.slice(0, boundary));
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf('\n\n');
+      }
+    }
+
+    if (!finalResponse) {
+      throw new Error('The response stream ended unexpectedly');
+    }
+    return finalResponse;
+  }
+
   async deleteSession(sessionId: string): Promise<void> {
     const url = `${this.baseUrl}${API_CONFIG.ENDPOINTS.DELETE_SESSION(sessionId)}`;
     await this.fetchWithTimeout(url, {
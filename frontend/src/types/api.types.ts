@@ -7,10 +7,20 @@ export interface ChatResponse {
   session_id: string;
   intent?: string;
   response: string;
-  context_data?: PhoneDetails | ComparisonData | PhoneDetails[];
+  context_data?: ContextData;
   timestamp: string;
 }
 
+export type ContextData = PhoneDetails | ComparisonData | PhoneCard[];
+
+export interface ChatStreamHandlers {
+  onSession?: (sessionId: string) => void;
+  onIntent?: (intent: string) => void;
+  onContextData?: (contextData: ContextData | null) => void;
+  onToken?: (text: string) => void;
+  onDone?: (response: ChatResponse) => void;
+}
+
 export interface NewSessionResponse {
   session_id: string;
   message: string;
@@ -51,16 +61,71 @@ export interface PhoneDetails {
   updated_at?: string;
 }
 
+// Recommendation list entries (PHONE_CARD_FIELDS in the backend schema)
+export type PhoneCard = Pick<
+  PhoneDetails,
+  | 'id'
+  | 'name'
+  | 'brand'
+  | 'price'
+  | 'rating'
+  | 'os'
+  | 'processor'
+  | 'network'
+  | 'display_size_inch'
+  | 'refresh_rate'
+  | 'ram_gb'
+  | 'storage_gb'
+  | 'battery_mah'
+  | 'charging_speed_w'
+  | 'rear_camera_mp'
+  | 'features'
+  | 'use_cases'
+>;
+
+// Compared phones (PHONE_SPEC_FIELDS in the backend schema)
+export type PhoneSpecs = Pick<
+  PhoneDetails,
+  | 'name'
+  | 'brand'
+  | 'price'
+  | 'rating'
+  | 'display_size_inch'
+  | 'display_type'
+  | 'refresh_rate'
+  | 'processor'
+  | 'ram_gb'
+  | 'storage_gb'
+  | 'battery_mah'
+  | 'charging_speed_w'
+  | 'rear_camera_mp'
+  | 'front_camera_mp'
+  | 'weight_g'
+  | 'pros'
+  | 'cons'
+>;
+
+export type ComparisonSpec =
+  | 'price'
+  | 'battery_mah'
+  | 'charging_speed_w'
+  | 'rear_camera_mp'
+  | 'front_camera_mp'
+  | 'refresh_rate'
+  | 'ram_gb'
+  | 'storage_gb'
+  | 'rating';
+
 export interface ComparisonData {
-  phone_1: PhoneDetails;
-  phone_2: PhoneDetails;
+  phones: PhoneSpecs[];
+  winners: Partial<Record<ComparisonSpec, string[]>>;
 }
 
 export interface Message {
   role: 'user' | 'assistant';
   content: string;
   intent?: string;
-  context_data?: PhoneDetails | ComparisonData | PhoneDetails[];
+  context_data?: ContextData;
   timestamp: string;
 }
 